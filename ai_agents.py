@@ -1,20 +1,113 @@
 from deepseek_client import DeepSeekClient
 from typing import Dict, Any, Callable, Optional
+import concurrent.futures
+import os
+import queue
+import threading
 import time
 
+# 分析师并发数上限（1表示顺序执行）与单个分析师超时（秒）
+ANALYST_MAX_CONCURRENCY = int(os.getenv("ANALYST_MAX_CONCURRENCY", "6"))
+ANALYST_TIMEOUT = int(os.getenv("ANALYST_TIMEOUT", "300"))
+
+# 结果键 -> (分析师名称, 职责)，用于超时/失败时生成同结构的占位结果
+ANALYST_PROFILES = {
+    "technical": ("技术分析师", "负责技术指标分析、图表形态识别、趋势判断"),
+    "fundamental": ("基本面分析师", "负责公司财务分析、行业研究、估值分析"),
+    "fund_flow": ("资金面分析师", "负责资金流向分析、主力行为研究、市场情绪判断"),
+    "risk_management": ("风险管理师", "负责风险识别、风险评估、风险控制策略制定"),
+    "market_sentiment": ("市场情绪分析师", "负责市场情绪研究、投资者心理分析、热点追踪"),
+    "news": ("新闻分析师", "负责新闻事件分析、舆情研究、重大事件影响评估"),
+}
+
 class StockAnalysisAgents:
     """股票分析AI智能体集合"""
 
-    def __init__(self, model="qwen3.5-plus", progress_callback: Optional[Callable[[str], None]] = None):
+    def __init__(self, model="qwen3.5-plus", progress_callback: Optional[Callable[[str], None]] = None,
+                 stream_callback: Optional[Callable[[str, str], None]] = None):
+        """
+        Args:
+            model: 使用的模型
+            progress_callback: 进度消息回调
+            stream_callback: 实时输出回调，参数为(结果键, 当前已生成的完整文本)，
+                设置后分析师报告与团队讨论改为流式生成
+        """
         self.model = model
         self.deepseek_client = DeepSeekClient(model=model)
         self.progress_callback = progress_callback
+        self.stream_callback = stream_callback
+        # 流式输出缓冲：结果键 -> {'reasoning': [...], 'content': [...]}
+        self._stream_buffers = {}
+        self._stream_dirty = set()
+        self._stream_last_emit = {}
+        self._stream_lock = threading.Lock()
+        # 并发分析期间，工作线程的进度消息转交给调用线程展示（Streamlit只能在脚本线程更新）
+        self._progress_owner = None
+        self._progress_queue = queue.Queue()
 
     def _update_progress(self, message: str):
         """更新进度信息到前端"""
         print(message)  # 后端控制台输出
         if self.progress_callback:
-            self.progress_callback(message)  # 前端展示更新
+            if self._progress_owner is None or threading.get_ident() == self._progress_owner:
+                self.progress_callback(message)  # 前端展示更新
+            else:
+                self._progress_queue.put(message)
+
+    def _flush_progress(self):
+        """在调用线程中展示工作线程产生的进度消息与流式输出"""
+        while True:
+            try:
+                message = self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if self.progress_callback:
+                self.progress_callback(message)
+        self._flush_stream()
+
+    def _streaming(self, key: str, func: Callable[[], Any]) -> Callable[[], Any]:
+        """包装任务：在执行线程上开启流式输出，增量归入指定结果键"""
+        if not self.stream_callback:
+            return func
+
+        def wrapped():
+            with self._stream_lock:
+                self._stream_buffers.pop(key, None)
+            self.deepseek_client.set_stream_handler(lambda kind, delta: self._on_stream_delta(key, kind, delta))
+            try:
+                return func()
+            finally:
+                self.deepseek_client.set_stream_handler(None)
+
+        return wrapped
+
+    def _on_stream_delta(self, key: str, kind: str, delta: str):
+        """接收流式增量；调用线程内按时间节流直接展示，其他线程等待调用线程刷新"""
+        with self._stream_lock:
+            buffer = self._stream_buffers.setdefault(key, {'reasoning': [], 'content': []})
+            buffer[kind].append(delta)
+            self._stream_dirty.add(key)
+
+        if self._progress_owner is None or threading.get_ident() == self._progress_owner:
+            if time.time() - self._stream_last_emit.get(key, 0) >= 0.3:
+                self._flush_stream()
+
+    def _flush_stream(self):
+        """把有更新的流式输出推送给stream_callback（仅在调用线程中调用）"""
+        if not self.stream_callback:
+            return
+        with self._stream_lock:
+            updates = {
+                key: self.deepseek_client._format_result(
+                    ''.join(self._stream_buffers[key]['reasoning']),
+                    ''.join(self._stream_buffers[key]['content'])
+                )
+                for key in self._stream_dirty
+            }
+            self._stream_dirty.clear()
+        for key, text in updates.items():
+            self._stream_last_emit[key] = time.time()
+            self.stream_callback(key, text)
         
     def technical_analyst_agent(self, stock_info: Dict, stock_data: Any, indicators: Dict) -> Dict[str, Any]:
         """技术面分析智能体"""
@@ -418,13 +511,23 @@ class StockAnalysisAgents:
                                  financial_data: Dict = None, fund_flow_data: Dict = None,
                                  sentiment_data: Dict = None, news_data: Dict = None,
                                  quarterly_data: Dict = None, risk_data: Dict = None,
-                                 enabled_analysts: Dict = None) -> Dict[str, Any]:
+                                 enabled_analysts: Dict = None,
+                                 max_concurrency: Optional[int] = None,
+                                 agent_timeout: Optional[float] = None,
+                                 cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
         """运行多智能体分析
 
         Args:
             enabled_analysts: 字典，指定哪些分析师参与分析
                 例如: {'technical': True, 'fundamental': True, ...}
                 如果为None，则运行所有分析师
+            max_concurrency: 同时运行的分析师数量上限（默认ANALYST_MAX_CONCURRENCY，1为顺序执行）
+            agent_timeout: 单个分析师的超时秒数（默认ANALYST_TIMEOUT）
+            cancel_event: 置位后不再等待尚未完成的分析师
+
+        Returns:
+            按技术、基本面、资金面、风险、情绪、新闻顺序排列的分析结果字典；
+            超时、取消或失败的分析师以同结构的占位结果返回
         """
         # 如果未指定，默认所有分析师都参与
         if enabled_analysts is None:
@@ -445,38 +548,133 @@ class StockAnalysisAgents:
         self._update_progress(f"📋 参与分析的分析师: {', '.join(active_analysts)}")
         self._update_progress("=" * 50)
 
-        # 并行运行各个分析师
-        agents_results = {}
-
-        # 技术面分析
+        # 按固定顺序构建分析任务（结果字典保持该顺序）
+        tasks = []
         if enabled_analysts.get('technical', True):
-            agents_results["technical"] = self.technical_analyst_agent(stock_info, stock_data, indicators)
-
-        # 基本面分析
+            tasks.append(("technical", lambda: self.technical_analyst_agent(stock_info, stock_data, indicators)))
         if enabled_analysts.get('fundamental', True):
-            agents_results["fundamental"] = self.fundamental_analyst_agent(stock_info, financial_data, quarterly_data)
-
+            tasks.append(("fundamental", lambda: self.fundamental_analyst_agent(stock_info, financial_data, quarterly_data)))
         # 资金面分析（传入资金流向数据）
         if enabled_analysts.get('fund_flow', True):
-            agents_results["fund_flow"] = self.fund_flow_analyst_agent(stock_info, indicators, fund_flow_data)
-
+            tasks.append(("fund_flow", lambda: self.fund_flow_analyst_agent(stock_info, indicators, fund_flow_data)))
         # 风险管理分析（传入风险数据）
         if enabled_analysts.get('risk', True):
-            agents_results["risk_management"] = self.risk_management_agent(stock_info, indicators, risk_data)
-
+            tasks.append(("risk_management", lambda: self.risk_management_agent(stock_info, indicators, risk_data)))
         # 市场情绪分析（传入市场情绪数据）
         if enabled_analysts.get('sentiment', False):
-            agents_results["market_sentiment"] = self.market_sentiment_agent(stock_info, sentiment_data)
-
+            tasks.append(("market_sentiment", lambda: self.market_sentiment_agent(stock_info, sentiment_data)))
         # 新闻分析（传入新闻数据）
         if enabled_analysts.get('news', False):
-            agents_results["news"] = self.news_analyst_agent(stock_info, news_data)
+            tasks.append(("news", lambda: self.news_analyst_agent(stock_info, news_data)))
+
+        if max_concurrency is None:
+            max_concurrency = ANALYST_MAX_CONCURRENCY
+        if agent_timeout is None:
+            agent_timeout = ANALYST_TIMEOUT
+
+        tasks = [(key, self._streaming(key, func)) for key, func in tasks]
+
+        if max_concurrency <= 1 or len(tasks) <= 1:
+            agents_results = {}
+            if cancel_event is not None:
+                self.deepseek_client.set_cancel_check(cancel_event.is_set)
+            try:
+                for key, func in tasks:
+                    agents_results[key] = func()
+                    self._flush_stream()
+            finally:
+                self.deepseek_client.set_cancel_check(None)
+        else:
+            agents_results = self._run_agents_concurrently(tasks, max_concurrency, agent_timeout, cancel_event)
 
         self._update_progress("✅ 所有已选择的分析师完成分析")
         self._update_progress("=" * 50)
 
         return agents_results
-    
+
+    def _run_agents_concurrently(self, tasks, max_concurrency: int, agent_timeout: float,
+                                 cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        在线程池中并行运行分析师，按任务顺序返回结果
+
+        超时或取消的分析师立即以占位结果返回；其执行线程中的大模型调用通过取消检查在下一段流式增量时
+        关闭连接，排队中的分析师不再开始
+        """
+        self._update_progress(f"⚡ 并行运行 {len(tasks)} 位分析师（最大并发 {max_concurrency}）...")
+
+        results = {}
+        started = {}
+        stop_events = {key: threading.Event() for key, _ in tasks}
+
+        def run_task(key, func):
+            started[key] = time.time()
+            self.deepseek_client.set_cancel_check(stop_events[key].is_set)
+            try:
+                return func()
+            finally:
+                self.deepseek_client.set_cancel_check(None)
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_concurrency, len(tasks)),
+            thread_name_prefix='analyst'
+        )
+        self._progress_owner = threading.get_ident()
+        try:
+            future_to_key = {executor.submit(run_task, key, func): key for key, func in tasks}
+            pending = set(future_to_key)
+
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=0.5, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                self._flush_progress()
+
+                for future in done:
+                    key = future_to_key[future]
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:
+                        results[key] = self._placeholder_result(key, f"分析失败: {str(e)}")
+
+                if cancel_event is not None and cancel_event.is_set():
+                    expired, reason = set(pending), "分析已取消"
+                else:
+                    # 超时从分析师真正开始执行时计算，排队中的不计时
+                    now = time.time()
+                    expired = {
+                        f for f in pending
+                        if future_to_key[f] in started and now - started[future_to_key[f]] > agent_timeout
+                    }
+                    reason = f"分析超时（{agent_timeout:g}秒）"
+
+                for future in expired:
+                    key = future_to_key[future]
+                    # 未开始的任务直接取消；执行中的任务通知其大模型调用停止
+                    future.cancel()
+                    stop_events[key].set()
+                    results[key] = self._placeholder_result(key, reason)
+                    self._update_progress(f"   ⚠️ {ANALYST_PROFILES[key][0]}{reason}")
+                pending -= expired
+        finally:
+            for event in stop_events.values():
+                event.set()
+            self._progress_owner = None
+            self._flush_progress()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return {key: results[key] for key, _ in tasks}
+
+    def _placeholder_result(self, key: str, reason: str) -> Dict[str, Any]:
+        """生成与正常结果同结构的占位结果"""
+        agent_name, agent_role = ANALYST_PROFILES[key]
+        return {
+            "agent_name": agent_name,
+            "agent_role": agent_role,
+            "analysis": f"⚠️ {agent_name}{reason}，未生成报告",
+            "focus_areas": [],
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
     def conduct_team_discussion(self, agents_results: Dict[str, Any], stock_info: Dict) -> str:
         """进行团队讨论"""
         self._update_progress("🤝 分析团队正在进行综合讨论...")
@@ -538,7 +736,10 @@ class StockAnalysisAgents:
             {"role": "user", "content": discussion_prompt}
         ]
         
-        discussion_result = self.deepseek_client.call_api(messages, max_tokens=6000)
+        discussion_result = self._streaming(
+            "team_discussion", lambda: self.deepseek_client.call_api(messages, max_tokens=6000)
+        )()
+        self._flush_stream()
 
         self._update_progress("✅ 团队讨论完成")
         return discussion_result
@@ -0,0 +1,185 @@
+"""
+个股分析数据预取
+在获取行情与技术指标之后，并发拉取财务、季报、资金流向、市场情绪、新闻和风险数据
+
+@File: analysis_data_prefetch.py
+@Contains: [build_prefetch_tasks, iter_prefetch, prefetch_analysis_data, DEFAULT_SOURCE_TIMEOUTS]
+@Responsibilities:
+    - 按分析师启用状态构建各数据源的获取任务
+    - 在线程池中并发执行任务，逐个返回完成结果
+    - 为每个数据源设置独立超时
+@Non-Responsibilities:
+    - 不负责行情与技术指标获取（所有任务都依赖它，由调用方先行获取）
+    - 不负责UI展示（结果在调用线程中逐个返回，由调用方更新进度）
+@Input: 股票代码、历史行情数据、分析师启用配置
+@Output: 各数据源的获取结果字典
+"""
+
+import time
+import concurrent.futures
+
+from stock_data import StockDataFetcher
+
+
+# 各数据源的默认超时（秒）
+DEFAULT_SOURCE_TIMEOUTS = {
+    'financial': 60,
+    'quarterly': 60,
+    'fund_flow': 60,
+    'sentiment': 90,
+    'news': 60,
+    'risk': 90,
+}
+
+# 数据源显示名称
+SOURCE_LABELS = {
+    'financial': '财务数据',
+    'quarterly': '季报数据',
+    'fund_flow': '资金流向',
+    'sentiment': '市场情绪',
+    'news': '新闻数据',
+    'risk': '风险数据',
+}
+
+
+def _fetch_financial(symbol):
+    return StockDataFetcher().get_financial_data(symbol)
+
+
+def _fetch_quarterly(symbol):
+    from quarterly_report_data import QuarterlyReportDataFetcher
+    return QuarterlyReportDataFetcher().get_quarterly_reports(symbol)
+
+
+def _fetch_fund_flow(symbol):
+    from fund_flow_akshare import FundFlowAkshareDataFetcher
+    return FundFlowAkshareDataFetcher().get_fund_flow_data(symbol)
+
+
+def _fetch_sentiment(symbol, stock_data):
+    from market_sentiment_data import MarketSentimentDataFetcher
+    return MarketSentimentDataFetcher().get_market_sentiment_data(symbol, stock_data)
+
+
+def _fetch_news(symbol):
+    from qstock_news_data import QStockNewsDataFetcher
+    return QStockNewsDataFetcher().get_stock_news(symbol)
+
+
+def _fetch_risk(symbol):
+    return StockDataFetcher().get_risk_data(symbol)
+
+
+def build_prefetch_tasks(symbol, stock_data, enabled_analysts):
+    """
+    根据分析师启用状态构建数据获取任务
+
+    财务数据总是获取；季报、资金流向、市场情绪、新闻、风险数据仅对A股且启用了对应分析师时获取
+
+    Args:
+        symbol: 股票代码
+        stock_data: 历史行情数据（市场情绪计算ARBR时复用）
+        enabled_analysts: 分析师启用字典
+
+    Returns:
+        dict: 数据源名称 -> 无参可调用对象
+    """
+    tasks = {'financial': lambda: _fetch_financial(symbol)}
+
+    if not StockDataFetcher()._is_chinese_stock(symbol):
+        return tasks
+
+    if enabled_analysts.get('fundamental', True):
+        tasks['quarterly'] = lambda: _fetch_quarterly(symbol)
+    if enabled_analysts.get('fund_flow', True):
+        tasks['fund_flow'] = lambda: _fetch_fund_flow(symbol)
+    if enabled_analysts.get('sentiment', False):
+        tasks['sentiment'] = lambda: _fetch_sentiment(symbol, stock_data)
+    if enabled_analysts.get('news', False):
+        tasks['news'] = lambda: _fetch_news(symbol)
+    if enabled_analysts.get('risk', True):
+        tasks['risk'] = lambda: _fetch_risk(symbol)
+
+    return tasks
+
+
+def iter_prefetch(tasks, timeouts=None, max_workers=None):
+    """
+    并发执行数据获取任务，按完成顺序逐个返回结果
+
+    结果在调用线程中产出，调用方可以直接更新Streamlit进度；
+    超时的任务返回TimeoutError，其后台线程不再等待
+
+    Args:
+        tasks: 数据源名称 -> 无参可调用对象
+        timeouts: 数据源名称 -> 超时秒数（缺省使用DEFAULT_SOURCE_TIMEOUTS）
+        max_workers: 最大并发数（默认等于任务数）
+
+    Yields:
+        tuple: (数据源名称, 结果, 异常或None, 耗时秒数)
+    """
+    if not tasks:
+        return
+
+    timeouts = {**DEFAULT_SOURCE_TIMEOUTS, **(timeouts or {})}
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers or len(tasks),
+        thread_name_prefix='prefetch'
+    )
+    start = time.time()
+    future_to_name = {executor.submit(func): name for name, func in tasks.items()}
+    deadlines = {
+        future: start + timeouts.get(name, 60)
+        for future, name in future_to_name.items()
+    }
+    pending = set(future_to_name)
+
+    try:
+        while pending:
+            wait_time = max(0, min(deadlines[f] for f in pending) - time.time())
+            done, pending = concurrent.futures.wait(
+                pending, timeout=wait_time, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                name = future_to_name[future]
+                try:
+                    yield name, future.result(), None, time.time() - start
+                except Exception as e:
+                    yield name, None, e, time.time() - start
+
+            now = time.time()
+            expired = {f for f in pending if deadlines[f] <= now}
+            for future in expired:
+                name = future_to_name[future]
+                future.cancel()
+                yield name, None, TimeoutError(f"{SOURCE_LABELS.get(name, name)}获取超时（{timeouts.get(name, 60)}秒）"), now - start
+            pending -= expired
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def prefetch_analysis_data(symbol, stock_data, enabled_analysts, timeouts=None):
+    """
+    并发获取个股分析所需的全部辅助数据
+
+    Args:
+        symbol: 股票代码
+        stock_data: 历史行情数据
+        enabled_analysts: 分析师启用字典
+        timeouts: 数据源名称 -> 超时秒数
+
+    Returns:
+        dict: 数据源名称 -> 结果（失败或未启用为None）
+    """
+    results = {name: None for name in DEFAULT_SOURCE_TIMEOUTS}
+    tasks = build_prefetch_tasks(symbol, stock_data, enabled_analysts)
+
+    for name, data, error, elapsed in iter_prefetch(tasks, timeouts):
+        if error is not None:
+            print(f"[预取] ⚠️ {symbol} {SOURCE_LABELS.get(name, name)}失败（{elapsed:.1f}s）: {error}")
+            continue
+        results[name] = data
+        print(f"[预取] ✅ {symbol} {SOURCE_LABELS.get(name, name)}完成（{elapsed:.1f}s）")
+
+    return results
@@ -11,9 +11,11 @@ import os
 from model_config import model_options
 
 from stock_data import StockDataFetcher
-from ai_agents import StockAnalysisAgents
+from ai_agents import StockAnalysisAgents, ANALYST_PROFILES
+from analysis_data_prefetch import build_prefetch_tasks, iter_prefetch, prefetch_analysis_data, SOURCE_LABELS
 from pdf_generator import display_pdf_export_section
 from database import db
+from llm_response_cache import llm_response_cache
 from monitor_manager import display_monitor_manager, get_monitor_summary
 from monitor_service import monitor_service
 from notification_service import notification_service
@@ -438,6 +440,14 @@ def main():
         except:
             pass
 
+        if llm_response_cache.enabled:
+            cache_stats = llm_response_cache.stats()
+            st.markdown(f"**LLM缓存**: {cache_stats['entries']}条")
+            st.caption(
+                f"本次命中 {cache_stats['session_hits']} / 未命中 {cache_stats['session_misses']}，"
+                f"累计命中 {cache_stats['total_hits']} / 未命中 {cache_stats['total_misses']}"
+            )
+
         st.markdown("---")
 
         # 分析参数设置
@@ -558,11 +568,15 @@ def main():
 
     else:
         # 批量股票分析界面
+        display_unfinished_batch_jobs()
+        display_market_screener()
+
         stock_input = st.text_area(
             "🔍 请输入多个股票代码（每行一个或用逗号分隔）",
             placeholder="例如:\n000001\n600036\n00700\n\n或者: 000001, 600036, 00700, AAPL",
             height=120,
-            help="支持多种格式：每行一个代码或用逗号分隔。支持A股、港股、美股"
+            help="支持多种格式：每行一个代码或用逗号分隔。支持A股、港股、美股",
+            key="batch_stock_input"
         )
 
         col1, col2, col3 = st.columns(3)
@@ -758,6 +772,91 @@ def get_stock_data(symbol, period):
 
     return stock_info, stock_data_with_indicators, indicators
 
+def display_unfinished_batch_jobs():
+    """显示未完成的批量分析任务：仍在后台执行的任务只显示进度，已中断的任务支持续跑"""
+    from batch_job_db import batch_job_db
+
+    jobs = batch_job_db.get_unfinished_jobs('homepage', limit=5, include_active=True)
+    if not jobs:
+        return
+
+    with st.expander(f"♻️ 未完成的批量分析任务（{len(jobs)}个）", expanded=True):
+        for job in jobs:
+            params = job['params']
+            col1, col2, col3 = st.columns([4, 1, 1])
+            with col1:
+                st.markdown(
+                    f"**任务 #{job['id']}** · {job['created_at']} · {params.get('batch_mode', '')} · "
+                    f"已完成 {job['done']}/{job['total']}，失败 {job['failed']}"
+                )
+                st.caption(', '.join(job['symbols']))
+            if job['active']:
+                # 页面重跑后流水线仍在后台执行，结果会继续写入检查点
+                with col2:
+                    st.caption("⏳ 后台执行中")
+                continue
+            with col2:
+                resume = st.button("▶️ 继续", key=f"resume_batch_job_{job['id']}", width='stretch')
+            with col3:
+                if st.button("🗑️ 放弃", key=f"cancel_batch_job_{job['id']}", width='stretch'):
+                    batch_job_db.finish_job(job['id'], status='cancelled')
+                    st.rerun()
+
+            if resume:
+                if 'batch_analysis_results' in st.session_state:
+                    del st.session_state.batch_analysis_results
+                run_batch_analysis(job['symbols'], params.get('period', '1y'),
+                                   params.get('batch_mode', '顺序分析'), job_id=job['id'])
+
+def display_market_screener():
+    """全市场技术选股：筛选结果填入批量分析的股票列表"""
+    from market_screener import market_panel, market_screener, PRESET_CONDITIONS
+
+    with st.expander("📈 技术选股（全市场A股）", expanded=False):
+        selected = st.multiselect(
+            "筛选条件（同时满足）",
+            list(PRESET_CONDITIONS),
+            default=['macd_golden_cross', 'volume_spike'],
+            format_func=lambda key: PRESET_CONDITIONS[key][0]
+        )
+        custom = st.text_input(
+            "自定义条件（可选，分号分隔）",
+            placeholder="例如: rsi6 < 30; close > ma20; kdj_k cross_above kdj_d",
+            help="格式：字段 运算符 字段/数值。字段：close、change_pct、ma5/ma20/ma60、macd_dif/macd_dea、"
+                 "rsi6/rsi12/rsi24、kdj_k/kdj_d/kdj_j、boll_upper/boll_mid/boll_lower、volume_ratio"
+        )
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            limit = st.number_input("最多候选数", min_value=5, max_value=200, value=30, step=5)
+        with col2:
+            if st.button("🔄 刷新行情面板", width='stretch'):
+                with st.spinner("正在更新全市场行情面板..."):
+                    market_panel.refresh()
+        with col3:
+            if st.button("🔍 筛选", type="primary", width='stretch'):
+                conditions = selected + [c.strip() for c in custom.split(';') if c.strip()]
+                if not conditions:
+                    st.warning("请至少选择一个筛选条件")
+                else:
+                    try:
+                        result = market_screener.screen(conditions, limit=int(limit))
+                        st.session_state.screener_result = result
+                        st.session_state.batch_stock_input = '\n'.join(result['code'])
+                    except ValueError as e:
+                        st.error(str(e))
+
+        symbols, dates = market_panel.shape
+        if not symbols:
+            st.info("行情面板为空，请先点击「刷新行情面板」（基于本地历史缓存与全市场实时快照）")
+        else:
+            st.caption(f"行情面板：{symbols} 只股票 × {dates} 个交易日")
+
+        result = st.session_state.get('screener_result')
+        if result is not None:
+            st.caption(f"交易日 {result.attrs.get('trade_date')}，{len(result)} 只候选股票已填入下方列表")
+            st.dataframe(result, width='stretch', hide_index=True)
+
 def parse_stock_list(stock_input):
     """解析股票代码列表
 
@@ -800,165 +899,240 @@ def parse_stock_list(stock_input):
 
     return unique_list
 
-def analyze_single_stock_for_batch(symbol, period, enabled_analysts_config=None, selected_model='qwen3.5-plus'):
-    """单个股票分析（用于批量分析）
+# 批量分析流水线阶段名称
+BATCH_STAGE_LABELS = {
+    'fetch': '数据获取',
+    'analysts': '分析师分析',
+    'decision': '讨论与决策',
+}
+
+def default_analysts_config():
+    """批量分析默认启用的分析师"""
+    return {
+        'technical': True,
+        'fundamental': True,
+        'fund_flow': True,
+        'risk': True,
+        'sentiment': False,
+        'news': False
+    }
 
-    Args:
-        symbol: 股票代码
-        period: 数据周期
-        enabled_analysts_config: 分析师配置字典
-        selected_model: 选择的AI模型
+def fetch_stock_for_batch(symbol, period, enabled_analysts_config):
+    """批量分析阶段一：获取行情及各分析师所需数据（不调用大模型）
 
-    返回分析结果或错误信息
+    Returns:
+        dict: 分析上下文；数据获取失败时返回 success=False 的结果
     """
-    try:
-        # 使用默认配置
-        if enabled_analysts_config is None:
-            enabled_analysts_config = {
-                'technical': True,
-                'fundamental': True,
-                'fund_flow': True,
-                'risk': True,
-                'sentiment': False,
-                'news': False
-            }
+    # 1. 获取股票数据
+    stock_info, stock_data, indicators = get_stock_data(symbol, period)
+
+    if "error" in stock_info:
+        return {"symbol": symbol, "error": stock_info['error'], "success": False}
+
+    if stock_data is None:
+        return {"symbol": symbol, "error": "无法获取股票历史数据", "success": False}
+
+    # 2. 并发获取财务、季报、资金流向、市场情绪、新闻和风险数据
+    prefetched = prefetch_analysis_data(symbol, stock_data, enabled_analysts_config)
+
+    return {
+        "symbol": symbol,
+        "period": period,
+        "enabled_analysts_config": enabled_analysts_config,
+        "stock_info": stock_info,
+        "stock_data": stock_data,
+        "indicators": indicators,
+        "prefetched": prefetched,
+    }
 
-        # 1. 获取股票数据
-        stock_info, stock_data, indicators = get_stock_data(symbol, period)
+def run_analysts_for_batch(context, selected_model):
+    """批量分析阶段二：运行多智能体分析"""
+    prefetched = context.pop('prefetched')
+    agents = StockAnalysisAgents(model=selected_model)
 
-        if "error" in stock_info:
-            return {"symbol": symbol, "error": stock_info['error'], "success": False}
+    context['agents_results'] = agents.run_multi_agent_analysis(
+        context['stock_info'], context.pop('stock_data'), context['indicators'], prefetched['financial'],
+        prefetched['fund_flow'], prefetched['sentiment'], prefetched['news'], prefetched['quarterly'],
+        prefetched['risk'],
+        enabled_analysts=context['enabled_analysts_config']
+    )
+    context['agents'] = agents
+    return context
 
-        if stock_data is None:
-            return {"symbol": symbol, "error": "无法获取股票历史数据", "success": False}
+def decide_stock_for_batch(context):
+    """批量分析阶段三：团队讨论、最终决策并保存到数据库
 
-        # 2. 获取财务数据
-        fetcher = StockDataFetcher()
-        financial_data = fetcher.get_financial_data(symbol)
+    Returns:
+        dict: 批量分析结果
+    """
+    symbol = context['symbol']
+    stock_info = context['stock_info']
+    indicators = context['indicators']
+    agents_results = context['agents_results']
+    agents = context['agents']
 
-        # 2.5 获取季报数据（仅A股）
-        quarterly_data = None
-        enable_fundamental = enabled_analysts_config.get('fundamental', True)
-        if enable_fundamental and fetcher._is_chinese_stock(symbol):
-            try:
-                from quarterly_report_data import QuarterlyReportDataFetcher
-                quarterly_fetcher = QuarterlyReportDataFetcher()
-                quarterly_data = quarterly_fetcher.get_quarterly_reports(symbol)
-            except:
-                pass
+    # 团队讨论
+    discussion_result = agents.conduct_team_discussion(agents_results, stock_info)
 
-        # 获取分析师选择状态（从参数而不是session_state）
-        enable_fund_flow = enabled_analysts_config.get('fund_flow', True)
-        enable_sentiment = enabled_analysts_config.get('sentiment', False)
-        enable_news = enabled_analysts_config.get('news', False)
+    # 最终决策
+    final_decision = agents.make_final_decision(discussion_result, stock_info, indicators)
 
-        # 3. 获取资金流向数据（akshare数据源，可选）
-        fund_flow_data = None
-        if enable_fund_flow and fetcher._is_chinese_stock(symbol):
-            try:
-                from fund_flow_akshare import FundFlowAkshareDataFetcher
-                fund_flow_fetcher = FundFlowAkshareDataFetcher()
-                fund_flow_data = fund_flow_fetcher.get_fund_flow_data(symbol)
-            except:
-                pass
+    # 保存到数据库
+    saved_to_db = False
+    db_error = None
+    try:
+        record_id = db.save_analysis(
+            symbol=stock_info.get('symbol', ''),
+            stock_name=stock_info.get('name', ''),
+            period=context['period'],
+            stock_info=stock_info,
+            agents_results=agents_results,
+            discussion_result=discussion_result,
+            final_decision=final_decision
+        )
+        saved_to_db = True
+        print(f"✅ {symbol} 成功保存到数据库，记录ID: {record_id}")
+    except Exception as e:
+        db_error = str(e)
+        print(f"❌ {symbol} 保存到数据库失败: {db_error}")
+
+    return {
+        "symbol": symbol,
+        "success": True,
+        "stock_info": stock_info,
+        "indicators": indicators,
+        "agents_results": agents_results,
+        "discussion_result": discussion_result,
+        "final_decision": final_decision,
+        "saved_to_db": saved_to_db,
+        "db_error": db_error
+    }
 
-        # 4. 获取市场情绪数据（可选）
-        sentiment_data = None
-        if enable_sentiment and fetcher._is_chinese_stock(symbol):
-            try:
-                from market_sentiment_data import MarketSentimentDataFetcher
-                sentiment_fetcher = MarketSentimentDataFetcher()
-                sentiment_data = sentiment_fetcher.get_market_sentiment_data(symbol, stock_data)
-            except:
-                pass
+def build_batch_pipeline(period, enabled_analysts_config=None, selected_model='qwen3.5-plus', parallel=True,
+                         max_workers=None, job_id=None):
+    """构建批量分析流水线：数据获取 → 分析师分析 → 讨论与决策
 
-        # 5. 获取新闻数据（qstock数据源，可选）
-        news_data = None
-        if enable_news and fetcher._is_chinese_stock(symbol):
-            try:
-                from qstock_news_data import QStockNewsDataFetcher
-                news_fetcher = QStockNewsDataFetcher()
-                news_data = news_fetcher.get_stock_news(symbol)
-            except:
-                pass
+    股票N等待大模型时，股票N+1的数据已在获取；分析师与决策阶段共用一个并发名额
 
-        # 5.5 获取风险数据（限售解禁、大股东减持、重要事件，可选）
-        risk_data = None
-        enable_risk = enabled_analysts_config.get('risk', True)
-        if enable_risk and fetcher._is_chinese_stock(symbol):
+    Args:
+        period: 数据周期
+        enabled_analysts_config: 分析师配置字典
+        selected_model: 选择的AI模型
+        parallel: True使用共享的自适应并发控制器，False同一时间只有一只股票调用大模型
+        max_workers: 并行模式下同时调用大模型的股票数上限（默认为控制器上限）
+        job_id: 批量任务ID，指定时每完成一只股票立即写入检查点（页面重跑或进程中断后可续跑），全部完成后结束任务
+
+    Returns:
+        BatchPipeline: 流水线（map的输入为股票代码列表）
+    """
+    from batch_executor import AdaptiveConcurrency, BatchPipeline, batch_concurrency
+
+    if enabled_analysts_config is None:
+        enabled_analysts_config = default_analysts_config()
+    controller = batch_concurrency if parallel else AdaptiveConcurrency(initial=1, max_limit=1)
+    llm_workers = min(max_workers or controller.max_limit, controller.max_limit)
+
+    def guarded(func):
+        """阶段函数异常转换为失败结果（保持与逐只分析一致的返回格式）"""
+        def run(payload):
             try:
-                risk_data = fetcher.get_risk_data(symbol)
-            except:
-                pass
+                return func(payload)
+            except Exception as e:
+                symbol = payload['symbol'] if isinstance(payload, dict) else payload
+                return {"symbol": symbol, "error": str(e), "success": False}
+        return run
+
+    stages = [
+        (BATCH_STAGE_LABELS['fetch'],
+         guarded(lambda symbol: fetch_stock_for_batch(symbol, period, enabled_analysts_config)), 2, False),
+        (BATCH_STAGE_LABELS['analysts'],
+         guarded(lambda context: run_analysts_for_batch(context, selected_model)), llm_workers, True),
+        (BATCH_STAGE_LABELS['decision'], guarded(decide_stock_for_batch), llm_workers, True),
+    ]
+    if job_id is not None:
+        from batch_job_db import batch_job_db
+
+        def on_result(symbol, result, error):
+            if error is not None:
+                result = {"symbol": symbol, "error": str(error), "success": False}
+            batch_job_db.record_result(job_id, symbol, result, success=bool(result.get('success')),
+                                       error=result.get('error'))
+
+        # 由流水线在最后一只股票记录后结束任务（页面重跑后调用方不再读取结果，任务仍会正常结束）
+        def on_finish():
+            batch_job_db.finish_job(job_id)
+    else:
+        on_result = on_finish = None
 
-        # 6. 初始化AI分析系统
-        agents = StockAnalysisAgents(model=selected_model)
+    return BatchPipeline(stages, controller=controller, on_result=on_result, on_finish=on_finish,
+                         name='batch_analysis')
 
-        # 使用传入的分析师配置
-        enabled_analysts = enabled_analysts_config
+def analyze_single_stock_for_batch(symbol, period, enabled_analysts_config=None, selected_model='qwen3.5-plus'):
+    """单个股票分析（用于批量分析）
 
-        # 7. 运行多智能体分析
-        agents_results = agents.run_multi_agent_analysis(
-            stock_info, stock_data, indicators, financial_data,
-            fund_flow_data, sentiment_data, news_data, quarterly_data, risk_data,
-            enabled_analysts=enabled_analysts_config
-        )
+    Args:
+        symbol: 股票代码
+        period: 数据周期
+        enabled_analysts_config: 分析师配置字典
+        selected_model: 选择的AI模型
 
-        # 8. 团队讨论
-        discussion_result = agents.conduct_team_discussion(agents_results, stock_info)
+    返回分析结果或错误信息
+    """
+    try:
+        # 使用默认配置
+        if enabled_analysts_config is None:
+            enabled_analysts_config = default_analysts_config()
 
-        # 9. 最终决策
-        final_decision = agents.make_final_decision(discussion_result, stock_info, indicators)
+        context = fetch_stock_for_batch(symbol, period, enabled_analysts_config)
+        if context.get('success') is False:
+            return context
 
-        # 保存到数据库
-        saved_to_db = False
-        db_error = None
-        try:
-            record_id = db.save_analysis(
-                symbol=stock_info.get('symbol', ''),
-                stock_name=stock_info.get('name', ''),
-                period=period,
-                stock_info=stock_info,
-                agents_results=agents_results,
-                discussion_result=discussion_result,
-                final_decision=final_decision
-            )
-            saved_to_db = True
-            print(f"✅ {symbol} 成功保存到数据库，记录ID: {record_id}")
-        except Exception as e:
-            db_error = str(e)
-            print(f"❌ {symbol} 保存到数据库失败: {db_error}")
-
-        return {
-            "symbol": symbol,
-            "success": True,
-            "stock_info": stock_info,
-            "indicators": indicators,
-            "agents_results": agents_results,
-            "discussion_result": discussion_result,
-            "final_decision": final_decision,
-            "saved_to_db": saved_to_db,
-            "db_error": db_error
-        }
+        context = run_analysts_for_batch(context, selected_model)
+        return decide_stock_for_batch(context)
 
     except Exception as e:
         return {"symbol": symbol, "error": str(e), "success": False}
 
-def run_batch_analysis(stock_list, period, batch_mode="顺序分析"):
-    """运行批量股票分析"""
-    import concurrent.futures
-    import threading
-
-    # 在开始分析前获取配置（从session_state）
-    enabled_analysts_config = {
-        'technical': st.session_state.get('enable_technical', True),
-        'fundamental': st.session_state.get('enable_fundamental', True),
-        'fund_flow': st.session_state.get('enable_fund_flow', True),
-        'risk': st.session_state.get('enable_risk', True),
-        'sentiment': st.session_state.get('enable_sentiment', False),
-        'news': st.session_state.get('enable_news', False)
-    }
-    selected_model = st.session_state.get('selected_model', 'qwen3.5-plus')
+def run_batch_analysis(stock_list, period, batch_mode="顺序分析", job_id=None):
+    """运行批量股票分析
+
+    Args:
+        stock_list: 股票代码列表
+        period: 数据周期
+        batch_mode: 批量模式（顺序分析 / 多线程并行）
+        job_id: 续跑的批量任务ID；为None时创建新任务。续跑时沿用任务参数，只分析尚未成功的股票
+                （任务仍在执行时不续跑）
+    """
+    from batch_executor import batch_concurrency
+    from batch_job_db import batch_job_db
+
+    if job_id is None:
+        # 在开始分析前获取配置（从session_state）
+        enabled_analysts_config = {
+            'technical': st.session_state.get('enable_technical', True),
+            'fundamental': st.session_state.get('enable_fundamental', True),
+            'fund_flow': st.session_state.get('enable_fund_flow', True),
+            'risk': st.session_state.get('enable_risk', True),
+            'sentiment': st.session_state.get('enable_sentiment', False),
+            'news': st.session_state.get('enable_news', False)
+        }
+        selected_model = st.session_state.get('selected_model', 'qwen3.5-plus')
+        job_id = batch_job_db.create_job('homepage', stock_list, {
+            'period': period,
+            'batch_mode': batch_mode,
+            'enabled_analysts_config': enabled_analysts_config,
+            'selected_model': selected_model,
+        })
+        done_results = []
+    else:
+        if not batch_job_db.claim_job(job_id):
+            st.warning(f"⚠️ 任务 #{job_id} 仍在执行或已结束，无需续跑")
+            return
+        params = batch_job_db.get_job(job_id)['params']
+        enabled_analysts_config = params['enabled_analysts_config']
+        selected_model = params['selected_model']
+        done_results = [result for _, _, result, _ in batch_job_db.get_results(job_id)]
+    st.session_state.batch_job_id = job_id
 
     # 创建进度显示
     st.subheader(f"📊 批量分析进行中 ({batch_mode})")
@@ -966,87 +1140,38 @@ def run_batch_analysis(stock_list, period, batch_mode="顺序分析"):
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    # 存储结果
-    results = []
+    # 存储结果（续跑时包含已完成的股票）
+    results = list(done_results)
     total = len(stock_list)
-
-    if batch_mode == "多线程并行":
-        # 多线程并行分析
-        status_text.text(f"🚀 使用多线程并行分析 {total} 只股票...")
-
-        # 创建线程锁用于更新进度
-        lock = threading.Lock()
-        completed = [0]  # 使用列表以便在闭包中修改
-        progress_status = [{}]  # 存储进度状态
-
-        def analyze_with_progress(symbol):
-            """包装分析函数，不在线程中访问Streamlit上下文"""
-            try:
-                result = analyze_single_stock_for_batch(symbol, period, enabled_analysts_config, selected_model)
-                with lock:
-                    completed[0] += 1
-                    progress_status[0][symbol] = result
-                return result
-            except Exception as e:
-                with lock:
-                    completed[0] += 1
-                    error_result = {"symbol": symbol, "error": str(e), "success": False}
-                    progress_status[0][symbol] = error_result
-                return error_result
-
-        # 使用线程池执行，限制最大并发数为3以避免API限流
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_symbol = {executor.submit(analyze_with_progress, symbol): symbol
-                              for symbol in stock_list}
-
-            for future in concurrent.futures.as_completed(future_to_symbol):
-                symbol = future_to_symbol[future]
-                try:
-                    result = future.result(timeout=300)  # 5分钟超时
-                    results.append(result)
-
-                    # 在主线程中更新UI
-                    progress = len(results) / total
-                    progress_bar.progress(progress)
-
-                    if result['success']:
-                        status_text.text(f"✅ [{len(results)}/{total}] {symbol} 分析完成")
-                    else:
-                        status_text.text(f"❌ [{len(results)}/{total}] {symbol} 分析失败: {result.get('error', '未知错误')}")
-
-                except concurrent.futures.TimeoutError:
-                    results.append({"symbol": symbol, "error": "分析超时（5分钟）", "success": False})
-                    progress_bar.progress(len(results) / total)
-                    status_text.text(f"⏱️ [{len(results)}/{total}] {symbol} 分析超时")
-                except Exception as e:
-                    results.append({"symbol": symbol, "error": str(e), "success": False})
-                    progress_bar.progress(len(results) / total)
-                    status_text.text(f"❌ [{len(results)}/{total}] {symbol} 出现错误")
-
+    stock_list = batch_job_db.get_pending_symbols(job_id)
+    if done_results:
+        progress_bar.progress(len(results) / total)
+        st.info(f"♻️ 续跑任务 #{job_id}：已完成 {len(done_results)} 只，剩余 {len(stock_list)} 只")
+
+    # 流水线分析：数据获取与大模型调用重叠执行
+    parallel = batch_mode == "多线程并行"
+    pipeline = build_batch_pipeline(period, enabled_analysts_config, selected_model, parallel=parallel, job_id=job_id)
+    if parallel:
+        # 并发数由共享的自适应控制器根据限流、错误率与耗时动态调整
+        status_text.text(f"🚀 使用多线程并行分析 {len(stock_list)} 只股票（当前并发 {batch_concurrency.stats()['limit']}）...")
     else:
-        # 顺序分析
-        status_text.text(f"📝 按顺序分析 {total} 只股票...")
+        status_text.text(f"📝 按顺序分析 {len(stock_list)} 只股票（预取下一只股票数据）...")
 
-        for i, symbol in enumerate(stock_list, 1):
-            status_text.text(f"🔍 [{i}/{total}] 正在分析 {symbol}...")
+    for symbol, result, error in pipeline.map(stock_list):
+        if error is not None:
+            result = {"symbol": symbol, "error": str(error), "success": False}
+        results.append(result)
 
-            try:
-                result = analyze_single_stock_for_batch(symbol, period, enabled_analysts_config, selected_model)
-            except Exception as e:
-                result = {"symbol": symbol, "error": str(e), "success": False}
-
-            results.append(result)
-
-            # 更新进度
-            progress = i / total
-            progress_bar.progress(progress)
+        # 在主线程中更新UI
+        progress_bar.progress(len(results) / total)
+        concurrency = f"（当前并发 {batch_concurrency.stats()['limit']}）" if parallel else ""
 
-            if result['success']:
-                status_text.text(f"✅ [{i}/{total}] {symbol} 分析完成")
-            else:
-                status_text.text(f"❌ [{i}/{total}] {symbol} 分析失败: {result.get('error', '未知错误')}")
+        if result['success']:
+            status_text.text(f"✅ [{len(results)}/{total}] {symbol} 分析完成{concurrency}")
+        else:
+            status_text.text(f"❌ [{len(results)}/{total}] {symbol} 分析失败: {result.get('error', '未知错误')}")
 
-    # 完成
+    # 完成（任务已由流水线标记结束）
     progress_bar.progress(1.0)
 
     # 统计结果
@@ -1068,6 +1193,7 @@ def run_batch_analysis(stock_list, period, batch_mode="顺序分析"):
     # 保存结果到session_state
     st.session_state.batch_analysis_results = results
     st.session_state.batch_analysis_mode = batch_mode
+    st.session_state.batch_pipeline_stats = pipeline.stats()
 
     time.sleep(1)
     progress_bar.empty()
@@ -1075,6 +1201,59 @@ def run_batch_analysis(stock_list, period, batch_mode="顺序分析"):
     # 自动显示结果
     st.rerun()
 
+# 实时输出面板标题
+LIVE_OUTPUT_LABELS = {key: name for key, (name, _) in ANALYST_PROFILES.items()}
+LIVE_OUTPUT_LABELS['team_discussion'] = "团队讨论"
+
+def display_prefetch_result(name, data, error):
+    """显示单个数据源的预取结果"""
+    if error is not None:
+        st.warning(f"⚠️ 获取{SOURCE_LABELS.get(name, name)}时出错: {str(error)}")
+        return
+
+    if name == 'quarterly':
+        if data and data.get('data_success'):
+            income_count = data.get('income_statement', {}).get('periods', 0) if data.get('income_statement') else 0
+            balance_count = data.get('balance_sheet', {}).get('periods', 0) if data.get('balance_sheet') else 0
+            cash_flow_count = data.get('cash_flow', {}).get('periods', 0) if data.get('cash_flow') else 0
+            st.info(f"✅ 成功获取季报数据：利润表{income_count}期，资产负债表{balance_count}期，现金流量表{cash_flow_count}期")
+        else:
+            st.warning("⚠️ 未能获取季报数据，将基于基本财务数据分析")
+    elif name == 'fund_flow':
+        if data and data.get('data_success'):
+            days = data.get('fund_flow_data', {}).get('days', 0) if data.get('fund_flow_data') else 0
+            st.info(f"✅ 成功获取 {days} 个交易日的资金流向数据")
+        else:
+            st.warning("⚠️ 未能获取资金流向数据，将基于技术指标进行资金面分析")
+    elif name == 'sentiment':
+        if data and data.get('data_success'):
+            st.info("✅ 成功获取市场情绪数据（ARBR、换手率、涨跌停等）")
+        else:
+            st.warning("⚠️ 未能获取完整的市场情绪数据，将基于基本信息进行分析")
+    elif name == 'news':
+        if data and data.get('data_success'):
+            news_count = data.get('news_data', {}).get('count', 0) if data.get('news_data') else 0
+            st.info(f"✅ 成功从东方财富获取个股 {news_count} 条新闻")
+        else:
+            st.warning("⚠️ 未能获取新闻数据，将基于基本信息进行分析")
+    elif name == 'risk':
+        if data and data.get('data_success'):
+            # 统计获取到的风险数据类型
+            risk_types = []
+            if data.get('lifting_ban') and data['lifting_ban'].get('has_data'):
+                risk_types.append("限售解禁")
+            if data.get('shareholder_reduction') and data['shareholder_reduction'].get('has_data'):
+                risk_types.append("大股东减持")
+            if data.get('important_events') and data['important_events'].get('has_data'):
+                risk_types.append("重要事件")
+
+            if risk_types:
+                st.info(f"✅ 成功获取风险数据：{', '.join(risk_types)}")
+            else:
+                st.info("ℹ️ 暂无风险相关数据")
+        else:
+            st.info("ℹ️ 暂无风险相关数据，将基于基本信息进行风险分析")
+
 def run_stock_analysis(symbol, period):
     """运行股票分析"""
 
@@ -1105,127 +1284,52 @@ def run_stock_analysis(symbol, period):
         display_stock_chart(stock_data, stock_info)
         progress_bar.progress(30)
 
-        # 2. 获取财务数据
-        status_text.text("📊 正在获取财务数据...")
+        # 2. 并发获取财务、季报、资金流向、市场情绪、新闻和风险数据
         fetcher = StockDataFetcher()  # 创建fetcher实例
-        financial_data = fetcher.get_financial_data(symbol)
-        progress_bar.progress(35)
-
-        # 2.5 获取季报数据（仅在选择了基本面分析师且为A股时）
-        enable_fundamental = st.session_state.get('enable_fundamental', True)
-        quarterly_data = None
-        if enable_fundamental and fetcher._is_chinese_stock(symbol):
-            status_text.text("📊 正在获取季报数据（akshare数据源）...")
-            try:
-                from quarterly_report_data import QuarterlyReportDataFetcher
-                quarterly_fetcher = QuarterlyReportDataFetcher()
-                quarterly_data = quarterly_fetcher.get_quarterly_reports(symbol)
-                if quarterly_data and quarterly_data.get('data_success'):
-                    income_count = quarterly_data.get('income_statement', {}).get('periods', 0) if quarterly_data.get('income_statement') else 0
-                    balance_count = quarterly_data.get('balance_sheet', {}).get('periods', 0) if quarterly_data.get('balance_sheet') else 0
-                    cash_flow_count = quarterly_data.get('cash_flow', {}).get('periods', 0) if quarterly_data.get('cash_flow') else 0
-                    st.info(f"✅ 成功获取季报数据：利润表{income_count}期，资产负债表{balance_count}期，现金流量表{cash_flow_count}期")
-                else:
-                    st.warning("⚠️ 未能获取季报数据，将基于基本财务数据分析")
-            except Exception as e:
-                st.warning(f"⚠️ 获取季报数据时出错: {str(e)}")
-                quarterly_data = None
-        elif enable_fundamental and not fetcher._is_chinese_stock(symbol):
-            st.info("ℹ️ 美股暂不支持季报数据")
-        progress_bar.progress(37)
+        is_chinese = fetcher._is_chinese_stock(symbol)
 
         # 获取分析师选择状态
+        enable_fundamental = st.session_state.get('enable_fundamental', True)
         enable_fund_flow = st.session_state.get('enable_fund_flow', True)
         enable_sentiment = st.session_state.get('enable_sentiment', False)
         enable_news = st.session_state.get('enable_news', False)
-
-        # 3. 获取资金流向数据（仅在选择了资金面分析师时，使用akshare数据源）
-        fund_flow_data = None
-        if enable_fund_flow and fetcher._is_chinese_stock(symbol):
-            status_text.text("💰 正在获取资金流向数据（akshare数据源）...")
-            try:
-                from fund_flow_akshare import FundFlowAkshareDataFetcher
-                fund_flow_fetcher = FundFlowAkshareDataFetcher()
-                fund_flow_data = fund_flow_fetcher.get_fund_flow_data(symbol)
-                if fund_flow_data and fund_flow_data.get('data_success'):
-                    days = fund_flow_data.get('fund_flow_data', {}).get('days', 0) if fund_flow_data.get('fund_flow_data') else 0
-                    st.info(f"✅ 成功获取 {days} 个交易日的资金流向数据")
-                else:
-                    st.warning("⚠️ 未能获取资金流向数据，将基于技术指标进行资金面分析")
-            except Exception as e:
-                st.warning(f"⚠️ 获取资金流向数据时出错: {str(e)}")
-                fund_flow_data = None
-        elif enable_fund_flow and not fetcher._is_chinese_stock(symbol):
-            st.info("ℹ️ 美股暂不支持资金流向数据")
-        progress_bar.progress(40)
-
-        # 4. 获取市场情绪数据（仅在选择了市场情绪分析师时）
-        sentiment_data = None
-        if enable_sentiment and fetcher._is_chinese_stock(symbol):
-            status_text.text("📊 正在获取市场情绪数据（ARBR等指标）...")
-            try:
-                from market_sentiment_data import MarketSentimentDataFetcher
-                sentiment_fetcher = MarketSentimentDataFetcher()
-                sentiment_data = sentiment_fetcher.get_market_sentiment_data(symbol, stock_data)
-                if sentiment_data and sentiment_data.get('data_success'):
-                    st.info("✅ 成功获取市场情绪数据（ARBR、换手率、涨跌停等）")
-                else:
-                    st.warning("⚠️ 未能获取完整的市场情绪数据，将基于基本信息进行分析")
-            except Exception as e:
-                st.warning(f"⚠️ 获取市场情绪数据时出错: {str(e)}")
-                sentiment_data = None
-        elif enable_sentiment and not fetcher._is_chinese_stock(symbol):
-            st.info("ℹ️ 美股暂不支持市场情绪数据（ARBR等指标）")
-        progress_bar.progress(45)
-
-        # 5. 获取新闻数据（仅在选择了新闻分析师时，使用qstock数据源）
-        news_data = None
-        if enable_news and fetcher._is_chinese_stock(symbol):
-            status_text.text("📰 正在获取新闻数据...")
-            try:
-                from qstock_news_data import QStockNewsDataFetcher
-                news_fetcher = QStockNewsDataFetcher()
-                news_data = news_fetcher.get_stock_news(symbol)
-                if news_data and news_data.get('data_success'):
-                    news_count = news_data.get('news_data', {}).get('count', 0) if news_data.get('news_data') else 0
-                    st.info(f"✅ 成功从东方财富获取个股 {news_count} 条新闻")
-                else:
-                    st.warning("⚠️ 未能获取新闻数据，将基于基本信息进行分析")
-            except Exception as e:
-                st.warning(f"⚠️ 获取新闻数据时出错: {str(e)}")
-                news_data = None
-        elif enable_news and not fetcher._is_chinese_stock(symbol):
-            st.info("ℹ️ 美股暂不支持新闻数据")
-        progress_bar.progress(45)
-
-        # 5.5 获取风险数据（仅在选择了风险管理师时，使用问财数据源）
         enable_risk = st.session_state.get('enable_risk', True)
-        risk_data = None
-        if enable_risk and fetcher._is_chinese_stock(symbol):
-            status_text.text("⚠️ 正在获取风险数据（限售解禁、大股东减持、重要事件）...")
-            try:
-                risk_data = fetcher.get_risk_data(symbol)
-                if risk_data and risk_data.get('data_success'):
-                    # 统计获取到的风险数据类型
-                    risk_types = []
-                    if risk_data.get('lifting_ban') and risk_data['lifting_ban'].get('has_data'):
-                        risk_types.append("限售解禁")
-                    if risk_data.get('shareholder_reduction') and risk_data['shareholder_reduction'].get('has_data'):
-                        risk_types.append("大股东减持")
-                    if risk_data.get('important_events') and risk_data['important_events'].get('has_data'):
-                        risk_types.append("重要事件")
-
-                    if risk_types:
-                        st.info(f"✅ 成功获取风险数据：{', '.join(risk_types)}")
-                    else:
-                        st.info("ℹ️ 暂无风险相关数据")
-                else:
-                    st.info("ℹ️ 暂无风险相关数据，将基于基本信息进行风险分析")
-            except Exception as e:
-                st.warning(f"⚠️ 获取风险数据时出错: {str(e)}")
-                risk_data = None
-        elif enable_risk and not fetcher._is_chinese_stock(symbol):
-            st.info("ℹ️ 美股暂不支持风险数据（限售解禁、大股东减持等）")
+
+        if not is_chinese:
+            if enable_fundamental:
+                st.info("ℹ️ 美股暂不支持季报数据")
+            if enable_fund_flow:
+                st.info("ℹ️ 美股暂不支持资金流向数据")
+            if enable_sentiment:
+                st.info("ℹ️ 美股暂不支持市场情绪数据（ARBR等指标）")
+            if enable_news:
+                st.info("ℹ️ 美股暂不支持新闻数据")
+            if enable_risk:
+                st.info("ℹ️ 美股暂不支持风险数据（限售解禁、大股东减持等）")
+
+        prefetch_tasks = build_prefetch_tasks(symbol, stock_data, {
+            'fundamental': enable_fundamental,
+            'fund_flow': enable_fund_flow,
+            'sentiment': enable_sentiment,
+            'news': enable_news,
+            'risk': enable_risk
+        })
+        prefetched = {}
+        status_text.text(f"📊 正在并发获取 {len(prefetch_tasks)} 项数据（{'、'.join(SOURCE_LABELS[name] for name in prefetch_tasks)}）...")
+
+        # 每完成一个数据源推进一次进度（30% -> 50%）
+        for done_count, (name, data, error, elapsed) in enumerate(iter_prefetch(prefetch_tasks), 1):
+            prefetched[name] = None if error is not None else data
+            display_prefetch_result(name, prefetched[name], error)
+            progress_bar.progress(30 + int(20 * done_count / len(prefetch_tasks)))
+            status_text.text(f"✅ {SOURCE_LABELS[name]}已完成（{elapsed:.1f}秒），{done_count}/{len(prefetch_tasks)}")
+
+        financial_data = prefetched.get('financial')
+        quarterly_data = prefetched.get('quarterly')
+        fund_flow_data = prefetched.get('fund_flow')
+        sentiment_data = prefetched.get('sentiment')
+        news_data = prefetched.get('news')
+        risk_data = prefetched.get('risk')
         progress_bar.progress(50)
 
         # 6. 初始化AI分析系统
@@ -1237,13 +1341,24 @@ def run_stock_analysis(symbol, period):
         def update_progress(message):
             status_text.text(message)
 
-        agents = StockAnalysisAgents(model=selected_model, progress_callback=update_progress)
+        # 实时输出区域：分析师报告和团队讨论边生成边显示，完成后清除
+        live_output = st.empty()
+        live_panels = {}
+
+        def update_stream(key, text):
+            live_panels[key] = text
+            with live_output.container():
+                st.markdown("#### 📡 AI实时输出")
+                for panel_key, panel_text in live_panels.items():
+                    with st.expander(f"✍️ {LIVE_OUTPUT_LABELS.get(panel_key, panel_key)}", expanded=True):
+                        st.markdown(panel_text)
+
+        agents = StockAnalysisAgents(model=selected_model, progress_callback=update_progress,
+                                     stream_callback=update_stream)
         progress_bar.progress(55)
 
-        # 获取所有分析师选择状态
+        # 获取技术分析师选择状态
         enable_technical = st.session_state.get('enable_technical', True)
-        enable_fundamental = st.session_state.get('enable_fundamental', True)
-        enable_risk = st.session_state.get('enable_risk', True)
 
         # 创建分析师启用字典
         enabled_analysts = {
@@ -1262,6 +1377,8 @@ def run_stock_analysis(symbol, period):
             fund_flow_data, sentiment_data, news_data, quarterly_data, risk_data,
             enabled_analysts=enabled_analysts
         )
+        live_output.empty()
+        live_panels.clear()
         progress_bar.progress(75)
 
         # 显示各分析师报告
@@ -1269,6 +1386,7 @@ def run_stock_analysis(symbol, period):
 
         # 8. 团队讨论（进度通过回调更新）
         discussion_result = agents.conduct_team_discussion(agents_results, stock_info)
+        live_output.empty()
         progress_bar.progress(88)
 
         # 显示团队讨论
@@ -2496,6 +2614,22 @@ WEBHOOK_URL="{current_config.get('WEBHOOK_URL', '')}"
 WEBHOOK_KEYWORD="{current_config.get('WEBHOOK_KEYWORD', 'aiagents通知')}"
 """, language="bash")
 
+def display_pipeline_stats(stage_stats):
+    """显示批量分析流水线各阶段吞吐"""
+    if not stage_stats:
+        return
+
+    with st.expander("⚙️ 流水线各阶段吞吐", expanded=False):
+        df = pd.DataFrame(stage_stats).rename(columns={
+            'stage': '阶段',
+            'processed': '处理数',
+            'failed': '失败数',
+            'busy_time': '累计耗时(秒)',
+            'avg_time': '平均耗时(秒)',
+            'throughput': '吞吐(只/分钟)',
+        })
+        st.dataframe(df, width='stretch', hide_index=True)
+
 def display_batch_analysis_results(results, period):
     """显示批量分析结果（对比视图）"""
 
@@ -2522,6 +2656,8 @@ def display_batch_analysis_results(results, period):
     if saved_count > 0:
         st.info(f"💾 已有 {saved_count} 只股票的分析结果保存到历史记录，可在侧边栏点击「📖 历史记录」查看")
 
+    display_pipeline_stats(st.session_state.get('batch_pipeline_stats'))
+
     st.markdown("---")
 
     # 失败的股票列表
@@ -0,0 +1,302 @@
+"""
+自适应并发的批量任务执行器
+批量分析共享同一个AIMD并发控制器：运行健康时逐步增加并发，遇到限流、错误率升高或延迟变慢时成倍降低
+
+@File: batch_executor.py
+@Contains: [AdaptiveConcurrency, BatchPipeline, batch_concurrency]
+@Responsibilities:
+    - AIMD并发控制：成功且延迟正常时加性增加并发上限，限流/错误/变慢时乘性减少
+    - 通过rate_limiter的限流事件感知大模型429
+    - 多阶段流水线：各阶段由有界队列串联，数据获取与大模型调用重叠执行，统计各阶段吞吐
+    - 按完成顺序返回结果，调用方在主线程更新进度
+@Non-Responsibilities:
+    - 不负责具体的分析逻辑（由调用方传入任务函数）
+    - 不负责请求频率控制（由rate_limiter负责）
+@Input: 任务列表、任务函数
+@Output: 按完成顺序的 (任务, 结果, 异常) 序列、各阶段吞吐统计
+"""
+
+import os
+import queue
+import threading
+import time
+
+from rate_limiter import rate_limiter
+
+
+class AdaptiveConcurrency:
+    """AIMD并发上限控制器（线程安全，可被多个批量任务共享）"""
+
+    def __init__(self, initial=3, min_limit=1, max_limit=8, decrease_factor=0.5,
+                 latency_tolerance=2.0, error_threshold=0.3, cooldown=30.0, provider='llm'):
+        """
+        初始化控制器
+
+        Args:
+            initial: 初始并发上限
+            min_limit: 并发下限
+            max_limit: 并发上限的最大值
+            decrease_factor: 乘性减少系数
+            latency_tolerance: 单任务耗时超过平均耗时的倍数时视为变慢
+            error_threshold: 错误率（指数平均）超过该值时降低并发
+            cooldown: 两次降低之间的最短间隔（秒），避免同一波拥塞连续减半
+            provider: 监听限流事件的数据源名称
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.provider = provider
+
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+        self._avg_latency = None
+        self._samples = 0
+        self._error_rate = 0.0
+        self._throttles_seen = rate_limiter.throttle_count(provider)
+        self._last_decrease = 0.0
+
+        self.completed = 0
+        self.errors = 0
+        self.decreases = 0
+
+    def acquire(self):
+        """阻塞直到有空闲并发名额"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, success=True):
+        """
+        归还名额并根据本次结果调整并发上限
+
+        Args:
+            latency: 任务耗时（秒）
+            success: 任务是否成功
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self.completed += 1
+            self.errors += 0 if success else 1
+            self._error_rate = 0.8 * self._error_rate + 0.2 * (0 if success else 1)
+
+            throttles = rate_limiter.throttle_count(self.provider)
+            throttled = throttles > self._throttles_seen
+            self._throttles_seen = throttles
+
+            slow = (self._samples >= 3 and success
+                    and latency > self._avg_latency * self.latency_tolerance)
+            if success:
+                self._samples += 1
+                self._avg_latency = latency if self._avg_latency is None \
+                    else 0.8 * self._avg_latency + 0.2 * latency
+
+            reason = None
+            if throttled:
+                reason = '触发限流'
+            elif self._error_rate > self.error_threshold:
+                reason = f"错误率{self._error_rate:.0%}"
+            elif slow:
+                reason = f"耗时{latency:.0f}s超过平均{self._avg_latency:.0f}s的{self.latency_tolerance}倍"
+
+            now = time.time()
+            if reason:
+                if now - self._last_decrease >= self.cooldown:
+                    old = int(self.limit)
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.decreases += 1
+                    if int(self.limit) < old:
+                        print(f"[批量并发] ⚠️ {reason}，并发 {old} -> {int(self.limit)}")
+            elif success:
+                # 每完成约 limit 个任务并发加1
+                old = int(self.limit)
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                if int(self.limit) > old:
+                    print(f"[批量并发] ✅ 运行健康，并发 {old} -> {int(self.limit)}")
+            self._condition.notify_all()
+
+    def stats(self):
+        """返回当前并发上限与统计信息"""
+        with self._condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'errors': self.errors,
+                'decreases': self.decreases,
+                'avg_latency': round(self._avg_latency, 1) if self._avg_latency else None,
+            }
+
+
+def _default_is_error(result):
+    return isinstance(result, dict) and result.get('success') is False
+
+
+class BatchPipeline:
+    """多阶段批量流水线（阶段之间以有界队列连接）"""
+
+    def __init__(self, stages, controller=None, queue_size=2, is_error=None, on_result=None, on_finish=None,
+                 name='pipeline'):
+        """
+        初始化流水线
+
+        Args:
+            stages: 阶段列表，每项为 (阶段名, 阶段函数, 线程数, 是否占用并发名额)；
+                    阶段函数接收上一阶段的输出（第一阶段接收任务本身），返回交给下一阶段的数据
+            controller: 并发控制器；连续的占用名额阶段共用一个名额（进入时获取，离开时归还），None表示不限制
+            queue_size: 阶段之间的队列容量（限制预取量，避免数据获取远超大模型处理速度）
+            is_error: 判断阶段输出是否为失败结果的函数，失败结果跳过后续阶段直接输出
+            on_result: 任务完成回调 on_result(任务, 结果, 异常)，在工作线程中调用（用于逐只保存检查点，
+                       调用方停止读取结果后仍会执行）
+            on_finish: 全部任务完成回调 on_finish()，在记录最后一个结果的工作线程中调用（调用方停止读取结果后
+                       仍会执行，用于标记检查点任务结束）
+            name: 线程名前缀
+        """
+        self.stages = stages
+        self.controller = controller
+        self.queue_size = queue_size
+        self.is_error = is_error or _default_is_error
+        self.on_result = on_result
+        self.on_finish = on_finish
+        self.name = name
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._finished_at = None
+        self._stage_stats = {}
+
+    def _record(self, stage, elapsed, failed):
+        with self._lock:
+            stats = self._stage_stats[stage]
+            stats['processed'] += 1
+            stats['failed'] += 1 if failed else 0
+            stats['busy_time'] += elapsed
+
+    def _finish(self):
+        if self.on_finish:
+            try:
+                self.on_finish()
+            except Exception as e:
+                print(f"[批量流水线] ⚠️ 完成回调失败: {e}")
+
+    def map(self, items):
+        """
+        流水线执行任务，按完成顺序产出结果
+
+        Args:
+            items: 任务列表
+
+        Yields:
+            tuple: (任务, 结果, 异常)，结果为最后执行阶段的输出，阶段抛出异常时结果为None
+        """
+        items = list(items)
+        self._started_at, self._finished_at = time.time(), None
+        self._stage_stats = {stage_name: {'processed': 0, 'failed': 0, 'busy_time': 0.0}
+                             for stage_name, _, _, _ in self.stages}
+        if not items:
+            self._finished_at = time.time()
+            self._finish()
+            return
+
+        queues = [queue.Queue(maxsize=self.queue_size if i else 0) for i in range(len(self.stages))]
+        done = queue.Queue()
+        stop = object()
+        alive = [min(workers, len(items)) for _, _, workers, _ in self.stages]
+        remaining = [len(items)]
+
+        for item in items:
+            queues[0].put((item, item, None))
+        queues[0].put(stop)
+
+        def work(index):
+            stage_name, func, _, gated = self.stages[index]
+            next_gated = index + 1 < len(self.stages) and self.stages[index + 1][3]
+            while True:
+                task = queues[index].get()
+                if task is stop:
+                    # 停止标记在同阶段线程间传递，最后一个线程通知下一阶段
+                    queues[index].put(stop)
+                    with self._lock:
+                        alive[index] -= 1
+                        last = alive[index] == 0
+                    if last and index + 1 < len(self.stages):
+                        queues[index + 1].put(stop)
+                    return
+
+                item, payload, slot_start = task
+                if gated and self.controller and slot_start is None:
+                    self.controller.acquire()
+                    slot_start = time.time()
+
+                start = time.time()
+                result, error = None, None
+                try:
+                    result = func(payload)
+                except Exception as e:
+                    error = e
+                failed = error is not None or self.is_error(result)
+                self._record(stage_name, time.time() - start, failed)
+
+                finished = failed or index + 1 == len(self.stages)
+                if slot_start is not None and (finished or not next_gated):
+                    self.controller.release(time.time() - slot_start, not failed)
+                    slot_start = None
+
+                if finished:
+                    if self.on_result:
+                        try:
+                            self.on_result(item, result, error)
+                        except Exception as e:
+                            print(f"[批量流水线] ⚠️ {item} 结果回调失败: {e}")
+                    with self._lock:
+                        remaining[0] -= 1
+                        last_item = remaining[0] == 0
+                    if last_item:
+                        self._finish()
+                    done.put((item, result, error))
+                else:
+                    queues[index + 1].put((item, result, slot_start))
+
+        threads = [
+            threading.Thread(target=work, args=(i,), name=f'{self.name}_{stage_name}_{n}', daemon=True)
+            for i, (stage_name, _, _, _) in enumerate(self.stages)
+            for n in range(alive[i])
+        ]
+        for thread in threads:
+            thread.start()
+
+        for _ in range(len(items)):
+            yield done.get()
+        self._finished_at = time.time()
+
+    def stats(self):
+        """
+        返回各阶段吞吐统计
+
+        Returns:
+            list: 每个阶段的 {stage, processed, failed, busy_time, avg_time, throughput(只/分钟)}
+        """
+        if self._started_at is None:
+            return []
+        wall = max((self._finished_at or time.time()) - self._started_at, 1e-9)
+        with self._lock:
+            return [{
+                'stage': stage_name,
+                'processed': stats['processed'],
+                'failed': stats['failed'],
+                'busy_time': round(stats['busy_time'], 1),
+                'avg_time': round(stats['busy_time'] / stats['processed'], 1) if stats['processed'] else None,
+                'throughput': round(stats['processed'] * 60 / wall, 2),
+            } for stage_name, stats in self._stage_stats.items()]
+
+
+# 全局批量分析并发控制器（首页批量分析与持仓批量分析共享大模型配额）
+batch_concurrency = AdaptiveConcurrency(
+    initial=int(os.getenv('BATCH_INITIAL_CONCURRENCY', '3')),
+    max_limit=int(os.getenv('BATCH_MAX_CONCURRENCY', '8')),
+)
@@ -0,0 +1,360 @@
+"""
+批量分析任务检查点数据库
+批量分析以"任务记录 + 每只股票一行"持久化，每完成一只股票立即提交，进程中断或页面重跑后可断点续跑
+
+@File: batch_job_db.py
+@Contains: [BatchJobDB, batch_job_db]
+@Responsibilities:
+    - 创建批量任务（任务类型、参数、股票列表）
+    - 逐只记录分析结果并立即提交
+    - 查询待分析股票（续跑时跳过已成功的股票）与已完成结果
+    - 查询未完成的任务，区分仍在运行（所有者进程存活、心跳未超时）与已中断的任务
+    - 任务所有权：运行中的任务登记在本进程并定期写入心跳，只有中断的任务可以被续跑
+@Non-Responsibilities:
+    - 不负责执行分析（由app.run_batch_analysis、PortfolioManager负责）
+    - 不负责分析历史记录（由database.py、portfolio_db.py负责）
+@Input: 任务参数、股票代码、单只股票分析结果
+@Output: 任务信息、待分析股票列表、已完成结果列表
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def _json_default(value):
+    """numpy数值转换为Python数值，其余对象转为字符串"""
+    if hasattr(value, 'item'):
+        try:
+            return value.item()
+        except (TypeError, ValueError):
+            pass
+    return str(value)
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class BatchJobDB:
+    """批量分析任务检查点数据库"""
+
+    def __init__(self, db_path="batch_jobs.db", heartbeat_interval=30, heartbeat_timeout=120):
+        """
+        初始化数据库
+
+        Args:
+            db_path: 数据库文件路径
+            heartbeat_interval: 运行中任务的心跳间隔（秒）
+            heartbeat_timeout: 心跳超过该时间未更新视为所有者进程已退出（秒）
+        """
+        self.db_path = db_path
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        # 本进程的所有者标识与正在执行的任务（页面重跑后流水线线程仍在运行，任务仍登记在此）
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._active_jobs = set()
+        self._lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._init_database()
+
+    def _get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        """初始化数据库表结构"""
+        conn = self._get_connection()
+        try:
+            # 多个分析线程同时写入检查点，WAL模式读写互不阻塞
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_type TEXT NOT NULL,
+                    params TEXT,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    total INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS batch_tasks (
+                    job_id INTEGER NOT NULL,
+                    symbol TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    result TEXT,
+                    error TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (job_id, symbol),
+                    FOREIGN KEY (job_id) REFERENCES batch_jobs(id) ON DELETE CASCADE
+                )
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(batch_jobs)').fetchall()}
+            if 'owner' not in columns:
+                conn.execute('ALTER TABLE batch_jobs ADD COLUMN owner TEXT')
+            if 'heartbeat_at' not in columns:
+                conn.execute('ALTER TABLE batch_jobs ADD COLUMN heartbeat_at TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_batch_jobs_type_status ON batch_jobs(job_type, status)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _heartbeat_loop(self):
+        """定期为本进程正在执行的任务写入心跳"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                job_ids = list(self._active_jobs)
+            if not job_ids:
+                continue
+            try:
+                conn = self._get_connection()
+                try:
+                    conn.executemany('UPDATE batch_jobs SET heartbeat_at = ? WHERE id = ? AND owner = ?',
+                                     [(_now(), job_id, self.owner) for job_id in job_ids])
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"[批量任务] ⚠️ 写入心跳失败: {e}")
+
+    def _register(self, job_id):
+        with self._lock:
+            self._active_jobs.add(job_id)
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name='batch_job_heartbeat',
+                                                          daemon=True)
+                self._heartbeat_thread.start()
+
+    def _is_active(self, job_id, owner, heartbeat_at):
+        """任务是否仍在执行：本进程的任务看是否登记（执行线程未结束），其他进程的任务看心跳是否超时"""
+        if not owner:
+            return False
+        if owner == self.owner:
+            with self._lock:
+                return job_id in self._active_jobs
+        if not heartbeat_at:
+            return False
+        cutoff = (datetime.now() - timedelta(seconds=self.heartbeat_timeout)).strftime('%Y-%m-%d %H:%M:%S')
+        return heartbeat_at >= cutoff
+
+    def claim_job(self, job_id):
+        """
+        认领中断的任务以便续跑（任务仍在执行时认领失败，避免同一批股票被重复分析）
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 认领成功返回True
+        """
+        conn = self._get_connection()
+        try:
+            # IMMEDIATE事务保证多个进程同时认领时只有一个成功
+            conn.isolation_level = None
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status, owner, heartbeat_at FROM batch_jobs WHERE id = ?',
+                               (job_id,)).fetchone()
+            if row is None or row['status'] != 'running' or self._is_active(job_id, row['owner'], row['heartbeat_at']):
+                conn.execute('ROLLBACK')
+                return False
+            now = _now()
+            conn.execute('UPDATE batch_jobs SET owner = ?, heartbeat_at = ?, updated_at = ? WHERE id = ?',
+                         (self.owner, now, now, job_id))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        self._register(job_id)
+        return True
+
+    def create_job(self, job_type, symbols, params=None):
+        """
+        创建批量任务（由本进程执行）
+
+        Args:
+            job_type: 任务类型（如 'homepage'、'portfolio'）
+            symbols: 股票代码列表
+            params: 任务参数字典（续跑时使用同样的参数）
+
+        Returns:
+            int: 任务ID
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        symbols = list(dict.fromkeys(symbols))
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO batch_jobs (job_type, params, status, total, created_at, updated_at, owner, heartbeat_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_type, json.dumps(params or {}, ensure_ascii=False, default=_json_default),
+                 'running', len(symbols), now, now, self.owner, now)
+            )
+            job_id = cursor.lastrowid
+            conn.executemany(
+                'INSERT INTO batch_tasks (job_id, symbol, position, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(job_id, symbol, i, 'pending', now) for i, symbol in enumerate(symbols)]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._register(job_id)
+        print(f"[批量任务] ✅ 创建任务 #{job_id}（{job_type}，{len(symbols)}只）")
+        return job_id
+
+    def record_result(self, job_id, symbol, result=None, success=True, error=None):
+        """
+        记录单只股票的分析结果（立即提交）
+
+        Args:
+            job_id: 任务ID
+            symbol: 股票代码
+            result: 分析结果
+            success: 是否成功
+            error: 失败原因
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                'UPDATE batch_tasks SET status = ?, result = ?, error = ?, updated_at = ? '
+                'WHERE job_id = ? AND symbol = ?',
+                ('success' if success else 'failed',
+                 json.dumps(result, ensure_ascii=False, default=_json_default) if result is not None else None,
+                 error, now, job_id, symbol)
+            )
+            conn.execute('UPDATE batch_jobs SET updated_at = ? WHERE id = ?', (now, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def finish_job(self, job_id, status='completed'):
+        """
+        标记任务结束（由执行任务的流水线在最后一只股票记录后调用，或用户放弃中断的任务）
+
+        Args:
+            job_id: 任务ID
+            status: 结束状态（completed / cancelled）
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._get_connection()
+        try:
+            conn.execute("UPDATE batch_jobs SET status = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                         (status, now, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self._active_jobs.discard(job_id)
+
+    def get_job(self, job_id):
+        """
+        获取任务信息及进度
+
+        Returns:
+            dict: 任务信息（params已解析，含 done / failed / pending 计数及是否正在执行 active），不存在返回None
+        """
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT * FROM batch_jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(conn.execute(
+                'SELECT status, COUNT(*) FROM batch_tasks WHERE job_id = ? GROUP BY status', (job_id,)
+            ).fetchall())
+            symbols = [r[0] for r in conn.execute(
+                'SELECT symbol FROM batch_tasks WHERE job_id = ? ORDER BY position', (job_id,)
+            ).fetchall()]
+        finally:
+            conn.close()
+
+        job = dict(row)
+        job['params'] = json.loads(job['params']) if job['params'] else {}
+        job['symbols'] = symbols
+        job['done'] = counts.get('success', 0)
+        job['failed'] = counts.get('failed', 0)
+        job['pending'] = counts.get('pending', 0)
+        job['active'] = self._is_active(job_id, job['owner'], job['heartbeat_at'])
+        return job
+
+    def get_pending_symbols(self, job_id):
+        """
+        获取尚未成功的股票（续跑时只分析这些股票，失败的股票会重试）
+
+        Returns:
+            list: 股票代码列表（按原始顺序）
+        """
+        conn = self._get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT symbol FROM batch_tasks WHERE job_id = ? AND status != 'success' ORDER BY position",
+                (job_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def get_results(self, job_id, status='success'):
+        """
+        获取已记录的分析结果
+
+        Args:
+            job_id: 任务ID
+            status: 结果状态过滤（None表示全部）
+
+        Returns:
+            list: [(股票代码, 状态, 结果, 失败原因)]（按原始顺序）
+        """
+        sql = 'SELECT symbol, status, result, error FROM batch_tasks WHERE job_id = ?'
+        args = [job_id]
+        if status:
+            sql += ' AND status = ?'
+            args.append(status)
+        conn = self._get_connection()
+        try:
+            rows = conn.execute(sql + ' ORDER BY position', args).fetchall()
+        finally:
+            conn.close()
+        return [(row['symbol'], row['status'], json.loads(row['result']) if row['result'] else None, row['error'])
+                for row in rows]
+
+    def get_unfinished_jobs(self, job_type=None, since=None, limit=10, include_active=False):
+        """
+        获取未结束的任务
+
+        Args:
+            job_type: 任务类型过滤
+            since: 只返回该时间之后创建的任务（'YYYY-MM-DD HH:MM:SS' 或日期）
+            limit: 最多返回条数
+            include_active: 是否包含仍在执行的任务（默认只返回所有者已退出、可续跑的任务）
+
+        Returns:
+            list: 任务信息列表（新任务在前）
+        """
+        sql = "SELECT id FROM batch_jobs WHERE status = 'running'"
+        args = []
+        if job_type:
+            sql += ' AND job_type = ?'
+            args.append(job_type)
+        if since:
+            sql += ' AND created_at >= ?'
+            args.append(since)
+        conn = self._get_connection()
+        try:
+            ids = [row[0] for row in conn.execute(sql + ' ORDER BY id DESC LIMIT ?', args + [limit]).fetchall()]
+        finally:
+            conn.close()
+        jobs = [self.get_job(job_id) for job_id in ids]
+        return [job for job in jobs if include_active or not job['active']]
+
+
+# 全局批量任务数据库实例
+batch_job_db = BatchJobDB()
@@ -20,6 +20,8 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from hist_memory_cache import hist_memory_cache
+from realtime_quotes import realtime_quotes
 
 # 加载环境变量
 load_dotenv()
@@ -33,6 +35,12 @@ class DataSourceManager:
         self.tushare_available = False
         self.tushare_api = None
 
+        # 缓存优先模式：先读本地缓存，只向上游补齐缺失的交易日
+        self.hist_cache_first = os.getenv('HIST_CACHE_FIRST', 'true').lower() == 'true'
+        # 交易日历（懒加载，获取失败时在重试时间前按工作日近似）
+        self._trade_calendar = None
+        self._trade_calendar_retry_at = None
+
         # 本地缓存数据库路径
         self.cache_db_path = os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
@@ -53,13 +61,36 @@ class DataSourceManager:
         else:
             print("ℹ️ 未配置Tushare Token，将使用腾讯数据源和本地缓存")
 
+        # 历史K线存储后端：sqlite（默认）或npy（列式存储）
+        self.hist_cache_backend = os.getenv('HIST_CACHE_BACKEND', 'sqlite').lower()
+        self.hist_store = None
+        if self.hist_cache_backend == 'npy':
+            from hist_column_store import NpyColumnStore
+            self.hist_store = NpyColumnStore(os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                'stock_hist_store'
+            ))
+            print("✅ 历史K线使用列式存储后端")
+
         # 初始化本地缓存数据库
         self._init_cache_db()
 
+    def _connect_cache(self):
+        """
+        打开缓存数据库连接（WAL模式，读写互不阻塞）
+
+        Returns:
+            sqlite3.Connection: 数据库连接
+        """
+        conn = sqlite3.connect(self.cache_db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
     def _init_cache_db(self):
         """初始化本地缓存数据库"""
         try:
-            conn = sqlite3.connect(self.cache_db_path)
+            conn = self._connect_cache()
             cursor = conn.cursor()
 
             # 历史数据缓存表
@@ -81,6 +112,20 @@ class DataSourceManager:
             ''')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_hist_symbol ON stock_hist_cache(symbol)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_hist_date ON stock_hist_cache(data_date)')
+            # 覆盖索引：按(symbol, data_date)范围读取时无需回表
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_hist_symbol_date_cover
+                ON stock_hist_cache(symbol, data_date, open, close, high, low, volume, amount)
+            ''')
+
+            # 已确认上游没有K线的交易日（停牌、未上市），增量获取时不再视为缺失
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stock_hist_no_bar (
+                    symbol TEXT NOT NULL,
+                    data_date TEXT NOT NULL,
+                    PRIMARY KEY (symbol, data_date)
+                )
+            ''')
 
             # 基本信息缓存表
             cursor.execute('''
@@ -159,36 +204,138 @@ class DataSourceManager:
 
     def _save_hist_cache(self, symbol, df, source):
         """
-        保存历史数据到本地缓存
+        保存历史数据到本地缓存（整表转换为列数组后单事务批量写入）
 
         Args:
             symbol: 股票代码
             df: 历史数据DataFrame
             source: 数据来源标识
         """
+        if df is None or df.empty:
+            return
+
+        if self.hist_store is not None:
+            try:
+                self.hist_store.save(symbol, df)
+                print(f"[列式缓存] ✅ 已保存 {len(df)} 条数据")
+            except Exception as e:
+                print(f"[列式缓存] ❌ 保存失败: {e}")
+            return
+
         try:
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
             cached_at = datetime.now().isoformat()
 
-            for _, row in df.iterrows():
-                date_str = row['date'].strftime('%Y-%m-%d') if isinstance(row['date'], pd.Timestamp) else str(row['date'])
-                cursor.execute('''
-                    INSERT OR REPLACE INTO stock_hist_cache
-                    (symbol, data_date, open, close, high, low, volume, amount, source, cached_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol, date_str,
-                    row.get('open'), row.get('close'), row.get('high'), row.get('low'),
-                    row.get('volume'), row.get('amount'), source, cached_at
-                ))
+            # 一次性转换为列数组，NaN统一转为None写入NULL
+            dates = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d').tolist()
+            columns = []
+            for col in ('open', 'close', 'high', 'low', 'volume', 'amount'):
+                if col in df.columns:
+                    values = pd.to_numeric(df[col], errors='coerce').astype(object)
+                    columns.append(values.where(values.notna(), None).tolist())
+                else:
+                    columns.append([None] * len(df))
 
-            conn.commit()
-            conn.close()
-            print(f"[缓存] ✅ 已保存 {len(df)} 条数据到本地缓存")
+            rows = [
+                (symbol, date_str, *values, source, cached_at)
+                for date_str, *values in zip(dates, *columns)
+            ]
+
+            conn = self._connect_cache()
+            try:
+                with conn:
+                    conn.executemany('''
+                        INSERT INTO stock_hist_cache
+                        (symbol, data_date, open, close, high, low, volume, amount, source, cached_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(symbol, data_date) DO UPDATE SET
+                            open = excluded.open,
+                            close = excluded.close,
+                            high = excluded.high,
+                            low = excluded.low,
+                            volume = excluded.volume,
+                            amount = excluded.amount,
+                            source = excluded.source,
+                            cached_at = excluded.cached_at
+                    ''', rows)
+            finally:
+                conn.close()
+            print(f"[缓存] ✅ 已保存 {len(rows)} 条数据到本地缓存")
         except Exception as e:
             print(f"[缓存] ❌ 保存失败: {e}")
 
+    def _load_no_bar_dates(self, symbol, start_date, end_date):
+        """
+        读取已确认没有K线的交易日
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（格式：'20240101'）
+            end_date: 结束日期
+
+        Returns:
+            set: pd.Timestamp日期集合
+        """
+        try:
+            conn = self._connect_cache()
+            try:
+                rows = conn.execute(
+                    'SELECT data_date FROM stock_hist_no_bar WHERE symbol = ? AND data_date >= ? AND data_date <= ?',
+                    (symbol, f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}",
+                     f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}")
+                ).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"[缓存] ❌ 读取无K线日期失败: {e}")
+            return set()
+        return {pd.Timestamp(row[0]) for row in rows}
+
+    def _record_no_bar_dates(self, symbol, trade_dates, df):
+        """
+        记录上游在已请求区间内没有返回K线的交易日（当日除外，收盘前可能尚无数据）
+
+        Args:
+            symbol: 股票代码
+            trade_dates: 已请求的交易日列表
+            df: 上游返回的历史数据（可为None）
+        """
+        today = pd.Timestamp(datetime.now().date())
+        returned = set(pd.to_datetime(df['date'])) if df is not None and not df.empty else set()
+        dates = [d.strftime('%Y-%m-%d') for d in trade_dates if d < today and d not in returned]
+        if not dates:
+            return
+        try:
+            conn = self._connect_cache()
+            try:
+                with conn:
+                    conn.executemany('INSERT OR IGNORE INTO stock_hist_no_bar (symbol, data_date) VALUES (?, ?)',
+                                     [(symbol, d) for d in dates])
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"[缓存] ❌ 记录无K线日期失败: {e}")
+
+    def _purge_hist_cache(self, symbol):
+        """
+        删除股票的全部本地K线及无K线日期记录（复权基准变化后避免新旧口径混合）
+
+        Args:
+            symbol: 股票代码
+        """
+        try:
+            if self.hist_store is not None:
+                self.hist_store.delete(symbol)
+            conn = self._connect_cache()
+            try:
+                with conn:
+                    conn.execute('DELETE FROM stock_hist_cache WHERE symbol = ?', (symbol,))
+                    conn.execute('DELETE FROM stock_hist_no_bar WHERE symbol = ?', (symbol,))
+            finally:
+                conn.close()
+            print(f"[缓存] 已清除 {symbol} 的本地K线缓存")
+        except Exception as e:
+            print(f"[缓存] ❌ 清除失败: {e}")
+
     def _load_hist_cache(self, symbol, start_date=None, end_date=None):
         """
         从本地缓存加载历史数据
@@ -201,10 +348,16 @@ class DataSourceManager:
         Returns:
             DataFrame: 历史数据，如果无缓存返回None
         """
+        if self.hist_store is not None:
+            return self.hist_store.load(symbol, start_date, end_date)
+
         try:
-            conn = sqlite3.connect(self.cache_db_path)
+            conn = self._connect_cache()
 
-            query = "SELECT * FROM stock_hist_cache WHERE symbol = ?"
+            query = (
+                "SELECT data_date, open, close, high, low, volume, amount "
+                "FROM stock_hist_cache WHERE symbol = ?"
+            )
             params = [symbol]
 
             if start_date:
@@ -231,15 +384,231 @@ class DataSourceManager:
             print(f"[缓存] ❌ 读取失败: {e}")
             return None
 
-    def get_stock_hist_data(self, symbol, start_date=None, end_date=None, adjust='qfq'):
+    def load_hist_cache_all(self, start_date=None):
+        """
+        读取本地缓存中所有股票的历史数据（用于构建全市场行情面板）
+
+        Args:
+            start_date: 开始日期（格式：'20240101'）
+
+        Returns:
+            DataFrame: 长表（symbol、date、close、high、low、volume），无缓存返回空DataFrame
+        """
+        columns = ['symbol', 'date', 'close', 'high', 'low', 'volume']
+
+        if self.hist_store is not None:
+            frames = []
+            for symbol in self.hist_store.symbols():
+                df = self.hist_store.load(symbol, start_date)
+                if df is not None and not df.empty:
+                    df['symbol'] = symbol
+                    frames.append(df[columns])
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+        try:
+            conn = self._connect_cache()
+            query = "SELECT symbol, data_date, close, high, low, volume FROM stock_hist_cache"
+            params = []
+            if start_date:
+                query += " WHERE data_date >= ?"
+                params.append(f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}")
+            df = pd.read_sql_query(query, conn, params=params)
+            conn.close()
+        except Exception as e:
+            print(f"[缓存] ❌ 读取失败: {e}")
+            return pd.DataFrame(columns=columns)
+
+        df['date'] = pd.to_datetime(df['data_date'])
+        return df[columns]
+
+    def get_recent_trade_dates(self, days=15):
+        """
+        获取最近若干自然日内的交易日（不含未来日期）
+
+        Args:
+            days: 回看的自然日数
+
+        Returns:
+            list: pd.Timestamp交易日列表（升序）
+        """
+        today = datetime.now()
+        return self._get_trade_dates(
+            (today - timedelta(days=days)).strftime('%Y%m%d'), today.strftime('%Y%m%d')
+        )
+
+    def get_trade_dates(self, start_date, end_date):
+        """
+        获取区间内的交易日（不含未来日期）
+
+        Args:
+            start_date: 开始日期（'20240101' 或 '2024-01-01'）
+            end_date: 结束日期
+
+        Returns:
+            list: pd.Timestamp交易日列表（升序）
+        """
+        return self._get_trade_dates(start_date, end_date)
+
+    def _get_trade_dates(self, start_date, end_date):
+        """
+        获取区间内的交易日列表（优先新浪交易日历，失败时退化为工作日）
+
+        Args:
+            start_date: 开始日期（格式：'20240101'）
+            end_date: 结束日期（格式：'20240101'）
+
+        Returns:
+            list: pd.Timestamp交易日列表（不含未来日期）
+        """
+        start = pd.Timestamp(start_date)
+        end = min(pd.Timestamp(end_date), pd.Timestamp(datetime.now().date()))
+        if start > end:
+            return []
+
+        if self._trade_calendar is None and (self._trade_calendar_retry_at is None
+                                             or datetime.now() >= self._trade_calendar_retry_at):
+            try:
+                import akshare as ak
+                cal_df = ak.tool_trade_date_hist_sina()
+                self._trade_calendar = pd.DatetimeIndex(pd.to_datetime(cal_df['trade_date']))
+            except Exception as e:
+                # 不缓存失败结果，稍后重新获取
+                self._trade_calendar_retry_at = datetime.now() + timedelta(minutes=5)
+                print(f"[交易日历] ⚠️ 获取失败，5分钟内使用工作日近似: {e}")
+
+        if self._trade_calendar is not None and len(self._trade_calendar) > 0 and self._trade_calendar[-1] >= end:
+            mask = (self._trade_calendar >= start) & (self._trade_calendar <= end)
+            return list(self._trade_calendar[mask])
+
+        return list(pd.bdate_range(start, end))
+
+    def _fetch_tencent_hist(self, symbol, start_date, end_date, adjust):
+        """
+        从腾讯数据源获取历史数据并标准化
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（格式：'20240101'）
+            end_date: 结束日期
+            adjust: 复权类型
+
+        Returns:
+            DataFrame: 标准化后的历史数据，无数据返回None（请求异常直接抛出）
+        """
+        import akshare as ak
+        tx_code = self._convert_to_tx_code(symbol)
+
+        df = ak.stock_zh_a_hist_tx(
+            symbol=tx_code,
+            start_date=start_date,
+            end_date=end_date,
+            adjust=adjust
+        )
+
+        if df is None or df.empty:
+            return None
+
+        # 标准化列名（腾讯接口返回的amount是成交量，单位：手）
+        df = df.rename(columns={'amount': 'volume'})
+        df['date'] = pd.to_datetime(df['date'])
+        # 成交量单位转换：手 -> 股
+        df['volume'] = df['volume'] * 100
+        # 添加成交额列（腾讯接口不提供，设为NaN）
+        df['amount'] = None
+        return df
+
+    def _get_hist_incremental(self, symbol, start_date, end_date, adjust):
+        """
+        缓存优先获取历史数据：读取本地已有交易日，只向腾讯补齐缺失部分
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（格式：'20240101'）
+            end_date: 结束日期
+            adjust: 复权类型
+
+        Returns:
+            DataFrame: 合并后的历史数据；缓存不可用或需要全量刷新时返回None
+        """
+        cached_df = self._load_hist_cache(symbol, start_date, end_date)
+        if cached_df is None or cached_df.empty:
+            return None
+
+        trade_dates = self._get_trade_dates(start_date, end_date)
+        today = pd.Timestamp(datetime.now().date())
+        cached_dates = set(cached_df['date'])
+        # 停牌、未上市的交易日上游不会有K线，已确认过的不再视为缺失
+        no_bar_dates = self._load_no_bar_dates(symbol, start_date, end_date)
+
+        # 当日K线在收盘前会变化，始终重新获取
+        missing = [d for d in trade_dates
+                   if (d not in cached_dates and d not in no_bar_dates) or d >= today]
+        if not missing:
+            print(f"[缓存] ✅ 命中本地缓存 {len(cached_df)} 条数据，无需请求上游")
+            return cached_df
+
+        fetch_start = min(missing)
+        fetch_end = max(missing)
+
+        # 额外获取一根与缺口相邻的已缓存K线（优先缺口之前，缺口在最前面时取缺口之后），用于校验复权基准是否变化
+        anchor_df = cached_df[cached_df['date'] < fetch_start]
+        anchor = anchor_df.iloc[-1] if not anchor_df.empty else None
+        if anchor is None:
+            anchor_df = cached_df[cached_df['date'] > fetch_end]
+            anchor = anchor_df.iloc[0] if not anchor_df.empty else None
+        if anchor is not None:
+            fetch_start = min(fetch_start, anchor['date'])
+            fetch_end = max(fetch_end, anchor['date'])
+
+        print(f"[腾讯] 增量获取 {symbol} {fetch_start:%Y-%m-%d} ~ {fetch_end:%Y-%m-%d}（缺失 {len(missing)} 个交易日）...")
+        try:
+            new_df = self._fetch_tencent_hist(
+                symbol, fetch_start.strftime('%Y%m%d'), fetch_end.strftime('%Y%m%d'), adjust
+            )
+        except Exception as e:
+            print(f"[腾讯] ❌ 增量获取失败: {e}")
+            return None
+
+        # 缺口中上游没有返回的交易日记为无K线，下次不再请求
+        self._record_no_bar_dates(symbol, missing, new_df)
+
+        if new_df is None or new_df.empty:
+            # 上游在缺口区间没有数据（停牌、未上市或盘前），直接使用缓存
+            print(f"[缓存] ✅ 缺口区间无新数据，使用缓存 {len(cached_df)} 条数据")
+            return cached_df
+
+        if anchor is not None:
+            anchor_row = new_df[new_df['date'] == anchor['date']]
+            if not anchor_row.empty and abs(float(anchor_row['close'].iloc[0]) - float(anchor['close'])) > 1e-6:
+                # 发生除权除息，前复权历史价格整体变化：清除该股全部缓存（包括请求区间之外的K线）后全量刷新
+                print(f"[缓存] ⚠️ {symbol} 复权基准已变化，清除缓存并全量刷新")
+                self._purge_hist_cache(symbol)
+                return None
+
+        self._save_hist_cache(symbol, new_df, 'tencent')
+
+        columns = ['date', 'open', 'close', 'high', 'low', 'volume', 'amount']
+        merged = pd.concat(
+            [cached_df[~cached_df['date'].isin(new_df['date'])], new_df[columns]],
+            ignore_index=True
+        )
+        merged = merged.sort_values('date').reset_index(drop=True)
+        print(f"[缓存] ✅ 增量合并完成：缓存 {len(cached_df)} 条 + 新增 {len(new_df)} 条")
+        return merged
+
+    def get_stock_hist_data(self, symbol, start_date=None, end_date=None, adjust='qfq', cache_first=None):
         """
         获取股票历史数据（优先腾讯，失败时使用tushare，最后使用本地缓存）
 
+        缓存优先模式下先读取本地缓存，只向腾讯补齐缺失的交易日再合并返回；
+        结果经进程内LRU缓存共享，重叠区间的请求直接切片返回。
+
         Args:
             symbol: 股票代码（6位数字）
             start_date: 开始日期（格式：'20240101'或'2024-01-01'）
             end_date: 结束日期
             adjust: 复权类型（'qfq'前复权, 'hfq'后复权, ''不复权）
+            cache_first: 是否启用缓存优先模式（None时使用HIST_CACHE_FIRST配置，仅对前复权生效）
 
         Returns:
             DataFrame: 包含日期、开盘、收盘、最高、最低、成交量等列
@@ -252,27 +621,55 @@ class DataSourceManager:
         else:
             end_date = datetime.now().strftime('%Y%m%d')
 
+        if cache_first is None:
+            cache_first = self.hist_cache_first
+
+        # 进程内共享缓存：同一次分析中各获取器对同一股票只下载一次
+        return hist_memory_cache.get_or_fetch(
+            symbol, adjust, start_date, end_date,
+            lambda fetch_start, fetch_end: self._fetch_hist_data(
+                symbol, fetch_start, fetch_end, adjust, cache_first
+            )
+        )
+
+    def _fetch_hist_data(self, symbol, start_date, end_date, adjust, cache_first):
+        """
+        按数据源优先级获取历史数据（本地缓存增量 -> 腾讯 -> tushare -> 本地缓存）
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（格式：'20240101'）
+            end_date: 结束日期（格式：'20240101'）
+            adjust: 复权类型
+            cache_first: 是否启用缓存优先模式
+
+        Returns:
+            DataFrame: 历史数据，全部失败返回None
+        """
+        # 0. 缓存优先：只补齐缺失交易日（本地缓存仅保存前复权数据）
+        if cache_first and start_date and adjust == 'qfq':
+            df = self._get_hist_incremental(symbol, start_date, end_date, adjust)
+            if df is not None and not df.empty:
+                return df
+
         # 1. 优先使用腾讯数据源
         try:
-            import akshare as ak
-            tx_code = self._convert_to_tx_code(symbol)
             print(f"[腾讯] 正在获取 {symbol} 的历史数据...")
-
-            df = ak.stock_zh_a_hist_tx(
-                symbol=tx_code,
-                start_date=start_date,
-                end_date=end_date,
-                adjust=adjust
-            )
+            df = self._fetch_tencent_hist(symbol, start_date, end_date, adjust)
 
             if df is not None and not df.empty:
-                # 标准化列名（腾讯接口返回的amount是成交量，单位：手）
-                df = df.rename(columns={'amount': 'volume'})
-                df['date'] = pd.to_datetime(df['date'])
-                # 成交量单位转换：手 -> 股
-                df['volume'] = df['volume'] * 100
-                # 添加成交额列（腾讯接口不提供，设为NaN）
-                df['amount'] = None
+                # 保存到本地缓存，供后续增量获取
+                if adjust == 'qfq':
+                    # 与已缓存K线的收盘价不一致说明复权基准已变化，先清除旧口径缓存
+                    cached_df = self._load_hist_cache(symbol, start_date, end_date)
+                    if cached_df is not None and not cached_df.empty:
+                        overlap = cached_df[['date', 'close']].merge(df[['date', 'close']], on='date')
+                        if ((overlap['close_x'] - overlap['close_y']).abs() > 1e-6).any():
+                            print(f"[缓存] ⚠️ {symbol} 复权基准已变化")
+                            self._purge_hist_cache(symbol)
+                    self._save_hist_cache(symbol, df, 'tencent')
+                    if start_date:
+                        self._record_no_bar_dates(symbol, self._get_trade_dates(start_date, end_date), df)
                 print(f"[腾讯] ✅ 成功获取 {len(df)} 条数据")
                 return df
         except Exception as e:
@@ -417,7 +814,7 @@ class DataSourceManager:
     def _save_info_cache(self, symbol, info):
         """保存基本信息到缓存"""
         try:
-            conn = sqlite3.connect(self.cache_db_path)
+            conn = self._connect_cache()
             cursor = conn.cursor()
             cached_at = datetime.now().isoformat()
 
@@ -438,7 +835,7 @@ class DataSourceManager:
     def _load_info_cache(self, symbol):
         """从缓存加载基本信息"""
         try:
-            conn = sqlite3.connect(self.cache_db_path)
+            conn = self._connect_cache()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -473,33 +870,22 @@ class DataSourceManager:
         """
         quotes = {}
 
-        # 优先使用akshare
-        try:
-            import akshare as ak
-            print(f"[Akshare] 正在获取 {symbol} 的实时行情...")
-
-            df = ak.stock_zh_a_spot_em()
-            stock_df = df[df['代码'] == symbol]
-
-            if not stock_df.empty:
-                row = stock_df.iloc[0]
-                quotes = {
-                    'symbol': symbol,
-                    'name': row['名称'],
-                    'price': row['最新价'],
-                    'change_percent': row['涨跌幅'],
-                    'change': row['涨跌额'],
-                    'volume': row['成交量'],
-                    'amount': row['成交额'],
-                    'high': row['最高'],
-                    'low': row['最低'],
-                    'open': row['今开'],
-                    'pre_close': row['昨收']
-                }
-                print(f"[Akshare] ✅ 成功获取实时行情")
-                return quotes
-        except Exception as e:
-            print(f"[Akshare] ❌ 获取失败: {e}")
+        # 优先使用akshare全市场快照（有效期内所有股票共享一次请求）
+        quote = realtime_quotes.get_quote(symbol)
+        if quote:
+            return {
+                'symbol': symbol,
+                'name': quote['name'],
+                'price': quote['current_price'],
+                'change_percent': quote['change_pct'],
+                'change': quote['change_amount'],
+                'volume': quote['volume'],
+                'amount': quote['amount'],
+                'high': quote['high'],
+                'low': quote['low'],
+                'open': quote['open'],
+                'pre_close': quote['pre_close']
+            }
 
         # akshare失败，尝试tushare
         if self.tushare_available:
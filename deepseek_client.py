@@ -1,10 +1,13 @@
 import openai
 import json
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
 import config
 from datetime import datetime
 import pytz
 from config_manager import config_manager
+from llm_response_cache import llm_response_cache
+from rate_limiter import rate_limiter
 
 class DeepSeekClient:
     """DeepSeek API客户端"""
@@ -18,6 +21,8 @@ class DeepSeekClient:
         # 获取时区配置
         self.config = config_manager.read_env()
         self.timezone_str = self.config.get("TIMEZONE", "Asia/Shanghai")
+        # 线程级流式输出回调（并行分析时各分析师线程互不干扰）
+        self._local = threading.local()
     
     def get_current_datetime(self):
         """获取当前日期时间，考虑时区配置"""
@@ -30,61 +35,165 @@ class DeepSeekClient:
             tz = pytz.timezone("Asia/Shanghai")
             return datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
         
-    def call_api(self, messages: List[Dict[str, str]], model: Optional[str] = None, 
-                 temperature: float = 0.7, max_tokens: int = 2000) -> str:
-        """调用DeepSeek API"""
+    def set_stream_handler(self, handler: Optional[Callable[[str, str], None]]):
+        """
+        为当前线程设置流式输出回调
+
+        设置后，当前线程内的call_api改为流式请求，每收到一段增量即调用handler(类型, 增量文本)，
+        类型为'reasoning'（推理过程）或'content'（最终内容），返回值与非流式一致
+
+        Args:
+            handler: 回调函数，None表示取消流式输出
+        """
+        self._local.stream_handler = handler
+
+    def set_cancel_check(self, check: Optional[Callable[[], bool]]):
+        """
+        为当前线程设置取消检查函数
+
+        设置后，当前线程内的call_api在发送请求前检查一次，并改为流式请求、每收到一段增量检查一次；
+        返回True时关闭连接停止生成（不再继续消耗配额与token），call_api返回"API调用已取消"
+
+        Args:
+            check: 无参函数，返回True表示取消；None表示取消设置
+        """
+        self._local.cancel_check = check
+
+    def _prepare_request(self, messages: List[Dict[str, str]], model: Optional[str], max_tokens: int):
+        """确定模型与max_tokens，并在用户消息开头补充分析时间信息"""
         # 使用实例的模型，如果没有传入则使用默认模型
         model_to_use = model or self.model
-        
+
         # 对于 reasoner 模型，自动增加 max_tokens
         if "reasoner" in model_to_use.lower() and max_tokens <= 2000:
             max_tokens = 8000  # reasoner 模型需要更多 tokens 来输出推理过程
-        
-        try:
-            # 检查messages中的用户消息是否已经包含分析时间信息
-            has_analysis_time = False
-            for msg in messages:
-                if msg['role'] == 'user' and '【分析时间】' in msg['content']:
-                    has_analysis_time = True
+
+        # 检查messages中的用户消息是否已经包含分析时间信息
+        has_analysis_time = False
+        for msg in messages:
+            if msg['role'] == 'user' and '【分析时间】' in msg['content']:
+                has_analysis_time = True
+                break
+
+        # 如果没有包含分析时间信息，则添加
+        if not has_analysis_time:
+            current_datetime = self.get_current_datetime()
+            analysis_time_header = f"【分析时间】\n当前日期时间: {current_datetime}\n时区: {self.timezone_str}\n\n"
+
+            # 找到用户消息并在开头添加分析时间信息
+            for i, msg in enumerate(messages):
+                if msg['role'] == 'user':
+                    messages[i]['content'] = analysis_time_header + msg['content']
                     break
-            
-            # 如果没有包含分析时间信息，则添加
-            if not has_analysis_time:
-                current_datetime = self.get_current_datetime()
-                analysis_time_header = f"【分析时间】\n当前日期时间: {current_datetime}\n时区: {self.timezone_str}\n\n"
-                
-                # 找到用户消息并在开头添加分析时间信息
-                for i, msg in enumerate(messages):
-                    if msg['role'] == 'user':
-                        messages[i]['content'] = analysis_time_header + msg['content']
-                        break
-            
-            response = self.client.chat.completions.create(
-                model=model_to_use,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            
-            # 处理 reasoner 模型的响应
-            message = response.choices[0].message
-            
-            # reasoner 模型可能包含 reasoning_content（推理过程）和 content（最终答案）
-            # 我们返回完整内容，包括推理过程（如果有的话）
-            result = ""
-            
-            # 检查是否有推理内容
-            if hasattr(message, 'reasoning_content') and message.reasoning_content:
-                result += f"【推理过程】\n{message.reasoning_content}\n\n"
-            
-            # 添加最终内容
-            if message.content:
-                result += message.content
-            
-            return result if result else "API返回空响应"
+
+        return model_to_use, max_tokens
+
+    def call_api_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: int = 2000) -> Iterator[Tuple[str, str]]:
+        """
+        流式调用DeepSeek API
+
+        Yields:
+            tuple: (类型, 增量文本)，类型为'reasoning'（推理过程）或'content'（最终内容）
+        """
+        model_to_use, max_tokens = self._prepare_request(messages, model, max_tokens)
+
+        stream = self.client.chat.completions.create(
+            model=model_to_use,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                # reasoner 模型先输出 reasoning_content（推理过程），再输出 content（最终答案）
+                reasoning = getattr(delta, 'reasoning_content', None)
+                if reasoning:
+                    yield 'reasoning', reasoning
+                if delta.content:
+                    yield 'content', delta.content
+        finally:
+            # 调用方提前停止读取（取消）时关闭连接，服务端随之停止生成
+            stream.close()
+
+    def call_api(self, messages: List[Dict[str, str]], model: Optional[str] = None, 
+                 temperature: float = 0.7, max_tokens: int = 2000) -> str:
+        """调用DeepSeek API"""
+        stream_handler = getattr(self._local, 'stream_handler', None)
+        cancel_check = getattr(self._local, 'cancel_check', None)
+
+        try:
+            model_to_use, max_tokens = self._prepare_request(messages, model, max_tokens)
+
+            # 响应缓存（LLM_CACHE_ENABLED=true时生效，键中的分析时间只保留日期）
+            cache_key = None
+            if llm_response_cache.enabled:
+                cache_key = llm_response_cache.make_key(model_to_use, messages, temperature, max_tokens)
+                cached = llm_response_cache.get(cache_key)
+                if cached is not None:
+                    if stream_handler:
+                        stream_handler('content', cached)
+                    return cached
+
+            # 按大模型RPM/TPM配额限流
+            rate_limiter.acquire_llm(messages, max_tokens)
+            if cancel_check and cancel_check():
+                return "API调用已取消"
+
+            # 可取消的调用同样走流式请求，以便中途关闭连接
+            if stream_handler or cancel_check:
+                reasoning_parts = []
+                content_parts = []
+                for kind, delta in self.call_api_stream(messages, model_to_use, temperature, max_tokens):
+                    if cancel_check and cancel_check():
+                        return "API调用已取消"
+                    (reasoning_parts if kind == 'reasoning' else content_parts).append(delta)
+                    if stream_handler:
+                        stream_handler(kind, delta)
+                result = self._format_result(''.join(reasoning_parts), ''.join(content_parts))
+            else:
+                response = self.client.chat.completions.create(
+                    model=model_to_use,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+
+                # 处理 reasoner 模型的响应
+                message = response.choices[0].message
+
+                # reasoner 模型可能包含 reasoning_content（推理过程）和 content（最终答案）
+                # 我们返回完整内容，包括推理过程（如果有的话）
+                result = self._format_result(getattr(message, 'reasoning_content', None), message.content)
+
+            if cache_key and result != "API返回空响应":
+                llm_response_cache.put(cache_key, result, model_to_use)
+            return result
             
         except Exception as e:
+            if getattr(e, 'status_code', None) == 429 or '429' in str(e):
+                rate_limiter.report_throttle('llm')
             return f"API调用失败: {str(e)}"
+
+    @staticmethod
+    def _format_result(reasoning_content: Optional[str], content: Optional[str]) -> str:
+        """拼接推理过程与最终内容"""
+        result = ""
+        
+        # 检查是否有推理内容
+        if reasoning_content:
+            result += f"【推理过程】\n{reasoning_content}\n\n"
+        
+        # 添加最终内容
+        if content:
+            result += content
+        
+        return result if result else "API返回空响应"
     
     def technical_analysis(self, stock_info: Dict, stock_data: Any, indicators: Dict) -> str:
         """技术面分析"""
@@ -0,0 +1,375 @@
+"""
+列式历史K线存储
+每只股票的日期与OHLCV按列连续保存在单个.npy文件中，读取时整体载入内存并按日期零拷贝切片
+
+@File: hist_column_store.py
+@Contains: [NpyColumnStore, migrate_from_sqlite, benchmark]
+@Responsibilities:
+    - 按股票分区的列式OHLCV存储（date/open/close/high/low/volume/amount）
+    - 单文件原子替换写入，读取不持有文件句柄（Windows下写入不会被读取方占用的文件阻塞）
+    - 按文件修改时间缓存已读取的矩阵，基于二分查找的日期区间读取
+    - 从stock_hist_cache（SQLite）迁移历史数据
+    - SQLite与列式存储的读取延迟对比
+@Non-Responsibilities:
+    - 不负责从上游数据源获取数据（由DataSourceManager负责）
+    - 不负责技术指标计算
+@Input: 股票代码、标准化的历史数据DataFrame
+@Output: 列数组或标准化的历史数据DataFrame
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+class NpyColumnStore:
+    """NumPy列式K线存储"""
+
+    COLUMNS = ('open', 'close', 'high', 'low', 'volume', 'amount')
+    # 内存中缓存的股票矩阵数量上限（单只股票一年约14KB）
+    MAX_CACHED = 2048
+    # 替换文件遇到其他进程正在读取（Windows PermissionError）时的重试次数
+    REPLACE_RETRIES = 5
+
+    def __init__(self, root_dir):
+        """
+        初始化列式存储
+
+        每只股票一个子目录，bars.npy保存形状为(1 + len(COLUMNS), n)的float64矩阵：
+        第0行为日期（1970-01-01起的天数），其余每行一列，每列在磁盘上连续。
+        日期与数值在同一文件中，写入时一次原子替换，读取方不会看到新旧文件混合
+
+        Args:
+            root_dir: 存储根目录
+        """
+        self.root_dir = root_dir
+        self._lock = threading.RLock()
+        # 已读取的矩阵（LRU）：symbol -> ((修改时间, 文件大小), dates, values)
+        self._cache = OrderedDict()
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root_dir, symbol)
+
+    def _bars_path(self, symbol):
+        return os.path.join(self._symbol_dir(symbol), 'bars.npy')
+
+    def symbols(self):
+        """返回已存储的股票代码列表"""
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if os.path.isfile(os.path.join(self.root_dir, name, 'bars.npy'))
+            or os.path.isfile(os.path.join(self.root_dir, name, 'values.npy'))
+        )
+
+    def _read_legacy(self, symbol):
+        """读取旧版双文件格式（date.npy + values.npy），不一致时视为无缓存"""
+        symbol_dir = self._symbol_dir(symbol)
+        try:
+            dates = np.load(os.path.join(symbol_dir, 'date.npy'))
+            values = np.load(os.path.join(symbol_dir, 'values.npy'))
+        except FileNotFoundError:
+            return None, None
+        if values.shape != (len(self.COLUMNS), len(dates)):
+            return None, None
+        return dates.astype('datetime64[D]'), values
+
+    def _open(self, symbol):
+        """读取（或复用缓存的）股票矩阵，文件被替换后自动重新读取；读取后不保留文件句柄"""
+        path = self._bars_path(symbol)
+        try:
+            stat = os.stat(path)
+            mtime = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            mtime = None
+
+        with self._lock:
+            cached = self._cache.get(symbol)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(symbol)
+                return cached[1], cached[2]
+
+            if mtime is None:
+                dates, values = self._read_legacy(symbol)
+                if dates is None:
+                    return None, None
+            else:
+                bars = np.load(path)
+                if bars.ndim != 2 or bars.shape[0] != len(self.COLUMNS) + 1:
+                    return None, None
+                dates = bars[0].astype(np.int64).astype('datetime64[D]')
+                values = bars[1:]
+            # 缓存的数组以只读视图返回给调用方
+            dates.flags.writeable = False
+            values.flags.writeable = False
+            self._cache[symbol] = (mtime, dates, values)
+            self._cache.move_to_end(symbol)
+            while len(self._cache) > self.MAX_CACHED:
+                self._cache.popitem(last=False)
+            return dates, values
+
+    def load_columns(self, symbol, start_date=None, end_date=None):
+        """
+        按日期区间读取列数组（缓存矩阵的只读视图，不复制数据）
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（'20240101'或'2024-01-01'）
+            end_date: 结束日期
+
+        Returns:
+            dict: {'date': datetime64[D]数组, 'open': float64数组, ...}，无数据返回None
+        """
+        dates, values = self._open(symbol)
+        if dates is None:
+            return None
+
+        lo = 0
+        hi = len(dates)
+        if start_date:
+            lo = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date).date(), 'D'), side='left'))
+        if end_date:
+            hi = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right'))
+        if lo >= hi:
+            return None
+
+        columns = {'date': dates[lo:hi]}
+        for i, col in enumerate(self.COLUMNS):
+            columns[col] = values[i, lo:hi]
+        return columns
+
+    def load(self, symbol, start_date=None, end_date=None):
+        """
+        按日期区间读取标准化的历史数据
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（'20240101'或'2024-01-01'）
+            end_date: 结束日期
+
+        Returns:
+            DataFrame: 与DataSourceManager缓存格式一致的历史数据，无数据返回None
+        """
+        try:
+            columns = self.load_columns(symbol, start_date, end_date)
+        except Exception as e:
+            print(f"[列式缓存] ❌ 读取失败: {e}")
+            return None
+        if columns is None:
+            return None
+
+        return pd.DataFrame({
+            'date': pd.to_datetime(np.asarray(columns['date'])),
+            **{col: np.array(columns[col]) for col in self.COLUMNS}
+        })
+
+    def _replace(self, tmp_path, path):
+        """原子替换文件；Windows下其他进程恰好在读取时短暂重试"""
+        for attempt in range(self.REPLACE_RETRIES):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if attempt == self.REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+
+    def save(self, symbol, df):
+        """
+        合并写入历史数据（同日期以新数据为准）
+
+        Args:
+            symbol: 股票代码
+            df: 包含date及OHLCV列的DataFrame
+
+        Returns:
+            int: 写入后该股票的总K线数
+        """
+        new_df = pd.DataFrame({'date': pd.to_datetime(df['date']).dt.normalize()})
+        for col in self.COLUMNS:
+            if col in df.columns:
+                new_df[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64')
+            else:
+                new_df[col] = np.nan
+
+        with self._lock:
+            old_df = self.load(symbol)
+            if old_df is not None:
+                new_df = pd.concat([old_df, new_df], ignore_index=True)
+                new_df = new_df.drop_duplicates(subset='date', keep='last')
+            new_df = new_df.sort_values('date')
+
+            symbol_dir = self._symbol_dir(symbol)
+            os.makedirs(symbol_dir, exist_ok=True)
+
+            days = new_df['date'].to_numpy(dtype='datetime64[D]').astype(np.int64).astype('float64')
+            bars = np.ascontiguousarray(np.vstack([days, new_df[list(self.COLUMNS)].to_numpy(dtype='float64').T]))
+
+            # 写入临时文件后一次原子替换（读取不持有文件句柄，替换不会被本进程的读取阻塞）
+            tmp_path = os.path.join(symbol_dir, 'bars.tmp.npy')
+            np.save(tmp_path, bars)
+            self._replace(tmp_path, self._bars_path(symbol))
+            self._cache.pop(symbol, None)
+            # 已转换为新格式，删除旧版双文件
+            for name in ('date.npy', 'values.npy'):
+                legacy_path = os.path.join(symbol_dir, name)
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+
+        return len(new_df)
+
+    def delete(self, symbol):
+        """
+        删除股票的全部K线（复权基准变化时整体重建）
+
+        Args:
+            symbol: 股票代码
+        """
+        with self._lock:
+            self._cache.pop(symbol, None)
+            for name in ('bars.npy', 'values.npy', 'date.npy'):
+                path = os.path.join(self._symbol_dir(symbol), name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def migrate_from_sqlite(db_path, store):
+    """
+    将stock_hist_cache中的历史数据迁移到列式存储
+
+    Args:
+        db_path: SQLite缓存数据库路径
+        store: NpyColumnStore实例
+
+    Returns:
+        int: 迁移的股票数量
+    """
+    conn = sqlite3.connect(db_path)
+    symbols = [row[0] for row in conn.execute('SELECT DISTINCT symbol FROM stock_hist_cache')]
+    print(f"[迁移] 共 {len(symbols)} 只股票待迁移")
+
+    for i, symbol in enumerate(symbols, 1):
+        df = pd.read_sql_query(
+            'SELECT data_date AS date, open, close, high, low, volume, amount '
+            'FROM stock_hist_cache WHERE symbol = ? ORDER BY data_date',
+            conn, params=[symbol]
+        )
+        count = store.save(symbol, df)
+        if i % 100 == 0 or i == len(symbols):
+            print(f"[迁移] {i}/{len(symbols)} {symbol}: {count} 条")
+
+    conn.close()
+    return len(symbols)
+
+
+def benchmark(symbol_counts=(1000, 5000, 10000), n_bars=250, n_reads=500, work_dir=None):
+    """
+    对比SQLite缓存与列式存储的单股区间读取延迟
+
+    Args:
+        symbol_counts: 测试的股票数量规模
+        n_bars: 每只股票的K线数
+        n_reads: 每个规模下随机读取的次数
+        work_dir: 测试数据目录（默认使用临时目录）
+
+    Returns:
+        list: 每个规模的结果字典
+    """
+    import tempfile
+    import time
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix='hist_store_bench_')
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars)
+    start_date = dates[n_bars // 2].strftime('%Y%m%d')
+    end_date = dates[-1].strftime('%Y%m%d')
+    results = []
+
+    for n_symbols in symbol_counts:
+        db_path = os.path.join(work_dir, f'bench_{n_symbols}.db')
+        store = NpyColumnStore(os.path.join(work_dir, f'bench_{n_symbols}_npy'))
+        symbols = [f'{i:06d}' for i in range(n_symbols)]
+
+        conn = sqlite3.connect(db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS stock_hist_cache (
+                symbol TEXT NOT NULL, data_date TEXT NOT NULL,
+                open REAL, close REAL, high REAL, low REAL, volume REAL, amount REAL,
+                UNIQUE(symbol, data_date)
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hist_symbol_date_cover
+            ON stock_hist_cache(symbol, data_date, open, close, high, low, volume, amount)
+        ''')
+        date_strs = dates.strftime('%Y-%m-%d').tolist()
+        for symbol in symbols:
+            prices = rng.random((4, n_bars)) * 100
+            volumes = rng.random((2, n_bars)) * 1e7
+            conn.executemany(
+                'INSERT OR REPLACE INTO stock_hist_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(symbol, d, *map(float, row)) for d, row in zip(date_strs, np.vstack([prices, volumes]).T)]
+            )
+            store.save(symbol, pd.DataFrame({
+                'date': dates, 'open': prices[0], 'close': prices[1], 'high': prices[2],
+                'low': prices[3], 'volume': volumes[0], 'amount': volumes[1]
+            }))
+        conn.commit()
+
+        sample = rng.choice(symbols, size=n_reads)
+        query = (
+            'SELECT data_date, open, close, high, low, volume, amount FROM stock_hist_cache '
+            'WHERE symbol = ? AND data_date >= ? AND data_date <= ? ORDER BY data_date'
+        )
+        t0 = time.perf_counter()
+        for symbol in sample:
+            pd.read_sql_query(query, conn, params=[symbol, dates[n_bars // 2].strftime('%Y-%m-%d'), date_strs[-1]])
+        sqlite_ms = (time.perf_counter() - t0) / n_reads * 1000
+        conn.close()
+
+        t0 = time.perf_counter()
+        for symbol in sample:
+            store.load_columns(symbol, start_date, end_date)
+        npy_columns_ms = (time.perf_counter() - t0) / n_reads * 1000
+
+        t0 = time.perf_counter()
+        for symbol in sample:
+            store.load(symbol, start_date, end_date)
+        npy_frame_ms = (time.perf_counter() - t0) / n_reads * 1000
+
+        result = {
+            'symbols': n_symbols,
+            'sqlite_ms': round(sqlite_ms, 3),
+            'npy_columns_ms': round(npy_columns_ms, 3),
+            'npy_dataframe_ms': round(npy_frame_ms, 3),
+        }
+        results.append(result)
+        print(f"[基准] {n_symbols:>6} 只股票 | SQLite {sqlite_ms:.3f} ms | "
+              f"列式(数组) {npy_columns_ms:.3f} ms | 列式(DataFrame) {npy_frame_ms:.3f} ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    command = sys.argv[1] if len(sys.argv) > 1 else 'benchmark'
+
+    if command == 'migrate':
+        # python hist_column_store.py migrate [sqlite路径] [目标目录]
+        db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_dir, 'stock_data_cache.db')
+        target_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join(base_dir, 'stock_hist_store')
+        count = migrate_from_sqlite(db_path, NpyColumnStore(target_dir))
+        print(f"✅ 迁移完成，共 {count} 只股票")
+    elif command == 'benchmark':
+        # python hist_column_store.py benchmark [股票数量,...]
+        counts = tuple(int(x) for x in sys.argv[2].split(',')) if len(sys.argv) > 2 else (1000, 5000, 10000)
+        benchmark(counts)
+    else:
+        print("用法: python hist_column_store.py [migrate [sqlite路径] [目标目录] | benchmark [1000,5000,10000]]")
@@ -0,0 +1,279 @@
+"""
+进程内历史K线LRU缓存
+同一进程内所有数据获取器共享，按字节数限制容量，盘中与盘后使用不同的过期时间
+
+@File: hist_memory_cache.py
+@Contains: [HistMemoryCache, hist_memory_cache]
+@Responsibilities:
+    - 以(symbol, adjust, start, end)为键缓存标准化的历史K线DataFrame
+    - 区间请求命中已缓存的更大区间时直接切片返回
+    - 同一股票的并发请求合并为一次上游下载
+    - 盘前缓存的、覆盖下一交易日的区间在开盘时过期，开盘后不返回过时的最后一根K线
+@Non-Responsibilities:
+    - 不负责从数据源获取数据（由调用方传入获取函数）
+    - 不负责持久化（由DataSourceManager的本地缓存负责）
+@Input: 股票代码、复权类型、日期区间
+@Output: 历史数据DataFrame
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+
+import pandas as pd
+import pytz
+
+
+MARKET_TZ = pytz.timezone('Asia/Shanghai')
+# 当日K线开始变化（集合竞价）与最终确定的时间
+SESSION_OPEN = dt_time(9, 15)
+SESSION_CLOSE = dt_time(15, 5)
+
+
+class HistMemoryCache:
+    """进程内共享的历史K线LRU缓存"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, open_ttl=60, closed_ttl=3600, min_span_days=400):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 缓存总字节数上限
+            open_ttl: 盘中包含当日K线的缓存有效期（秒）
+            closed_ttl: 盘后或纯历史区间的缓存有效期（秒，覆盖下一交易日的区间最迟在开盘时过期）
+            min_span_days: 未命中时至少下载的自然日跨度，使同一次分析中不同回看长度共享一次下载
+        """
+        self.max_bytes = max_bytes
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self.min_span_days = min_span_days
+
+        # (symbol, adjust, start, end) -> (df, nbytes, expires_at)
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # (symbol, adjust) -> 下载锁，合并同一股票的并发请求
+        self._fetch_locks = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_trading_day(day):
+        """
+        判断日期是否为A股交易日（使用data_source_manager的交易日历，不可用时按工作日判断）
+
+        Args:
+            day: 日期（格式：'20240101'）
+
+        Returns:
+            bool: 是否为交易日
+        """
+        try:
+            from data_source_manager import data_source_manager
+            return len(data_source_manager.get_trade_dates(day, day)) > 0
+        except Exception:
+            return pd.Timestamp(day).weekday() < 5
+
+    @staticmethod
+    def is_market_open():
+        """判断当前是否处于A股盘中（含集合竞价，当日K线仍在变化）"""
+        now = datetime.now(MARKET_TZ)
+        if not SESSION_OPEN <= now.time() <= SESSION_CLOSE:
+            return False
+        return HistMemoryCache.is_trading_day(now.strftime('%Y%m%d'))
+
+    def _next_session_open(self, now):
+        """
+        下一次开盘（集合竞价开始）时间
+
+        交易日历不含未来日期，今天以后按工作日估计（遇节假日只会让缓存提前过期）
+        """
+        day = now.date()
+        if now.time() >= SESSION_OPEN or not self.is_trading_day(day.strftime('%Y%m%d')):
+            day += timedelta(days=1)
+            while day.weekday() >= 5:
+                day += timedelta(days=1)
+        return MARKET_TZ.localize(datetime.combine(day, SESSION_OPEN))
+
+    def _expires_at(self, end_date):
+        """
+        计算缓存项的过期时间
+
+        盘中包含当日的区间使用open_ttl；其余使用closed_ttl，但区间覆盖下一交易日时
+        最迟在该交易日开盘时过期（盘前缓存的数据开盘后不再包含最新K线）
+
+        Args:
+            end_date: 区间结束日期（格式：'20240101'）
+
+        Returns:
+            float: 过期时间戳
+        """
+        now = datetime.now(MARKET_TZ)
+        if end_date >= now.strftime('%Y%m%d') and self.is_market_open():
+            return time.time() + self.open_ttl
+
+        expires_at = time.time() + self.closed_ttl
+        next_open = self._next_session_open(now)
+        if end_date >= next_open.strftime('%Y%m%d'):
+            expires_at = min(expires_at, next_open.timestamp())
+        return expires_at
+
+    def _find_covering(self, symbol, adjust, start_date, end_date):
+        """查找覆盖请求区间的未过期缓存项（调用方持有锁）"""
+        now = time.time()
+        for key in list(self._entries.keys()):
+            entry_symbol, entry_adjust, entry_start, entry_end = key
+            if entry_symbol != symbol or entry_adjust != adjust:
+                continue
+            df, nbytes, expires_at = self._entries[key]
+            if expires_at <= now:
+                self._evict(key)
+                continue
+            if (not entry_start or (start_date and entry_start <= start_date)) and entry_end >= end_date:
+                self._entries.move_to_end(key)
+                return df
+        return None
+
+    def _evict(self, key):
+        df, nbytes, _ = self._entries.pop(key)
+        self._total_bytes -= nbytes
+
+    def get(self, symbol, adjust, start_date, end_date):
+        """
+        读取缓存（命中更大区间时切片返回）
+
+        Args:
+            symbol: 股票代码
+            adjust: 复权类型
+            start_date: 开始日期（格式：'20240101'，None表示不限）
+            end_date: 结束日期（格式：'20240101'）
+
+        Returns:
+            DataFrame: 请求区间的数据副本，未命中返回None
+        """
+        with self._lock:
+            df = self._find_covering(symbol, adjust, start_date, end_date)
+            if df is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return self._slice(df, start_date, end_date)
+
+    @staticmethod
+    def _slice(df, start_date, end_date):
+        """按日期区间切片并返回副本，区间内无数据返回None"""
+        dates = pd.to_datetime(df['date'])
+        mask = dates <= pd.Timestamp(end_date)
+        if start_date:
+            mask &= dates >= pd.Timestamp(start_date)
+        result = df[mask].reset_index(drop=True)
+        if result.empty:
+            return None
+        return result.copy()
+
+    def put(self, symbol, adjust, start_date, end_date, df):
+        """
+        写入缓存
+
+        Args:
+            symbol: 股票代码
+            adjust: 复权类型
+            start_date: 实际下载的开始日期
+            end_date: 实际下载的结束日期
+            df: 历史数据DataFrame（需包含date列）
+        """
+        if df is None or df.empty or 'date' not in df.columns:
+            return
+
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['date'])
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+
+        key = (symbol, adjust, start_date or '', end_date)
+        expires_at = self._expires_at(end_date)
+
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (df, nbytes, expires_at)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                self._evict(next(iter(self._entries)))
+
+    def get_or_fetch(self, symbol, adjust, start_date, end_date, fetch_func):
+        """
+        读取缓存，未命中时调用获取函数下载并写入缓存
+
+        下载区间至少向前扩展到min_span_days，同一股票的并发请求串行化，
+        后到的请求直接命中先到请求写入的缓存
+
+        Args:
+            symbol: 股票代码
+            adjust: 复权类型
+            start_date: 开始日期（格式：'20240101'，None表示不限）
+            end_date: 结束日期（格式：'20240101'）
+            fetch_func: 获取函数，签名为fetch_func(start_date, end_date) -> DataFrame
+
+        Returns:
+            DataFrame: 请求区间的数据，获取失败返回None
+        """
+        cached = self.get(symbol, adjust, start_date, end_date)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault((symbol, adjust), threading.Lock())
+
+        with fetch_lock:
+            # 等待期间其他线程可能已完成下载
+            with self._lock:
+                covered = self._find_covering(symbol, adjust, start_date, end_date) is not None
+            if covered:
+                return self.get(symbol, adjust, start_date, end_date)
+
+            fetch_start = start_date
+            if start_date and self.min_span_days:
+                span_start = (pd.Timestamp(end_date) - timedelta(days=self.min_span_days)).strftime('%Y%m%d')
+                fetch_start = min(start_date, span_start)
+
+            df = fetch_func(fetch_start, end_date)
+            if df is None or df.empty:
+                return df
+
+            self.put(symbol, adjust, fetch_start, end_date, df)
+
+        if fetch_start == start_date:
+            return df
+        return self._slice(df, start_date, end_date)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# 全局历史K线缓存实例
+hist_memory_cache = HistMemoryCache(
+    max_bytes=int(os.getenv('HIST_MEMORY_CACHE_MB', '256')) * 1024 * 1024,
+    open_ttl=int(os.getenv('HIST_MEMORY_CACHE_OPEN_TTL', '60')),
+    closed_ttl=int(os.getenv('HIST_MEMORY_CACHE_CLOSED_TTL', '3600')),
+)
@@ -0,0 +1,157 @@
+"""
+共享HTTP客户端
+所有对外HTTP请求（数据接口、LLM接口、Webhook）复用同一组长连接池
+
+@File: http_client.py
+@Contains: [HttpClient, http_client]
+@Responsibilities:
+    - 按主机维护keep-alive连接池，限制每个主机的连接数
+    - 连接异常、429及5xx响应时按指数退避加随机抖动重试（POST等非幂等请求只在连接建立失败时重试）
+@Non-Responsibilities:
+    - 不负责解析业务响应（由调用方判断返回码）
+    - 不负责请求频率控制
+@Input: HTTP方法、URL及requests参数
+@Output: requests.Response
+"""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+
+class HttpClient:
+    """带连接池与退避重试的HTTP客户端"""
+
+    # 需要重试的HTTP状态码
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # 幂等方法（重复发送不会产生副作用）
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+    def __init__(self, pool_connections=20, pool_maxsize=20, max_retries=3,
+                 backoff_base=0.5, backoff_max=10):
+        """
+        初始化HTTP客户端
+
+        Args:
+            pool_connections: 缓存连接池的主机数
+            pool_maxsize: 每个主机的最大连接数（连接耗尽时等待空闲连接）
+            max_retries: 默认重试次数（不含首次请求）
+            backoff_base: 退避基数（秒），第n次重试的等待上限为 backoff_base * 2^n
+            backoff_max: 单次退避等待上限（秒）
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """懒加载共享Session"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        pool_block=True,
+                        max_retries=0
+                    )
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def backoff_delay(self, attempt):
+        """
+        计算第attempt次重试前的等待时间（full jitter）
+
+        Args:
+            attempt: 重试序号（从0开始）
+
+        Returns:
+            float: 等待秒数
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _is_connect_error(error):
+        """请求是否在连接建立阶段失败（请求尚未发出，服务端不可能已处理）"""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.ConnectionError) or isinstance(error, requests.ReadTimeout):
+            return False
+        # 连接中断（Connection aborted）等错误可能发生在请求发出之后，只认定建立连接/DNS解析失败
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def request(self, method, url, retries=None, **kwargs):
+        """
+        发送HTTP请求，失败时退避重试
+
+        幂等请求在连接错误、超时和可重试状态码时重试；POST等非幂等请求（大模型调用、Webhook推送）
+        只在连接建立失败时重试，避免服务端已处理的请求被重复发送（重复计费、重复推送）。
+        其他状态码直接返回响应，重试耗尽后返回最后一次响应或抛出最后一次异常
+
+        Args:
+            method: HTTP方法
+            url: 请求URL
+            retries: 重试次数（默认使用max_retries）
+            **kwargs: 传给requests的参数（params、json、headers、timeout等）
+
+        Returns:
+            requests.Response: 响应对象
+        """
+        retries = self.max_retries if retries is None else retries
+        kwargs.setdefault('timeout', 10)
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries or not (idempotent or self._is_connect_error(e)):
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"[HTTP] ⚠️ 请求失败，{delay:.1f}秒后重试 ({attempt + 1}/{retries}): {e}")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in self.RETRY_STATUSES or attempt >= retries or not idempotent:
+                return response
+
+            # 429时优先遵循服务端的Retry-After
+            retry_after = response.headers.get('Retry-After')
+            delay = self.backoff_delay(attempt)
+            if retry_after and retry_after.isdigit():
+                delay = min(self.backoff_max, float(retry_after))
+            response.close()
+            print(f"[HTTP] ⚠️ HTTP {response.status_code}，{delay:.1f}秒后重试 ({attempt + 1}/{retries})")
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        """发送GET请求"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """发送POST请求"""
+        return self.request('POST', url, **kwargs)
+
+
+# 全局HTTP客户端实例
+http_client = HttpClient(
+    pool_connections=int(os.getenv('HTTP_POOL_CONNECTIONS', '20')),
+    pool_maxsize=int(os.getenv('HTTP_POOL_MAXSIZE', '20')),
+    max_retries=int(os.getenv('HTTP_MAX_RETRIES', '3')),
+    backoff_base=float(os.getenv('HTTP_BACKOFF_BASE', '0.5')),
+)
@@ -0,0 +1,552 @@
+"""
+增量技术指标引擎
+每只股票用历史K线初始化一次指标状态，之后每根新K线或每个实时行情只做常数时间更新
+
+@File: indicator_engine.py
+@Contains: [IncrementalIndicators, IndicatorEngine, indicator_engine]
+@Responsibilities:
+    - 维护MA5/20/60、MACD、RSI6/12/24、KDJ、布林带、量能均线的增量状态
+      （均线与RSI用滑动累加和，MACD用EMA状态，KDJ最高/最低价用单调队列）
+    - 已完成K线计入状态，当前K线可被实时行情反复替换而不重算历史
+    - 与传入的历史K线比对，一致时增量更新，不一致（换数据源、复权调整）时重新初始化
+    - 仅交易日交易时段内的实时行情可开新K线（非交易时段行情只替换同日K线或忽略）
+    - 输出与智能盯盘技术指标一致的字典格式
+@Non-Responsibilities:
+    - 不负责获取历史K线与实时行情（由SmartMonitorDataFetcher、SmartMonitorTDXDataFetcher负责）
+@Input: 历史K线DataFrame（日期/开盘/收盘/最高/最低/成交量）、实时行情字典
+@Output: 技术指标字典
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+
+NAN = float('nan')
+
+# 可用于更新当前K线的实时行情来源（成交量单位为手，最高/最低为当日值）
+TICK_SOURCES = ('tdx', 'akshare_spot', 'akshare')
+
+# A股连续竞价时段，只有此时段内的实时行情才能开出新的日K线
+TRADING_SESSIONS = (('09:30', '11:30'), ('13:00', '15:00'))
+
+
+def _ewm_step(state, value, alpha):
+    """
+    pandas ewm(adjust=False) 的单步递推，缺失值与pandas处理一致
+
+    Args:
+        state: (加权值, 旧权重)
+        value: 新的输入值（可为NaN）
+        alpha: 平滑系数
+
+    Returns:
+        新状态 (加权值, 旧权重)，加权值即当前输出
+    """
+    weighted, old_wt = state
+    if weighted != weighted:
+        return (value, 1.0)
+    old_wt *= 1 - alpha
+    if value != value:
+        return (weighted, old_wt)
+    if weighted != value:
+        weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+    return (weighted, 1.0)
+
+
+class IncrementalIndicators:
+    """单只股票的增量指标状态"""
+
+    MA_WINDOWS = (5, 20, 60)
+    RSI_PERIODS = (6, 12, 24)
+    KDJ_N = 9
+    BOLL_PERIOD = 20
+    BOLL_STD = 2
+    VOL_MA = 5
+    MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+    # 输出指标要求的最少K线数
+    MIN_BARS = 60
+
+    def __init__(self):
+        self.committed = 0
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+        longest = max(self.MA_WINDOWS + (self.BOLL_PERIOD,))
+        # 已完成K线的收盘价（相对基准价的偏移），各窗口维护最近 n-1 根的累加和
+        self._base = None
+        self._closes = deque(maxlen=longest - 1)
+        self._sums = {n: 0.0 for n in set(self.MA_WINDOWS + (self.BOLL_PERIOD,))}
+        self._boll_sumsq = 0.0
+        self._volumes = deque(maxlen=self.VOL_MA - 1)
+        self._volume_sum = 0.0
+
+        # RSI：最近 period-1 根的涨幅/跌幅累加和
+        self._gains = deque(maxlen=max(self.RSI_PERIODS) - 1)
+        self._losses = deque(maxlen=max(self.RSI_PERIODS) - 1)
+        self._gain_sums = {p: 0.0 for p in self.RSI_PERIODS}
+        self._loss_sums = {p: 0.0 for p in self.RSI_PERIODS}
+
+        # MACD、KDJ的EMA状态：(加权值, 旧权重)
+        self._ema_fast = (NAN, 1.0)
+        self._ema_slow = (NAN, 1.0)
+        self._dea = (NAN, 1.0)
+        self._k = (NAN, 1.0)
+        self._d = (NAN, 1.0)
+
+        # KDJ：最近 n-1 根已完成K线的最低价递增队列、最高价递减队列，元素为 (序号, 价格)
+        self._low_queue = deque()
+        self._high_queue = deque()
+
+        self.prev_date = None
+        self.prev_close = None
+        self.bar = None
+
+    # ---------- 状态推进 ----------
+
+    @staticmethod
+    def _window_add(values, sums, value, windows):
+        """新值入窗前，减去各窗口（n-1根）滑出的值"""
+        for n in windows:
+            if len(values) >= n - 1:
+                sums[n] -= values[-(n - 1)]
+            sums[n] += value
+
+    def _evaluate(self, bar):
+        """基于已完成K线状态计算当前K线的全部指标（不修改状态）"""
+        close, high, low, volume = bar['close'], bar['high'], bar['low'], bar['volume']
+        count = self.committed + 1
+        base = self._base if self._base is not None else close
+        offset = close - base
+
+        values = {}
+        for n in self.MA_WINDOWS:
+            values[f'ma{n}'] = base + (self._sums[n] + offset) / n if count >= n else NAN
+
+        # MACD
+        fast = _ewm_step(self._ema_fast, close, 2 / (self.MACD_FAST + 1))
+        slow = _ewm_step(self._ema_slow, close, 2 / (self.MACD_SLOW + 1))
+        dif = fast[0] - slow[0]
+        dea = _ewm_step(self._dea, dif, 2 / (self.MACD_SIGNAL + 1))
+        values.update({'dif': dif, 'dea': dea[0], 'macd': (dif - dea[0]) * 2,
+                       '_ema': (fast, slow, dea)})
+
+        # RSI（滚动均值口径）
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        for p in self.RSI_PERIODS:
+            if count < p:
+                values[f'rsi{p}'] = NAN
+                continue
+            gain_sum = self._gain_sums[p] + gain
+            loss_sum = self._loss_sums[p] + loss
+            if loss_sum > 0:
+                values[f'rsi{p}'] = 100 - 100 / (1 + gain_sum / loss_sum)
+            else:
+                values[f'rsi{p}'] = 100.0 if gain_sum > 0 else NAN
+        values['_gain_loss'] = (gain, loss)
+
+        # KDJ
+        rsv = NAN
+        if count >= self.KDJ_N:
+            lowest = min(self._low_queue[0][1], low) if self._low_queue else low
+            highest = max(self._high_queue[0][1], high) if self._high_queue else high
+            if highest != lowest:
+                rsv = (close - lowest) / (highest - lowest) * 100
+        k = _ewm_step(self._k, rsv, 1 / 3)
+        d = _ewm_step(self._d, k[0], 1 / 3)
+        values.update({'kdj_k': k[0], 'kdj_d': d[0], 'kdj_j': 3 * k[0] - 2 * d[0],
+                       '_kdj': (k, d)})
+
+        # 布林带（样本标准差）
+        n = self.BOLL_PERIOD
+        if count >= n:
+            total = self._sums[n] + offset
+            sumsq = self._boll_sumsq + offset * offset
+            std = math.sqrt(max(sumsq - total * total / n, 0.0) / (n - 1))
+            mid = base + total / n
+            values.update({'boll_mid': mid, 'boll_upper': mid + self.BOLL_STD * std,
+                           'boll_lower': mid - self.BOLL_STD * std})
+        else:
+            values.update({'boll_mid': NAN, 'boll_upper': NAN, 'boll_lower': NAN})
+
+        values['vol_ma5'] = (self._volume_sum + volume) / self.VOL_MA if count >= self.VOL_MA else NAN
+        return values
+
+    def _commit(self):
+        """把当前K线计入已完成状态"""
+        bar = self.bar
+        values = self._evaluate(bar)
+        if self._base is None:
+            self._base = bar['close']
+        offset = bar['close'] - self._base
+
+        boll_n = self.BOLL_PERIOD
+        if len(self._closes) >= boll_n - 1:
+            leaving = self._closes[-(boll_n - 1)]
+            self._boll_sumsq -= leaving * leaving
+        self._boll_sumsq += offset * offset
+        self._window_add(self._closes, self._sums, offset, self._sums)
+        self._closes.append(offset)
+
+        if len(self._volumes) >= self.VOL_MA - 1:
+            self._volume_sum -= self._volumes[0]
+        self._volume_sum += bar['volume']
+        self._volumes.append(bar['volume'])
+
+        gain, loss = values['_gain_loss']
+        self._window_add(self._gains, self._gain_sums, gain, self.RSI_PERIODS)
+        self._window_add(self._losses, self._loss_sums, loss, self.RSI_PERIODS)
+        self._gains.append(gain)
+        self._losses.append(loss)
+
+        self._ema_fast, self._ema_slow, self._dea = values['_ema']
+        self._k, self._d = values['_kdj']
+
+        index = self.committed
+        expired = index - (self.KDJ_N - 1)
+        while self._low_queue and self._low_queue[-1][1] >= bar['low']:
+            self._low_queue.pop()
+        self._low_queue.append((index, bar['low']))
+        while self._high_queue and self._high_queue[-1][1] <= bar['high']:
+            self._high_queue.pop()
+        self._high_queue.append((index, bar['high']))
+        while self._low_queue[0][0] <= expired:
+            self._low_queue.popleft()
+        while self._high_queue[0][0] <= expired:
+            self._high_queue.popleft()
+
+        self.committed += 1
+        self.prev_date = bar['date']
+        self.prev_close = bar['close']
+        self.bar = None
+
+    def push_bar(self, bar: Dict):
+        """
+        追加一根新K线（上一根当前K线计入已完成状态）
+
+        Args:
+            bar: K线字典（date、close、high、low、volume）
+        """
+        if self.bar is not None:
+            self._commit()
+        self.bar = dict(bar)
+
+    def replace_bar(self, bar: Dict):
+        """
+        替换当前K线（同一根K线内的实时行情更新）
+
+        Args:
+            bar: K线字典（date、close、high、low、volume）
+        """
+        self.bar = dict(bar)
+
+    # ---------- 输出 ----------
+
+    def snapshot(self) -> Optional[Dict]:
+        """
+        计算当前K线的技术指标
+
+        Returns:
+            技术指标字典，K线数不足时返回None
+        """
+        if self.bar is None or self.committed + 1 < self.MIN_BARS:
+            return None
+
+        values = self._evaluate(self.bar)
+        current_price = self.bar['close']
+        ma5, ma20, ma60 = values['ma5'], values['ma20'], values['ma60']
+
+        if current_price > ma5 > ma20 > ma60:
+            trend = 'up'
+        elif current_price < ma5 < ma20 < ma60:
+            trend = 'down'
+        else:
+            trend = 'sideways'
+
+        boll_upper, boll_mid, boll_lower = values['boll_upper'], values['boll_mid'], values['boll_lower']
+        if current_price >= boll_upper:
+            boll_position = '上轨附近（超买）'
+        elif current_price <= boll_lower:
+            boll_position = '下轨附近（超卖）'
+        elif current_price > boll_mid:
+            boll_position = '中轨上方'
+        else:
+            boll_position = '中轨下方'
+
+        vol_ma5 = values['vol_ma5']
+        return {
+            'ma5': ma5,
+            'ma20': ma20,
+            'ma60': ma60,
+            'trend': trend,
+            'macd_dif': values['dif'],
+            'macd_dea': values['dea'],
+            'macd': values['macd'],
+            'rsi6': values['rsi6'],
+            'rsi12': values['rsi12'],
+            'rsi24': values['rsi24'],
+            'kdj_k': values['kdj_k'],
+            'kdj_d': values['kdj_d'],
+            'kdj_j': values['kdj_j'],
+            'boll_upper': boll_upper,
+            'boll_mid': boll_mid,
+            'boll_lower': boll_lower,
+            'boll_position': boll_position,
+            'vol_ma5': vol_ma5,
+            'volume_ratio': self.bar['volume'] / vol_ma5 if vol_ma5 > 0 else 1.0
+        }
+
+
+def _bar_date(value) -> str:
+    """统一K线日期格式为 YYYY-MM-DD"""
+    return pd.Timestamp(str(value)).strftime('%Y-%m-%d')
+
+
+def _row_to_bar(row) -> Dict:
+    return {
+        'date': _bar_date(row['日期']),
+        'close': float(row['收盘']),
+        'high': float(row['最高']),
+        'low': float(row['最低']),
+        'volume': float(row['成交量']),
+    }
+
+
+def _same_price(a, b) -> bool:
+    return a is not None and b is not None and abs(a - b) <= 1e-6 * max(1.0, abs(b))
+
+
+def _is_trading_day(date: str) -> bool:
+    """
+    判断日期是否为A股交易日（交易日历由data_source_manager缓存；不可用时按工作日判断，不缓存结果）
+
+    Args:
+        date: 日期，格式为 YYYY-MM-DD
+
+    Returns:
+        是否为交易日
+    """
+    try:
+        from data_source_manager import data_source_manager
+        return len(data_source_manager.get_trade_dates(date, date)) > 0
+    except Exception:
+        return pd.Timestamp(date).weekday() < 5
+
+
+def _in_session(clock: str) -> bool:
+    """时间（HH:MM）是否在连续竞价时段内"""
+    return any(start <= clock <= end for start, end in TRADING_SESSIONS)
+
+
+class IndicatorEngine:
+    """按股票代码与周期维护增量指标状态"""
+
+    def __init__(self, max_age: float = 3600,
+                 is_trading_day: Optional[Callable[[str], bool]] = None):
+        """
+        初始化指标引擎
+
+        Args:
+            max_age: 最近一次与历史K线核对后，允许仅用实时行情更新的最长时间（秒）
+            is_trading_day: 交易日判断函数（参数为 YYYY-MM-DD），默认使用交易日历
+        """
+        self.max_age = max_age
+        self.is_trading_day = is_trading_day or _is_trading_day
+        self._states = {}
+        self._lock = threading.Lock()
+
+        self.seeds = 0
+        self.bar_updates = 0
+        self.tick_updates = 0
+
+    def _get_state(self, key) -> IncrementalIndicators:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = IncrementalIndicators()
+                self._states[key] = state
+            return state
+
+    def _seed(self, key, df: pd.DataFrame) -> IncrementalIndicators:
+        """用完整历史K线重新初始化状态"""
+        state = IncrementalIndicators()
+        dates = df['日期'].tolist()
+        closes = df['收盘'].astype(float).tolist()
+        highs = df['最高'].astype(float).tolist()
+        lows = df['最低'].astype(float).tolist()
+        volumes = df['成交量'].astype(float).tolist()
+        for date, close, high, low, volume in zip(dates, closes, highs, lows, volumes):
+            state.push_bar({'date': _bar_date(date), 'close': close, 'high': high,
+                            'low': low, 'volume': volume})
+        with self._lock:
+            self._states[key] = state
+            self.seeds += 1
+        return state
+
+    def update_from_history(self, symbol: str, df: pd.DataFrame, period: str = 'daily') -> Optional[Dict]:
+        """
+        用最新的历史K线更新指标
+
+        历史与已有状态衔接（前一根K线日期和收盘价一致）时只更新最后一根或追加一根，
+        否则（首次、换数据源、复权调整、跳过多根K线）用全部历史重新初始化
+
+        Args:
+            symbol: 股票代码
+            df: 历史K线DataFrame（按日期升序）
+            period: 周期（daily/weekly/monthly）
+
+        Returns:
+            技术指标字典，K线数不足时返回None
+        """
+        key = (symbol, period)
+        state = self._get_state(key)
+        last = _row_to_bar(df.iloc[-1])
+
+        with state.lock:
+            bar = state.bar
+            if bar is not None and len(df) >= 3:
+                previous = _row_to_bar(df.iloc[-2])
+                if (last['date'] == bar['date'] and previous['date'] == state.prev_date
+                        and _same_price(previous['close'], state.prev_close)):
+                    state.replace_bar(last)
+                    state.synced_at = time.time()
+                    self.bar_updates += 1
+                    return state.snapshot()
+                before = _row_to_bar(df.iloc[-3])
+                if (previous['date'] == bar['date'] and before['date'] == state.prev_date
+                        and _same_price(before['close'], state.prev_close)):
+                    # 上一根K线以历史数据的最终值为准
+                    state.replace_bar(previous)
+                    state.push_bar(last)
+                    state.synced_at = time.time()
+                    self.bar_updates += 1
+                    return state.snapshot()
+
+        state = self._seed(key, df)
+        with state.lock:
+            state.synced_at = time.time()
+            return state.snapshot()
+
+    def apply_quote(self, symbol: str, quote: Dict) -> Optional[Dict]:
+        """
+        用实时行情更新当日K线并返回日线指标
+
+        仅在状态已由历史K线初始化且未超过max_age时生效；行情日期与当前K线相同则替换当前K线，
+        晚于当前K线且为交易日交易时段内的行情则追加新K线。行情时间是获取时的本地时间，
+        周末、节假日或开盘前获取的行情只是上一交易日的数据，不能作为新K线
+
+        Args:
+            symbol: 股票代码
+            quote: 实时行情字典（current_price、high、low、volume、update_time、data_source）
+
+        Returns:
+            技术指标字典；状态不可用或行情不完整时返回None（调用方应改用历史K线计算）
+        """
+        with self._lock:
+            state = self._states.get((symbol, 'daily'))
+        if state is None or quote.get('data_source') not in TICK_SOURCES:
+            return None
+
+        try:
+            update_time = pd.Timestamp(str(quote['update_time']))
+            bar = {
+                'date': update_time.strftime('%Y-%m-%d'),
+                'close': float(quote['current_price']),
+                'high': float(quote['high']),
+                'low': float(quote['low']),
+                'volume': float(quote['volume']),
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not (bar['close'] > 0 and bar['high'] > 0 and bar['low'] > 0):
+            return None
+
+        with state.lock:
+            if state.bar is None or time.time() - state.synced_at > self.max_age:
+                return None
+            if bar['date'] == state.bar['date']:
+                state.replace_bar(bar)
+            elif (bar['date'] > state.bar['date'] and self.is_trading_day(bar['date'])
+                  and _in_session(update_time.strftime('%H:%M'))):
+                state.push_bar(bar)
+            else:
+                return None
+            self.tick_updates += 1
+            return state.snapshot()
+
+    def reset(self, symbol: Optional[str] = None):
+        """清除指定股票（默认全部）的指标状态"""
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                for key in [key for key in self._states if key[0] == symbol]:
+                    del self._states[key]
+
+    def stats(self) -> Dict:
+        """返回引擎统计信息"""
+        with self._lock:
+            symbols = len(self._states)
+        return {
+            'symbols': symbols,
+            'seeds': self.seeds,
+            'bar_updates': self.bar_updates,
+            'tick_updates': self.tick_updates,
+        }
+
+
+# 全局增量指标引擎实例
+indicator_engine = IndicatorEngine(
+    max_age=float(os.getenv('INDICATOR_ENGINE_MAX_AGE', '3600')),
+)
+
+
+if __name__ == '__main__':
+    import numpy as np
+
+    from indicator_kernels import _max_error, compute_all
+
+    rng = np.random.default_rng(11)
+    seeded, ticked = 200, 60
+    dates = pd.bdate_range('2025-01-02', periods=seeded + ticked)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, seeded + ticked)))
+    high = close * (1 + rng.uniform(0, 0.03, close.shape))
+    low = close * (1 - rng.uniform(0, 0.03, close.shape))
+    volume = rng.uniform(1e4, 1e6, close.shape)
+    df = pd.DataFrame({'日期': dates.strftime('%Y-%m-%d'), '收盘': close, '最高': high,
+                       '最低': low, '成交量': volume})
+
+    engine = IndicatorEngine(is_trading_day=lambda date: pd.Timestamp(date).weekday() < 5)
+    engine.update_from_history('000001', df.iloc[:seeded])
+
+    def quote(i, clock, fraction=1.0):
+        """第i根K线在fraction进度时的实时行情（fraction=1为收盘值）"""
+        price = close[i - 1] + (close[i] - close[i - 1]) * fraction
+        return {'current_price': price, 'high': max(high[i] if fraction == 1 else price, price),
+                'low': min(low[i] if fraction == 1 else price, price), 'volume': volume[i] * fraction,
+                'update_time': f"{df['日期'][i]} {clock}", 'data_source': 'tdx'}
+
+    # 非交易时段的行情不能开出新K线
+    assert engine.apply_quote('000001', quote(seeded, '09:05:00')) is None
+    assert engine.apply_quote('000001', dict(quote(seeded, '10:00:00'),
+                                             update_time='2025-10-04 10:00:00')) is None
+
+    # 增量：每根K线盘中多次替换，最后一次为收盘值，与批量公式对当前全部K线重算的结果比对
+    worst = {}
+    for i in range(seeded, seeded + ticked):
+        for clock, fraction in (('09:31:00', 0.2), ('11:00:00', 0.6), ('14:59:00', 1.0)):
+            indicators = engine.apply_quote('000001', quote(i, clock, fraction))
+        expected = compute_all(high[:i + 1], low[:i + 1], close[:i + 1], volume[:i + 1])
+        for name, values in expected.items():
+            worst[name] = max(worst.get(name, 0.0), _max_error(indicators[name], values[-1]))
+
+    for name, error in worst.items():
+        print(f"{name:<12} 最大相对误差 {error:.2e}")
+    assert max(worst.values()) < 1e-9, worst
+    print(f"增量指标与批量公式一致（种子{seeded}根 + 实时行情{ticked}根）: {engine.stats()}")
@@ -0,0 +1,487 @@
+"""
+向量化技术指标计算库
+所有指标在连续的float64数组上计算，支持一次计算 (股票数, K线数) 矩阵，可选numba加速
+
+@File: indicator_kernels.py
+@Contains: [sma, rolling_sum, rolling_std, rolling_min, rolling_max, ema, ewm, macd, rsi,
+            rsi_wilder, kdj, stoch, bollinger, arbr, compute_all, NUMBA_AVAILABLE]
+@Responsibilities:
+    - 提供滚动窗口、EMA等基础算子，缺失值口径与pandas一致（窗口内有NaN则结果为NaN）
+    - 提供MACD、RSI、KDJ、布林带、ARBR等指标，一维序列或二维矩阵（按行为股票）均可输入
+    - compute_all一次计算智能盯盘使用的全部指标，用于全市场筛选
+@Non-Responsibilities:
+    - 不负责获取行情数据
+    - 不负责逐笔增量更新（由indicator_engine负责）
+@Input: 价格/成交量数组（一维为单只股票，二维为 股票数 × K线数，按时间升序，缺失值为NaN）
+@Output: 与输入形状相同的指标数组
+
+运行 python indicator_kernels.py 可与pandas原实现做一致性校验并测试全市场计算耗时
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _as_matrix(values):
+    """转换为二维连续float64数组，返回 (矩阵, 是否为一维输入)"""
+    array = np.asarray(values, dtype=np.float64)
+    if array.ndim == 1:
+        return np.ascontiguousarray(array[np.newaxis, :]), True
+    return np.ascontiguousarray(array), False
+
+
+def _restore(matrix, is_1d):
+    return matrix[0] if is_1d else matrix
+
+
+def _nan_like(matrix):
+    return np.full(matrix.shape, np.nan)
+
+
+def _window_sums(matrix, window, power=1):
+    """
+    滚动窗口求和（按行），窗口不足或窗口内有NaN时为NaN
+
+    通过累加和相减计算，power=2时返回平方和；数值先减去每行首个有效值以减小误差，
+    返回 (窗口和, 行基准值)
+    """
+    base = np.zeros(matrix.shape[0])
+    if power == 2:
+        valid = ~np.isnan(matrix)
+        first = valid.argmax(axis=1)
+        base = np.where(valid.any(axis=1), matrix[np.arange(matrix.shape[0]), first], 0.0)
+    shifted = matrix - base[:, np.newaxis]
+
+    missing = np.isnan(shifted)
+    filled = np.where(missing, 0.0, shifted)
+    zeros = np.zeros((matrix.shape[0], 1))
+    totals = np.concatenate([zeros, np.cumsum(filled, axis=1)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(missing, axis=1)], axis=1)
+
+    result = _nan_like(matrix)
+    if window > matrix.shape[1]:
+        return result, base, None
+    sums = totals[:, window:] - totals[:, :-window]
+    gaps = counts[:, window:] - counts[:, :-window]
+    result[:, window - 1:] = np.where(gaps > 0, np.nan, sums)
+
+    squares = None
+    if power == 2:
+        square_totals = np.concatenate([zeros, np.cumsum(filled * filled, axis=1)], axis=1)
+        squares = _nan_like(matrix)
+        squares[:, window - 1:] = np.where(gaps > 0, np.nan, square_totals[:, window:] - square_totals[:, :-window])
+    return result, base, squares
+
+
+def rolling_sum(values, window):
+    """
+    滚动求和（等同 pandas rolling(window).sum()）
+
+    Args:
+        values: 一维或二维数组
+        window: 窗口长度
+
+    Returns:
+        与输入形状相同的数组
+    """
+    matrix, is_1d = _as_matrix(values)
+    sums, _, _ = _window_sums(matrix, window)
+    return _restore(sums, is_1d)
+
+
+def sma(values, window):
+    """简单移动平均（等同 pandas rolling(window).mean()）"""
+    matrix, is_1d = _as_matrix(values)
+    sums, _, _ = _window_sums(matrix, window)
+    return _restore(sums / window, is_1d)
+
+
+def rolling_std(values, window, ddof=1):
+    """
+    滚动标准差
+
+    Args:
+        values: 一维或二维数组
+        window: 窗口长度
+        ddof: 自由度修正（1为样本标准差，与pandas一致；0为总体标准差，与ta库一致）
+
+    Returns:
+        与输入形状相同的数组
+    """
+    matrix, is_1d = _as_matrix(values)
+    sums, _, squares = _window_sums(matrix, window, power=2)
+    variance = (squares - sums * sums / window) / (window - ddof)
+    return _restore(np.sqrt(np.maximum(variance, 0.0)), is_1d)
+
+
+def _rolling_extreme(values, window, reducer):
+    matrix, is_1d = _as_matrix(values)
+    result = _nan_like(matrix)
+    if window <= matrix.shape[1]:
+        windows = np.lib.stride_tricks.sliding_window_view(matrix, window, axis=1)
+        result[:, window - 1:] = reducer(windows, axis=2)
+    return _restore(result, is_1d)
+
+
+def rolling_min(values, window):
+    """滚动最小值（等同 pandas rolling(window).min()）"""
+    return _rolling_extreme(values, window, np.min)
+
+
+def rolling_max(values, window):
+    """滚动最大值（等同 pandas rolling(window).max()）"""
+    return _rolling_extreme(values, window, np.max)
+
+
+def _ewm_columns(matrix, alpha, min_periods, out):
+    """按时间逐列递推，每步对所有股票向量化计算"""
+    rows = matrix.shape[0]
+    weighted = np.full(rows, np.nan)
+    old_wt = np.ones(rows)
+    nobs = np.zeros(rows)
+    for t in range(matrix.shape[1]):
+        current = matrix[:, t]
+        observed = ~np.isnan(current)
+        started = ~np.isnan(weighted)
+
+        old_wt = np.where(started, old_wt * (1 - alpha), old_wt)
+        update = started & observed
+        blended = (old_wt * weighted + alpha * current) / (old_wt + alpha)
+        weighted = np.where(update, blended, weighted)
+        weighted = np.where(~started & observed, current, weighted)
+        old_wt = np.where(observed, 1.0, old_wt)
+
+        nobs += observed
+        out[:, t] = np.where(nobs >= min_periods, weighted, np.nan)
+    return out
+
+
+def _ewm_rows(matrix, alpha, min_periods, out):
+    """逐行逐点递推（供numba编译）"""
+    for i in range(matrix.shape[0]):
+        weighted = np.nan
+        old_wt = 1.0
+        nobs = 0
+        for t in range(matrix.shape[1]):
+            current = matrix[i, t]
+            observed = current == current
+            if weighted == weighted:
+                old_wt *= 1 - alpha
+                if observed:
+                    if weighted != current:
+                        weighted = (old_wt * weighted + alpha * current) / (old_wt + alpha)
+                    old_wt = 1.0
+            elif observed:
+                weighted = current
+            if observed:
+                nobs += 1
+            out[i, t] = weighted if nobs >= min_periods else np.nan
+    return out
+
+
+if NUMBA_AVAILABLE:
+    _ewm_kernel = njit(cache=True)(_ewm_rows)
+else:
+    _ewm_kernel = _ewm_columns
+
+
+def ewm(values, alpha, min_periods=0):
+    """
+    指数加权平均（等同 pandas ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean()）
+
+    Args:
+        values: 一维或二维数组
+        alpha: 平滑系数
+        min_periods: 有效观测数不足时输出NaN
+
+    Returns:
+        与输入形状相同的数组
+    """
+    matrix, is_1d = _as_matrix(values)
+    out = np.empty_like(matrix)
+    _ewm_kernel(matrix, float(alpha), max(int(min_periods), 1), out)
+    return _restore(out, is_1d)
+
+
+def ema(values, span, min_periods=0):
+    """指数移动平均（等同 pandas ewm(span=span, adjust=False).mean()）"""
+    return ewm(values, 2.0 / (span + 1), min_periods)
+
+
+def _diff(matrix):
+    delta = _nan_like(matrix)
+    delta[:, 1:] = matrix[:, 1:] - matrix[:, :-1]
+    return delta
+
+
+def macd(close, fast=12, slow=26, signal=9, warmup=False):
+    """
+    MACD
+
+    Args:
+        close: 收盘价
+        fast, slow, signal: 快线、慢线、信号线周期
+        warmup: 是否在周期不足时输出NaN（ta库口径）
+
+    Returns:
+        (DIF, DEA, MACD柱)，MACD柱 = (DIF - DEA) * 2
+    """
+    ema_fast = ema(close, fast, fast if warmup else 0)
+    ema_slow = ema(close, slow, slow if warmup else 0)
+    dif = ema_fast - ema_slow
+    dea = ema(dif, signal, signal if warmup else 0)
+    return dif, dea, (dif - dea) * 2
+
+
+def _gains_losses(close):
+    matrix, is_1d = _as_matrix(close)
+    delta = _diff(matrix)
+    # 与 delta.where(delta > 0, 0) 一致：首个NaN差值按0处理
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    return gains, losses, is_1d
+
+
+def rsi(close, period=6):
+    """
+    RSI（涨跌幅滚动均值口径，与智能盯盘一致）
+
+    Args:
+        close: 收盘价
+        period: 周期
+
+    Returns:
+        与输入形状相同的数组
+    """
+    gains, losses, is_1d = _gains_losses(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100 - 100 / (1 + sma(gains, period) / sma(losses, period))
+    return _restore(result, is_1d)
+
+
+def rsi_wilder(close, period=14):
+    """RSI（Wilder平滑口径，与ta库 ta.momentum.rsi 一致）"""
+    gains, losses, is_1d = _gains_losses(close)
+    avg_gain = ewm(gains, 1.0 / period, period)
+    avg_loss = ewm(losses, 1.0 / period, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    return _restore(result, is_1d)
+
+
+def _rsv(high, low, close, window):
+    close_matrix, is_1d = _as_matrix(close)
+    lowest = _as_matrix(rolling_min(low, window))[0]
+    highest = _as_matrix(rolling_max(high, window))[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (close_matrix - lowest) / (highest - lowest) * 100, is_1d
+
+
+def kdj(high, low, close, n=9, m1=3, m2=3):
+    """
+    KDJ
+
+    Args:
+        high, low, close: 最高价、最低价、收盘价
+        n: RSV周期
+        m1, m2: K、D平滑周期
+
+    Returns:
+        (K, D, J)
+    """
+    rsv, is_1d = _rsv(high, low, close, n)
+    k = ewm(rsv, 1.0 / m1)
+    d = ewm(k, 1.0 / m2)
+    return _restore(k, is_1d), _restore(d, is_1d), _restore(3 * k - 2 * d, is_1d)
+
+
+def stoch(high, low, close, window=14, smooth_window=3):
+    """随机指标（与ta库 stoch / stoch_signal 一致），返回 (%K, %D)"""
+    k, is_1d = _rsv(high, low, close, window)
+    return _restore(k, is_1d), _restore(sma(k, smooth_window), is_1d)
+
+
+def bollinger(close, period=20, num_std=2, ddof=1):
+    """
+    布林带
+
+    Args:
+        close: 收盘价
+        period: 周期
+        num_std: 标准差倍数
+        ddof: 标准差自由度修正（智能盯盘为1，ta库为0）
+
+    Returns:
+        (上轨, 中轨, 下轨)
+    """
+    mid = sma(close, period)
+    std = rolling_std(close, period, ddof)
+    return mid + num_std * std, mid, mid - num_std * std
+
+
+def arbr(open_, high, low, close, period=26):
+    """
+    ARBR情绪指标
+
+    AR = N日内(H-O)之和 / N日内(O-L)之和 × 100
+    BR = N日内(H-CY)之和 / N日内(CY-L)之和 × 100，CY为前收盘
+
+    Returns:
+        (AR, BR)，分母为0时为NaN
+    """
+    open_matrix, is_1d = _as_matrix(open_)
+    high_matrix, _ = _as_matrix(high)
+    low_matrix, _ = _as_matrix(low)
+    close_matrix, _ = _as_matrix(close)
+    prev_close = _nan_like(close_matrix)
+    prev_close[:, 1:] = close_matrix[:, :-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ar = rolling_sum(high_matrix - open_matrix, period) / rolling_sum(open_matrix - low_matrix, period) * 100
+        br = rolling_sum(high_matrix - prev_close, period) / rolling_sum(prev_close - low_matrix, period) * 100
+    ar[~np.isfinite(ar)] = np.nan
+    br[~np.isfinite(br)] = np.nan
+    return _restore(ar, is_1d), _restore(br, is_1d)
+
+
+def compute_all(high, low, close, volume):
+    """
+    一次计算智能盯盘使用的全部指标
+
+    Args:
+        high, low, close, volume: 一维或二维（股票数 × K线数）数组
+
+    Returns:
+        dict: 指标名 -> 数组（ma5、ma20、ma60、macd_dif、macd_dea、macd、rsi6、rsi12、rsi24、
+              kdj_k、kdj_d、kdj_j、boll_upper、boll_mid、boll_lower、vol_ma5、volume_ratio）
+    """
+    dif, dea, histogram = macd(close)
+    k, d, j = kdj(high, low, close)
+    upper, mid, lower = bollinger(close)
+    vol_ma5 = sma(volume, 5)
+    volume_matrix = np.asarray(volume, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = np.where(vol_ma5 > 0, volume_matrix / vol_ma5, 1.0)
+
+    return {
+        'ma5': sma(close, 5),
+        'ma20': sma(close, 20),
+        'ma60': sma(close, 60),
+        'macd_dif': dif,
+        'macd_dea': dea,
+        'macd': histogram,
+        'rsi6': rsi(close, 6),
+        'rsi12': rsi(close, 12),
+        'rsi24': rsi(close, 24),
+        'kdj_k': k,
+        'kdj_d': d,
+        'kdj_j': j,
+        'boll_upper': upper,
+        'boll_mid': mid,
+        'boll_lower': lower,
+        'vol_ma5': vol_ma5,
+        'volume_ratio': volume_ratio,
+    }
+
+
+def _pandas_reference(df):
+    """智能盯盘原pandas实现（一致性校验基准）"""
+    import pandas as pd
+
+    close, high, low = df['收盘'], df['最高'], df['最低']
+    result = pd.DataFrame(index=df.index)
+    for n in (5, 20, 60):
+        result[f'ma{n}'] = close.rolling(window=n).mean()
+    result['macd_dif'] = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    result['macd_dea'] = result['macd_dif'].ewm(span=9, adjust=False).mean()
+    result['macd'] = (result['macd_dif'] - result['macd_dea']) * 2
+    for period in (6, 12, 24):
+        delta = close.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        result[f'rsi{period}'] = 100 - (100 / (1 + gain / loss))
+    rsv = (close - low.rolling(window=9).min()) / (high.rolling(window=9).max() - low.rolling(window=9).min()) * 100
+    result['kdj_k'] = rsv.ewm(com=2, adjust=False).mean()
+    result['kdj_d'] = result['kdj_k'].ewm(com=2, adjust=False).mean()
+    result['kdj_j'] = 3 * result['kdj_k'] - 2 * result['kdj_d']
+    result['boll_mid'] = close.rolling(window=20).mean()
+    std = close.rolling(window=20).std()
+    result['boll_upper'] = result['boll_mid'] + 2 * std
+    result['boll_lower'] = result['boll_mid'] - 2 * std
+    result['vol_ma5'] = df['成交量'].rolling(window=5).mean()
+    return result
+
+
+def _max_error(actual, expected):
+    """相对误差最大值，NaN位置必须一致"""
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    if not np.array_equal(np.isnan(actual), np.isnan(expected)):
+        return np.inf
+    mask = ~np.isnan(expected)
+    if not mask.any():
+        return 0.0
+    return float(np.max(np.abs(actual[mask] - expected[mask]) / np.maximum(1.0, np.abs(expected[mask]))))
+
+
+if __name__ == '__main__':
+    import time
+
+    import pandas as pd
+
+    rng = np.random.default_rng(7)
+    symbols, bars = 5000, 250
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, bars)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.03, close.shape))
+    low = close * (1 - rng.uniform(0, 0.03, close.shape))
+    open_ = low + (high - low) * rng.uniform(0, 1, close.shape)
+    volume = rng.uniform(1e4, 1e6, close.shape)
+    # 一字板与停牌：最高价等于最低价、缺失K线
+    close[0, 100:115] = high[0, 100:115] = low[0, 100:115] = open_[0, 100:115] = close[0, 99]
+    close[1, :30] = high[1, :30] = low[1, :30] = open_[1, :30] = volume[1, :30] = np.nan
+
+    print(f"numba加速: {'是' if NUMBA_AVAILABLE else '否'}")
+    compute_all(high[:2], low[:2], close[:2], volume[:2])  # numba首次编译
+
+    start = time.perf_counter()
+    indicators = compute_all(high, low, close, volume)
+    elapsed = time.perf_counter() - start
+    print(f"全市场指标计算: {symbols}只 × {bars}根K线，耗时 {elapsed:.3f}s")
+
+    # 与pandas原实现逐只比对（抽样）
+    worst = {}
+    for row in list(range(5)) + list(rng.choice(symbols, 45, replace=False)):
+        df = pd.DataFrame({'收盘': close[row], '最高': high[row], '最低': low[row], '成交量': volume[row]})
+        expected = _pandas_reference(df)
+        for name in expected.columns:
+            worst[name] = max(worst.get(name, 0.0), _max_error(indicators[name][row], expected[name]))
+
+    # ta库口径与ARBR
+    df = pd.DataFrame({'open': open_[2], 'high': high[2], 'low': low[2], 'close': close[2]})
+    delta = df['close'].diff()
+    avg_gain = delta.where(delta > 0, 0.0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    avg_loss = (-delta.where(delta < 0, 0.0)).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    worst['rsi_wilder'] = _max_error(rsi_wilder(close[2], 14),
+                                     np.where(avg_loss == 0, 100, 100 - 100 / (1 + avg_gain / avg_loss)))
+    stoch_k = 100 * (df['close'] - df['low'].rolling(14).min()) / (df['high'].rolling(14).max() - df['low'].rolling(14).min())
+    worst['stoch'] = max(_max_error(stoch(high[2], low[2], close[2])[0], stoch_k),
+                         _max_error(stoch(high[2], low[2], close[2])[1], stoch_k.rolling(3).mean()))
+    worst['bollinger_ddof0'] = _max_error(rolling_std(close[2], 20, ddof=0), df['close'].rolling(20).std(ddof=0))
+    ar = df['high'].sub(df['open']).rolling(26).sum() / df['open'].sub(df['low']).rolling(26).sum() * 100
+    prev_close = df['close'].shift(1)
+    br = df['high'].sub(prev_close).rolling(26).sum() / prev_close.sub(df['low']).rolling(26).sum() * 100
+    kernel_ar, kernel_br = arbr(open_[2], high[2], low[2], close[2])
+    worst['arbr'] = max(_max_error(kernel_ar, ar.replace([np.inf, -np.inf], np.nan)),
+                        _max_error(kernel_br, br.replace([np.inf, -np.inf], np.nan)))
+
+    failed = False
+    for name, error in worst.items():
+        ok = error < 1e-8
+        failed |= not ok
+        print(f"  {'✅' if ok else '❌'} {name:<16} 最大相对误差 {error:.2e}")
+    print("一致性校验" + ("未通过" if failed else "通过"))
+    raise SystemExit(1 if failed else 0)
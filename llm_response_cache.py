@@ -0,0 +1,269 @@
+"""
+LLM响应缓存
+以(模型, 规范化消息, temperature, max_tokens)的哈希为键，把大模型响应持久化到SQLite
+
+@File: llm_response_cache.py
+@Contains: [LLMResponseCache, llm_response_cache]
+@Responsibilities:
+    - 计算与分析时间戳无关的请求哈希（同一交易日内相同数据的请求命中同一键）
+    - SQLite持久化缓存，支持TTL过期与按容量淘汰
+    - 统计命中/未命中次数
+@Non-Responsibilities:
+    - 不负责调用大模型（由DeepSeekClient、SmartMonitorDeepSeek调用）
+@Input: 模型名称、消息列表、采样参数
+@Output: 缓存的响应文本
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+# 分析时间头：DeepSeekClient自动注入或提示词中自带，精确到秒，规范化为日期
+_ANALYSIS_TIME_PATTERN = re.compile(
+    r'【分析时间】\s*当前日期时间:\s*(\d{4}-\d{2}-\d{2})[^\n]*\n(?:时区:[^\n]*\n)?'
+)
+
+
+class LLMResponseCache:
+    """基于SQLite的LLM响应缓存"""
+
+    def __init__(self, db_path, enabled=False, ttl_seconds=86400, max_bytes=200 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            db_path: 缓存数据库路径
+            enabled: 是否启用（默认关闭，需显式开启）
+            ttl_seconds: 缓存有效期（秒）
+            max_bytes: 缓存响应总字节数上限，超过时淘汰最久未使用的条目
+        """
+        self.db_path = db_path
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+        # 本进程内的命中统计（累计值持久化在llm_cache_stats表）
+        self.hits = 0
+        self.misses = 0
+
+        if self.enabled:
+            self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _init_db(self):
+        """初始化缓存表"""
+        try:
+            conn = self._connect()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_response_cache(last_access)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('INSERT OR IGNORE INTO llm_cache_stats (id, hits, misses) VALUES (1, 0, 0)')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"[LLM缓存] ⚠️ 初始化失败，已禁用缓存: {e}")
+            self.enabled = False
+
+    @staticmethod
+    def normalize_content(content):
+        """把分析时间头替换为日期，其他内容保持不变"""
+        return _ANALYSIS_TIME_PATTERN.sub(lambda m: f'【分析日期】{m.group(1)}\n', content)
+
+    def make_key(self, model, messages, temperature, max_tokens):
+        """
+        计算请求的缓存键
+
+        Args:
+            model: 模型名称
+            messages: 消息列表
+            temperature: 温度参数
+            max_tokens: 最大token数
+
+        Returns:
+            str: SHA-256十六进制摘要
+        """
+        normalized = [
+            {'role': msg.get('role'), 'content': self.normalize_content(str(msg.get('content', '')))}
+            for msg in messages
+        ]
+        # 消息中没有分析时间头时，以当天日期区分（保证只在同一交易日内复用）
+        payload = json.dumps({
+            'model': model,
+            'messages': normalized,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'date': datetime.now().strftime('%Y-%m-%d'),
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        try:
+            conn = self._connect()
+            column = 'hits' if hit else 'misses'
+            conn.execute(f'UPDATE llm_cache_stats SET {column} = {column} + 1 WHERE id = 1')
+            conn.commit()
+            conn.close()
+        except Exception:
+            pass
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            str: 缓存的响应，未命中或已过期返回None
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT response, created_at FROM llm_response_cache WHERE cache_key = ?', (key,)
+            ).fetchone()
+            now = time.time()
+            if row and now - row[1] <= self.ttl_seconds:
+                conn.execute('UPDATE llm_response_cache SET last_access = ? WHERE cache_key = ?', (now, key))
+                conn.commit()
+                conn.close()
+                self._record(True)
+                return row[0]
+            if row:
+                conn.execute('DELETE FROM llm_response_cache WHERE cache_key = ?', (key,))
+                conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"[LLM缓存] ⚠️ 读取失败: {e}")
+
+        self._record(False)
+        return None
+
+    def put(self, key, response, model=None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            response: 响应文本
+            model: 模型名称（仅用于统计）
+        """
+        if not self.enabled or not response:
+            return
+
+        try:
+            now = time.time()
+            conn = self._connect()
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_response_cache
+                (cache_key, model, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, model, response, len(response.encode('utf-8')), now, now))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"[LLM缓存] ⚠️ 写入失败: {e}")
+            return
+
+        with self._lock:
+            self._puts_since_evict += 1
+            should_evict = self._puts_since_evict >= 20
+            if should_evict:
+                self._puts_since_evict = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """删除过期条目，并在超过容量时按最久未使用淘汰"""
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM llm_response_cache WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM llm_response_cache').fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute(
+                    'SELECT cache_key, size FROM llm_response_cache ORDER BY last_access'
+                ).fetchall()
+                stale = []
+                for cache_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((cache_key,))
+                    total -= size
+                conn.executemany('DELETE FROM llm_response_cache WHERE cache_key = ?', stale)
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"[LLM缓存] ⚠️ 淘汰失败: {e}")
+
+    def stats(self):
+        """
+        返回缓存统计
+
+        Returns:
+            dict: 本进程与累计的命中/未命中次数、条目数、占用字节数
+        """
+        result = {
+            'enabled': self.enabled,
+            'session_hits': self.hits,
+            'session_misses': self.misses,
+            'total_hits': 0,
+            'total_misses': 0,
+            'entries': 0,
+            'bytes': 0,
+        }
+        if not self.enabled:
+            return result
+
+        try:
+            conn = self._connect()
+            hits, misses = conn.execute('SELECT hits, misses FROM llm_cache_stats WHERE id = 1').fetchone()
+            entries, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_response_cache'
+            ).fetchone()
+            conn.close()
+            result.update({'total_hits': hits, 'total_misses': misses, 'entries': entries, 'bytes': size})
+        except Exception as e:
+            print(f"[LLM缓存] ⚠️ 读取统计失败: {e}")
+        return result
+
+
+# 全局LLM响应缓存实例（LLM_CACHE_ENABLED=true时启用）
+llm_response_cache = LLMResponseCache(
+    db_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'llm_response_cache.db'),
+    enabled=os.getenv('LLM_CACHE_ENABLED', 'false').lower() == 'true',
+    ttl_seconds=int(float(os.getenv('LLM_CACHE_TTL_HOURS', '24')) * 3600),
+    max_bytes=int(os.getenv('LLM_CACHE_MAX_MB', '200')) * 1024 * 1024,
+)
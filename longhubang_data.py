@@ -3,12 +3,14 @@
 使用StockAPI获取龙虎榜数据
 """
 
-import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-import time
 import warnings
 
+from http_client import http_client
+from rate_limiter import rate_limiter
+
 warnings.filterwarnings('ignore')
 
 
@@ -26,8 +28,7 @@ class LonghubangDataFetcher:
         self.base_url = "https://www.stockapi.com.cn/v1"
         self.api_key = api_key
         self.max_retries = 3  # 最大重试次数
-        self.retry_delay = 2  # 重试延迟（秒）
-        self.request_delay = 0.025  # 请求间隔（秒），40次/秒 = 0.025秒/次
+        self.max_workers = 8  # 多日并发请求线程数（请求频率由rate_limiter限制在40次/秒）
     
     def _safe_request(self, url, params=None):
         """
@@ -40,31 +41,30 @@ class LonghubangDataFetcher:
         Returns:
             dict: 响应数据
         """
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(url, params=params, timeout=10)
-                
-                # 添加请求延迟，遵守40次/秒的限制
-                time.sleep(self.request_delay)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('code') == 20000:
-                        return data
-                    else:
-                        print(f"    API返回错误: {data.get('msg', '未知错误')}")
-                        return None
-                else:
-                    print(f"    HTTP错误: {response.status_code}")
-                    
-            except Exception as e:
-                if attempt < self.max_retries - 1:
-                    print(f"    请求失败，{self.retry_delay}秒后重试... (尝试 {attempt + 1}/{self.max_retries})")
-                    time.sleep(self.retry_delay)
-                else:
-                    print(f"    请求失败，已达最大重试次数: {e}")
-                    return None
+        # 遵守StockAPI 40次/秒的限制（配额充足时不等待）
+        rate_limiter.acquire('stockapi')
+        
+        try:
+            # 连接异常、429及5xx由共享HTTP客户端按指数退避重试
+            response = http_client.get(url, params=params, timeout=10, retries=self.max_retries - 1)
+        except Exception as e:
+            print(f"    请求失败，已达最大重试次数: {e}")
+            return None
+        
+        if response.status_code != 200:
+            print(f"    HTTP错误: {response.status_code}")
+            return None
         
+        try:
+            data = response.json()
+        except ValueError as e:
+            print(f"    响应解析失败: {e}")
+            return None
+        
+        if data.get('code') == 20000:
+            return data
+        
+        print(f"    API返回错误: {data.get('msg', '未知错误')}")
         return None
     
     def get_longhubang_data(self, date):
@@ -75,7 +75,7 @@ class LonghubangDataFetcher:
             date: 日期，格式为 YYYY-MM-DD，如 "2023-03-21"
             
         Returns:
-            dict: 龙虎榜数据
+            dict: 龙虎榜数据（当日无上榜记录时data为空列表），请求失败返回None
         """
         print(f"[智瞰龙虎] 获取 {date} 的龙虎榜数据...")
         
@@ -84,64 +84,129 @@ class LonghubangDataFetcher:
         
         result = self._safe_request(url, params)
         
-        if result and result.get('data'):
+        if result is None:
+            print(f"    ✗ {date} 请求失败（详见上方错误）")
+            return None
+        
+        result['data'] = result.get('data') or []
+        if result['data']:
             print(f"    ✓ 成功获取 {len(result['data'])} 条龙虎榜记录")
-            return result
         else:
-            print(f"    ✗ 未获取到数据")
-            return None
+            print(f"    ✓ {date} 无龙虎榜记录")
+        return result
     
-    def get_longhubang_data_range(self, start_date, end_date):
+    def get_trade_dates(self, start_date, end_date):
         """
-        获取日期范围内的龙虎榜数据
+        获取日期范围内的交易日（跳过周末与节假日，不含未来日期）
         
         Args:
             start_date: 开始日期，格式为 YYYY-MM-DD
             end_date: 结束日期，格式为 YYYY-MM-DD
             
         Returns:
-            list: 龙虎榜数据列表
+            list: 交易日列表，格式为 YYYY-MM-DD
         """
-        print(f"[智瞰龙虎] 获取 {start_date} 至 {end_date} 的龙虎榜数据...")
+        try:
+            from data_source_manager import data_source_manager
+            return [d.strftime('%Y-%m-%d') for d in data_source_manager.get_trade_dates(start_date, end_date)]
+        except Exception as e:
+            print(f"[智瞰龙虎] ⚠️ 交易日历不可用，按工作日请求: {e}")
+            end = min(pd.Timestamp(end_date), pd.Timestamp(datetime.now().date()))
+            return [d.strftime('%Y-%m-%d') for d in pd.bdate_range(start_date, end)]
+    
+    def get_recent_trade_dates(self, days=5):
+        """
+        获取最近N个交易日
         
-        all_data = []
+        Args:
+            days: 天数
+            
+        Returns:
+            list: 交易日列表 YYYY-MM-DD（升序）
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days * 2 + 10)  # 覆盖长假，确保包含足够的交易日
         
-        # 转换日期
-        current_date = datetime.strptime(start_date, '%Y-%m-%d')
-        end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
+        trade_dates = self.get_trade_dates(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        return trade_dates[-days:] if days > 0 else []
+    
+    def get_longhubang_data_range(self, start_date, end_date, on_data=None):
+        """
+        获取日期范围内的龙虎榜数据（按交易日并发请求）
+        
+        Args:
+            start_date: 开始日期，格式为 YYYY-MM-DD
+            end_date: 结束日期，格式为 YYYY-MM-DD
+            on_data: 单日数据回调 on_data(date, records)，每成功获取一天（含无记录的交易日）立即调用（如逐日写入数据库）
+            
+        Returns:
+            list: 龙虎榜数据列表（按日期升序）
+        """
+        trade_dates = self.get_trade_dates(start_date, end_date)
+        print(f"[智瞰龙虎] 获取 {start_date} 至 {end_date} 的龙虎榜数据（{len(trade_dates)} 个交易日）...")
+        return self.get_longhubang_data_dates(trade_dates, on_data=on_data)
+    
+    def get_longhubang_data_dates(self, trade_dates, on_data=None):
+        """
+        并发获取指定交易日的龙虎榜数据
         
-        while current_date <= end_date_obj:
-            date_str = current_date.strftime('%Y-%m-%d')
+        Args:
+            trade_dates: 交易日列表 YYYY-MM-DD
+            on_data: 单日数据回调 on_data(date, records)，无记录的交易日records为空列表，请求失败的日期不回调
             
-            # 跳过周末
-            if current_date.weekday() < 5:  # 0-4表示周一到周五
-                result = self.get_longhubang_data(date_str)
-                if result and result.get('data'):
-                    all_data.extend(result['data'])
+        Returns:
+            list: 龙虎榜数据列表（按日期升序）
+        """
+        if not trade_dates:
+            return []
+        
+        data_by_date = {}
+        failed_dates = []
+        workers = min(self.max_workers, len(trade_dates))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_date = {
+                executor.submit(self.get_longhubang_data, date): date
+                for date in trade_dates
+            }
             
-            # 下一天
-            current_date += timedelta(days=1)
+            for future in as_completed(future_to_date):
+                date = future_to_date[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"    ✗ {date} 获取失败: {e}")
+                    result = None
+                
+                if result is None:
+                    failed_dates.append(date)
+                    continue
+                
+                data_by_date[date] = result['data']
+                if on_data:
+                    on_data(date, result['data'])
+        
+        all_data = []
+        for date in trade_dates:
+            all_data.extend(data_by_date.get(date, []))
         
-        print(f"[智瞰龙虎] ✓ 共获取 {len(all_data)} 条记录")
+        with_data = sum(1 for records in data_by_date.values() if records)
+        print(f"[智瞰龙虎] ✓ 共获取 {len(all_data)} 条记录（{with_data}/{len(trade_dates)} 个交易日有数据）")
+        if failed_dates:
+            print(f"[智瞰龙虎] ⚠️ {len(failed_dates)} 个交易日获取失败，下次运行重试: {', '.join(sorted(failed_dates))}")
         return all_data
     
-    def get_recent_days_data(self, days=5):
+    def get_recent_days_data(self, days=5, on_data=None):
         """
         获取最近N个交易日的龙虎榜数据
         
         Args:
             days: 天数（默认5天）
+            on_data: 单日数据回调（见get_longhubang_data_range）
             
         Returns:
             list: 龙虎榜数据列表
         """
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days * 2)  # 乘以2以确保包含足够的交易日
-        
-        return self.get_longhubang_data_range(
-            start_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        )
+        return self.get_longhubang_data_dates(self.get_recent_trade_dates(days), on_data=on_data)
     
     def parse_to_dataframe(self, data_list):
         """
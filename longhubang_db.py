@@ -69,6 +69,57 @@ class LonghubangDatabase:
         CREATE INDEX IF NOT EXISTS idx_net_inflow ON longhubang_records(net_inflow)
         ''')
         
+        # 按日期的数据完整性清单（已收盘且获取完整的日期直接从本地读取）
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS longhubang_fetch_manifest (
+            date TEXT PRIMARY KEY,
+            record_count INTEGER NOT NULL,
+            complete INTEGER NOT NULL DEFAULT 0,
+            fetched_at TEXT NOT NULL
+        )
+        ''')
+        
+        # 按日汇总表（游资×日、股票×日），排名查询只需累加区间内的每日汇总行
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS longhubang_youzi_daily (
+            date TEXT NOT NULL,
+            youzi_name TEXT,
+            trade_count INTEGER NOT NULL,
+            total_buy REAL,
+            total_sell REAL,
+            total_net_inflow REAL
+        )
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_youzi_daily_date ON longhubang_youzi_daily(date)
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS longhubang_stock_daily (
+            date TEXT NOT NULL,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT,
+            seat_count INTEGER NOT NULL,
+            total_buy REAL,
+            total_sell REAL,
+            total_net_inflow REAL,
+            youzi_names TEXT,
+            concepts TEXT
+        )
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_daily_date ON longhubang_stock_daily(date)
+        ''')
+        
+        # 升级前保存的记录一次性补建按日汇总，之后由save_longhubang_data增量维护
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] < 1:
+            cursor.execute('SELECT DISTINCT date FROM longhubang_records')
+            history_dates = [row[0] for row in cursor.fetchall()]
+            self._refresh_daily_rollups(cursor, history_dates)
+            cursor.execute('PRAGMA user_version = 1')
+            if history_dates:
+                self.logger.info(f"[智瞰龙虎] 补建 {len(history_dates)} 个交易日的按日汇总")
+        
         # AI分析报告表
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS longhubang_analysis (
@@ -107,53 +158,88 @@ class LonghubangDatabase:
         
         self.logger.info("[智瞰龙虎] 数据库初始化完成")
     
+    @staticmethod
+    def _normalize_batch(data_list):
+        """
+        将一批龙虎榜记录（拼音或中文字段）一次性转换为列数组并校验
+        
+        Args:
+            data_list: 龙虎榜数据列表
+            
+        Returns:
+            tuple: (可写入的行元组列表, 无效记录数)
+        """
+        def column(py_key, cn_key):
+            return [record.get(py_key) or record.get(cn_key) for record in data_list]
+        
+        def amounts(py_key, cn_key):
+            values = []
+            for value in column(py_key, cn_key):
+                try:
+                    values.append(float(value or 0))
+                except (TypeError, ValueError):
+                    values.append(None)
+            return values
+        
+        dates = column('rq', '日期')
+        codes = column('gpdm', '股票代码')
+        # 游资、营业部参与唯一约束，缺失时写入空字符串（NULL不参与去重，重复获取会产生重复记录）
+        youzi = [name or '' for name in column('yzmc', '游资名称')]
+        yyb = [name or '' for name in column('yyb', '营业部')]
+        columns = zip(
+            dates, codes, column('gpmc', '股票名称'), youzi, yyb, column('sblx', '榜单类型'),
+            amounts('mrje', '买入金额'), amounts('mcje', '卖出金额'), amounts('jlrje', '净流入金额'),
+            column('gl', '概念')
+        )
+        
+        # 缺少日期、股票代码或金额无法解析的记录不写入
+        rows = [row for row in columns if row[0] and row[1] and None not in row[6:9]]
+        return rows, len(data_list) - len(rows)
+    
     def save_longhubang_data(self, data_list):
         """
-        保存龙虎榜数据
+        批量保存龙虎榜数据（单个事务内批量写入，已存在的记录跳过）
         
         Args:
             data_list: 龙虎榜数据列表
             
         Returns:
-            int: 成功保存的记录数
+            dict: 写入统计 {inserted: 新增记录数, duplicates: 已存在的重复记录数, invalid: 无效记录数}
         """
+        stats = {'inserted': 0, 'duplicates': 0, 'invalid': 0}
         if not data_list:
-            return 0
+            return stats
+        
+        rows, stats['invalid'] = self._normalize_batch(data_list)
+        if stats['invalid']:
+            self.logger.warning(f"[智瞰龙虎] {stats['invalid']} 条记录缺少日期/股票代码或金额无效，已跳过")
+        if not rows:
+            return stats
         
         conn = self.get_connection()
         cursor = conn.cursor()
+        try:
+            cursor.executemany('''
+            INSERT OR IGNORE INTO longhubang_records 
+            (date, stock_code, stock_name, youzi_name, yingye_bu, list_type, 
+             buy_amount, sell_amount, net_inflow, concepts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            stats['inserted'] = cursor.rowcount
+            stats['duplicates'] = len(rows) - stats['inserted']
+            
+            # 有新增记录时重算本批涉及日期的按日汇总，与原始记录在同一事务中提交
+            if stats['inserted']:
+                self._refresh_daily_rollups(cursor, {row[0] for row in rows})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
         
-        saved_count = 0
-        
-        for record in data_list:
-            try:
-                cursor.execute('''
-                INSERT OR REPLACE INTO longhubang_records 
-                (date, stock_code, stock_name, youzi_name, yingye_bu, list_type, 
-                 buy_amount, sell_amount, net_inflow, concepts)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    record.get('rq') or record.get('日期'),
-                    record.get('gpdm') or record.get('股票代码'),
-                    record.get('gpmc') or record.get('股票名称'),
-                    record.get('yzmc') or record.get('游资名称'),
-                    record.get('yyb') or record.get('营业部'),
-                    record.get('sblx') or record.get('榜单类型'),
-                    float(record.get('mrje') or record.get('买入金额') or 0),
-                    float(record.get('mcje') or record.get('卖出金额') or 0),
-                    float(record.get('jlrje') or record.get('净流入金额') or 0),
-                    record.get('gl') or record.get('概念')
-                ))
-                saved_count += 1
-            except Exception as e:
-                self.logger.exception(f"保存记录失败: {e}", exc_info=True)
-                continue
-        
-        conn.commit()
-        conn.close()
-        
-        self.logger.info(f"[智瞰龙虎] 成功保存 {saved_count} 条龙虎榜记录")
-        return saved_count
+        self.logger.info(f"[智瞰龙虎] 新增 {stats['inserted']} 条龙虎榜记录，重复 {stats['duplicates']} 条")
+        return stats
     
     def get_longhubang_data(self, start_date=None, end_date=None, stock_code=None):
         """
@@ -191,42 +277,151 @@ class LonghubangDatabase:
         
         return df
     
-    def get_top_youzi(self, start_date=None, end_date=None, limit=20):
+    def mark_date_fetched(self, date, record_count, complete):
         """
-        获取活跃游资排名
+        记录某日龙虎榜数据的获取情况
         
         Args:
-            start_date: 开始日期
-            end_date: 结束日期
-            limit: 返回数量
+            date: 日期 YYYY-MM-DD
+            record_count: 获取到的记录数
+            complete: 数据是否已完整（已收盘的历史日期），完整的日期后续直接从本地读取
+        """
+        conn = self.get_connection()
+        conn.execute('''
+        INSERT OR REPLACE INTO longhubang_fetch_manifest (date, record_count, complete, fetched_at)
+        VALUES (?, ?, ?, ?)
+        ''', (date, record_count, 1 if complete else 0, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        conn.commit()
+        conn.close()
+    
+    def get_complete_dates(self, dates):
+        """
+        获取清单中已完整的日期
+        
+        Args:
+            dates: 日期列表 YYYY-MM-DD
             
         Returns:
-            pd.DataFrame: 游资排名
+            set: 已完整的日期
         """
+        if not dates:
+            return set()
+        
         conn = self.get_connection()
+        placeholders = ','.join('?' * len(dates))
+        rows = conn.execute(
+            f"SELECT date FROM longhubang_fetch_manifest WHERE complete = 1 AND date IN ({placeholders})",
+            list(dates)
+        ).fetchall()
+        conn.close()
+        return {row[0] for row in rows}
+    
+    def get_records_by_dates(self, dates):
+        """
+        读取指定日期的龙虎榜原始记录（字段与StockAPI返回格式一致）
         
-        query = '''
-        SELECT 
-            youzi_name,
-            COUNT(*) as trade_count,
-            SUM(buy_amount) as total_buy,
-            SUM(sell_amount) as total_sell,
-            SUM(net_inflow) as total_net_inflow
+        Args:
+            dates: 日期列表 YYYY-MM-DD
+            
+        Returns:
+            list: 龙虎榜数据列表（按日期升序）
+        """
+        if not dates:
+            return []
+        
+        conn = self.get_connection()
+        placeholders = ','.join('?' * len(dates))
+        rows = conn.execute(f'''
+        SELECT youzi_name, yingye_bu, list_type, stock_code, stock_name,
+               buy_amount, sell_amount, net_inflow, date, concepts
         FROM longhubang_records
-        WHERE 1=1
-        '''
+        WHERE date IN ({placeholders})
+        ORDER BY date, id
+        ''', list(dates)).fetchall()
+        conn.close()
+        
+        keys = ('yzmc', 'yyb', 'sblx', 'gpdm', 'gpmc', 'mrje', 'mcje', 'jlrje', 'rq', 'gl')
+        return [dict(zip(keys, row)) for row in rows]
+    
+    def _refresh_daily_rollups(self, cursor, dates):
+        """
+        按原始记录重算指定日期的按日汇总（游资×日、股票×日）
+        
+        Args:
+            cursor: 数据库游标（由调用方提交事务）
+            dates: 日期列表 YYYY-MM-DD
+        """
+        dates = [d for d in dates if d]
+        # 分批处理，避免超过SQLite参数个数限制
+        for i in range(0, len(dates), 500):
+            chunk = dates[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f"DELETE FROM longhubang_youzi_daily WHERE date IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM longhubang_stock_daily WHERE date IN ({placeholders})", chunk)
+            cursor.execute(f'''
+            INSERT INTO longhubang_youzi_daily
+            (date, youzi_name, trade_count, total_buy, total_sell, total_net_inflow)
+            SELECT date, youzi_name, COUNT(*), SUM(buy_amount), SUM(sell_amount), SUM(net_inflow)
+            FROM longhubang_records
+            WHERE date IN ({placeholders})
+            GROUP BY date, youzi_name
+            ''', chunk)
+            cursor.execute(f'''
+            INSERT INTO longhubang_stock_daily
+            (date, stock_code, stock_name, seat_count, total_buy, total_sell, total_net_inflow,
+             youzi_names, concepts)
+            SELECT date, stock_code, stock_name, COUNT(*), SUM(buy_amount), SUM(sell_amount), SUM(net_inflow),
+                   json_group_array(DISTINCT youzi_name), json_group_array(DISTINCT concepts)
+            FROM longhubang_records
+            WHERE date IN ({placeholders})
+            GROUP BY date, stock_code, stock_name
+            ''', chunk)
+    
+    @staticmethod
+    def _date_filter(start_date=None, end_date=None):
+        """
+        生成日期区间过滤条件
         
+        Returns:
+            tuple: (SQL条件片段, 参数列表)
+        """
+        clause = ''
         params = []
         
         if start_date:
-            query += " AND date >= ?"
+            clause += " AND date >= ?"
             params.append(start_date)
         
         if end_date:
-            query += " AND date <= ?"
+            clause += " AND date <= ?"
             params.append(end_date)
         
-        query += '''
+        return clause, params
+    
+    def get_top_youzi(self, start_date=None, end_date=None, limit=20):
+        """
+        获取活跃游资排名（累加区间内的游资按日汇总）
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            limit: 返回数量
+            
+        Returns:
+            pd.DataFrame: 游资排名
+        """
+        conn = self.get_connection()
+        
+        clause, params = self._date_filter(start_date, end_date)
+        query = f'''
+        SELECT 
+            youzi_name,
+            SUM(trade_count) as trade_count,
+            SUM(total_buy) as total_buy,
+            SUM(total_sell) as total_sell,
+            SUM(total_net_inflow) as total_net_inflow
+        FROM longhubang_youzi_daily
+        WHERE 1=1{clause}
         GROUP BY youzi_name
         ORDER BY total_net_inflow DESC
         LIMIT ?
@@ -240,7 +435,7 @@ class LonghubangDatabase:
     
     def get_top_stocks(self, start_date=None, end_date=None, limit=20):
         """
-        获取热门股票排名
+        获取热门股票排名（累加区间内的股票按日汇总，游资数与概念按上榜股票合并去重）
         
         Args:
             start_date: 开始日期
@@ -252,39 +447,48 @@ class LonghubangDatabase:
         """
         conn = self.get_connection()
         
-        query = '''
+        clause, params = self._date_filter(start_date, end_date)
+        query = f'''
         SELECT 
             stock_code,
             stock_name,
-            COUNT(DISTINCT youzi_name) as youzi_count,
-            SUM(buy_amount) as total_buy,
-            SUM(sell_amount) as total_sell,
-            SUM(net_inflow) as total_net_inflow,
-            GROUP_CONCAT(DISTINCT concepts) as all_concepts
-        FROM longhubang_records
-        WHERE 1=1
-        '''
-        
-        params = []
-        
-        if start_date:
-            query += " AND date >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND date <= ?"
-            params.append(end_date)
-        
-        query += '''
+            SUM(total_buy) as total_buy,
+            SUM(total_sell) as total_sell,
+            SUM(total_net_inflow) as total_net_inflow
+        FROM longhubang_stock_daily
+        WHERE 1=1{clause}
         GROUP BY stock_code, stock_name
         ORDER BY total_net_inflow DESC
         LIMIT ?
         '''
-        params.append(limit)
-        
-        df = pd.read_sql_query(query, conn, params=params)
+        df = pd.read_sql_query(query, conn, params=params + [limit])
+        
+        # 区间内的游资、概念需要跨日去重，只对排名内的股票合并每日集合
+        youzi_sets = {}
+        concept_sets = {}
+        codes = df['stock_code'].unique().tolist()
+        if codes:
+            placeholders = ','.join('?' * len(codes))
+            rows = conn.execute(f'''
+            SELECT stock_code, stock_name, youzi_names, concepts
+            FROM longhubang_stock_daily
+            WHERE stock_code IN ({placeholders}){clause}
+            ORDER BY date
+            ''', codes + params).fetchall()
+            for code, name, youzi_names, concepts in rows:
+                youzi_sets.setdefault((code, name), set()).update(
+                    n for n in json.loads(youzi_names) if n
+                )
+                # dict保持概念首次出现的顺序
+                concept_sets.setdefault((code, name), {}).update(
+                    dict.fromkeys(c for c in json.loads(concepts) if c is not None)
+                )
         conn.close()
         
+        keys = list(zip(df['stock_code'], df['stock_name']))
+        df.insert(2, 'youzi_count', [len(youzi_sets.get(key, ())) for key in keys])
+        df['all_concepts'] = [','.join(concept_sets[key]) if concept_sets.get(key) else None for key in keys]
+        
         return df
     
     def save_analysis_report(self, data_date_range, analysis_content, 
@@ -484,11 +688,11 @@ class LonghubangDatabase:
         stats['total_records'] = cursor.fetchone()[0]
         
         # 涉及股票数
-        cursor.execute('SELECT COUNT(DISTINCT stock_code) FROM longhubang_records')
+        cursor.execute('SELECT COUNT(DISTINCT stock_code) FROM longhubang_stock_daily')
         stats['total_stocks'] = cursor.fetchone()[0]
         
-        # 涉及游资数
-        cursor.execute('SELECT COUNT(DISTINCT youzi_name) FROM longhubang_records')
+        # 涉及游资数（游资名称缺失的记录以空字符串占位，不计入）
+        cursor.execute("SELECT COUNT(DISTINCT youzi_name) FROM longhubang_youzi_daily WHERE youzi_name != ''")
         stats['total_youzi'] = cursor.fetchone()[0]
         
         # 分析报告数
@@ -532,8 +736,9 @@ if __name__ == "__main__":
         }
     ]
     
-    # 测试保存
-    db.save_longhubang_data(test_data)
+    # 测试保存（重复保存的记录会被跳过）
+    print(f"\n首次保存: {db.save_longhubang_data(test_data)}")
+    print(f"重复保存: {db.save_longhubang_data(test_data)}")
     
     # 测试查询
     df = db.get_longhubang_data()
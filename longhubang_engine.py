@@ -16,6 +16,9 @@ import logging
 class LonghubangEngine:
     """龙虎榜综合分析引擎"""
     
+    # 当日龙虎榜数据在该时刻（时）之后获取视为完整
+    DATA_FINAL_HOUR = 20
+    
     def __init__(self, model="qwen3.5-plus", db_path='longhubang.db'):
         """
         初始化分析引擎
@@ -63,11 +66,9 @@ class LonghubangEngine:
             self.logger.info("[阶段1] 获取龙虎榜数据...")
             self.logger.info("-" * 60)
             
-            if date:
-                data_list = [self.data_fetcher.get_longhubang_data(date)]
-                data_list = data_list[0].get('data', []) if data_list[0] else []
-            else:
-                data_list = self.data_fetcher.get_recent_days_data(days)
+            # 已完整的历史日期从本地读取，仅远程获取缺失或未收盘的日期
+            dates = [date] if date else self.data_fetcher.get_recent_trade_dates(days)
+            data_list, load_stats = self.load_longhubang_data(dates)
             
             if not data_list:
                 self.logger.error("未获取到龙虎榜数据")
@@ -76,11 +77,10 @@ class LonghubangEngine:
 
             self.logger.info(f"成功获取 {len(data_list)} 条龙虎榜记录")
             
-            # 阶段2: 保存数据到数据库
+            # 阶段2: 保存数据到数据库（获取时已逐日写入）
             self.logger.info("[阶段2] 保存数据到数据库...")
             self.logger.info("-" * 60)
-            saved_count = self.database.save_longhubang_data(data_list)
-            self.logger.info(f"保存 {saved_count} 条记录")
+            self.logger.info(f"新增 {load_stats['saved']} 条记录，重复 {load_stats['duplicates']} 条")
             
             # 阶段3: 数据分析和统计
             self.logger.info("[阶段3] 数据分析和统计...")
@@ -206,6 +206,63 @@ class LonghubangEngine:
 
         return results
     
+    def _is_date_final(self, date: str) -> bool:
+        """当前时间获取的该日数据是否已完整（历史日期，或当日已过数据发布完成时间）"""
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        return date < today or (date == today and now.hour >= self.DATA_FINAL_HOUR)
+    
+    def load_longhubang_data(self, dates: List[str]):
+        """
+        优先从本地读取龙虎榜数据：清单中已完整的日期直接读库，其余日期并发远程获取并逐日写入数据库
+        （无上榜记录的已完整日期以0条记入清单，获取失败的日期不记入，下次运行重试）
+        
+        Args:
+            dates: 交易日列表 YYYY-MM-DD
+            
+        Returns:
+            (龙虎榜数据列表, 统计 {cached, fetched, saved, duplicates})
+        """
+        complete = self.database.get_complete_dates(dates)
+        missing = [d for d in dates if d not in complete]
+        saved = {"saved": 0, "duplicates": 0}
+        
+        def save_day(day, records):
+            save_stats = self.database.save_longhubang_data(records)
+            saved["saved"] += save_stats["inserted"]
+            saved["duplicates"] += save_stats["duplicates"]
+            self.database.mark_date_fetched(day, len(records), self._is_date_final(day))
+        
+        if missing:
+            self.data_fetcher.get_longhubang_data_dates(missing, on_data=save_day)
+        self.logger.info(f"[智瞰龙虎] 本地读取 {len(complete)} 天, 远程获取 {len(missing)} 天")
+        
+        data_list = self.database.get_records_by_dates(dates)
+        return data_list, {"cached": len(complete), "fetched": len(missing), **saved}
+    
+    def backfill_history(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        回补日期范围内的龙虎榜历史数据（跳过本地已完整的日期，并发获取，逐日写入数据库，不调用AI分析）
+        
+        Args:
+            start_date: 开始日期，格式 YYYY-MM-DD
+            end_date: 结束日期，格式 YYYY-MM-DD
+            
+        Returns:
+            回补统计 {dates, records, cached, fetched, saved, duplicates, elapsed}
+        """
+        start_time = time.time()
+        dates = self.data_fetcher.get_trade_dates(start_date, end_date)
+        data_list, load_stats = self.load_longhubang_data(dates)
+        elapsed = time.time() - start_time
+        self.logger.info(f"[智瞰龙虎] 回补完成: {len(dates)} 个交易日, {len(data_list)} 条记录, 耗时 {elapsed:.1f}s")
+        return {
+            "dates": len(dates),
+            "records": len(data_list),
+            **load_stats,
+            "elapsed": elapsed
+        }
+    
     def _extract_recommended_stocks(self, chief_analysis: str, stock_analysis: str, summary: Dict) -> List[Dict]:
         """
         从AI分析中提取推荐股票
@@ -3,6 +3,9 @@
 对龙虎榜上榜股票进行综合评分排名
 """
 
+import re
+import time
+import numpy as np
 import pandas as pd
 from typing import Dict, List
 from collections import Counter
@@ -34,6 +37,13 @@ class LonghubangScoring:
             'QFII', 'RQFII', '券商', '信托'
         ]
         
+        # 热门概念关键词
+        self.hot_keywords = [
+            '人工智能', 'AI', 'ChatGPT', '算力', '新能源', '芯片', '半导体',
+            '军工', '医药', '消费', '5G', '新材料', '量子', '光伏',
+            '储能', '锂电池', '汽车', '游戏', '传媒', '元宇宙'
+        ]
+        
         print("[智瞰龙虎] 评分系统初始化完成")
     
     def calculate_stock_score(self, stock_data: List[Dict]) -> float:
@@ -302,15 +312,9 @@ class LonghubangScoring:
             if concepts:
                 all_concepts.extend([c.strip() for c in str(concepts).split(',')])
         
-        hot_keywords = [
-            '人工智能', 'AI', 'ChatGPT', '算力', '新能源', '芯片', '半导体',
-            '军工', '医药', '消费', '5G', '新材料', '量子', '光伏',
-            '储能', '锂电池', '汽车', '游戏', '传媒', '元宇宙'
-        ]
-        
         concept_score = 0
         for concept in all_concepts:
-            if any(keyword in concept for keyword in hot_keywords):
+            if any(keyword in concept for keyword in self.hot_keywords):
                 concept_score += 0.3
         
         score += min(concept_score, 3.0)
@@ -348,9 +352,179 @@ class LonghubangScoring:
         
         return min(score, max_score)
     
+    @staticmethod
+    def _normalize_records(data_list: List[Dict]) -> pd.DataFrame:
+        """
+        将龙虎榜记录（中文或拼音字段）一次性转换为类型化的DataFrame
+        
+        Args:
+            data_list: 龙虎榜数据列表
+            
+        Returns:
+            列为 code/name/youzi/yyb/concepts（文本）与 buy/sell/net（float）的DataFrame
+        """
+        def column(cn_key, py_key):
+            return [r.get(cn_key) or r.get(py_key) for r in data_list]
+        
+        def amount(cn_key, py_key):
+            values = column(cn_key, py_key)
+            try:
+                amounts = np.array(values, dtype=float)
+            except (ValueError, TypeError):
+                # 含空字符串或非数值文本时逐个转换，无法转换的记为0
+                amounts = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+            return np.where(np.isnan(amounts), 0.0, amounts)
+        
+        def text(cn_key, py_key):
+            return pd.Series(column(cn_key, py_key), dtype=object)
+        
+        return pd.DataFrame({
+            'code': text('股票代码', 'gpdm'),
+            'name': text('股票名称', 'gpmc'),
+            'youzi': text('游资名称', 'yzmc').fillna(''),
+            'yyb': text('营业部', 'yyb').fillna(''),
+            'concepts': text('概念', 'gl'),
+            'buy': amount('买入金额', 'mrje'),
+            'sell': amount('卖出金额', 'mcje'),
+            'net': amount('净流入金额', 'jlrje'),
+        })
+    
+    @staticmethod
+    def _contains_any(texts, keywords: List[str]) -> np.ndarray:
+        """逐元素判断文本是否包含任一关键词"""
+        pattern = '|'.join(re.escape(k) for k in keywords)
+        return pd.Series(texts, dtype=object).str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+    
     def score_all_stocks(self, data_list: List[Dict]) -> pd.DataFrame:
         """
-        对所有上榜股票进行评分排名
+        对所有上榜股票进行评分排名（向量化实现，结果与逐只评分一致）
+        
+        Args:
+            data_list: 龙虎榜数据列表
+            
+        Returns:
+            评分排名DataFrame
+        """
+        if not data_list:
+            return pd.DataFrame()
+        
+        df = self._normalize_records(data_list)
+        df = df[df['code'].astype(bool)].reset_index(drop=True)
+        if df.empty:
+            return pd.DataFrame()
+        
+        # 按首次出现顺序编号股票（与逐只评分的分组顺序一致）
+        stock_idx, codes = pd.factorize(df['code'], sort=False)
+        n = len(codes)
+        
+        def group_sum(weights):
+            # bincount按记录顺序逐条累加，与逐条求和的浮点结果一致
+            return np.bincount(stock_idx, weights=weights, minlength=n)
+        
+        # 席位名称重复度高，只对去重后的游资名称/营业部做关键词匹配
+        youzi_codes, youzi_names = pd.factorize(df['youzi'])
+        yyb_codes, yyb_names = pd.factorize(df['yyb'])
+        
+        def seat_matches(keywords):
+            return (self._contains_any(youzi_names, keywords)[youzi_codes] |
+                    self._contains_any(yyb_names, keywords)[yyb_codes])
+        
+        buy, sell, net = df['buy'].to_numpy(), df['sell'].to_numpy(), df['net'].to_numpy()
+        is_buyer = buy > 0
+        is_top = seat_matches(self.top_youzi)
+        is_famous = ~is_top & seat_matches(self.famous_youzi)
+        is_institution = seat_matches(self.institution_keywords)
+        
+        seat_count = group_sum(None)
+        buyer_count = group_sum(is_buyer.astype(float))
+        top_count = group_sum((is_buyer & is_top).astype(float))
+        famous_count = group_sum((is_buyer & is_famous).astype(float))
+        institution_buyers = group_sum((is_buyer & is_institution).astype(float))
+        youzi_buyers = buyer_count - institution_buyers
+        total_buy, total_sell, total_net = group_sum(buy), group_sum(sell), group_sum(net)
+        
+        # 1. 买入资金含金量 (0-30分)
+        ordinary_count = buyer_count - top_count - famous_count
+        capital_quality = np.minimum(top_count * 10.0 + famous_count * 5.0 + ordinary_count * 1.5, 30.0)
+        
+        # 2. 净买入额 (0-25分)
+        net_wan = total_net / 10000
+        net_inflow = np.select(
+            [total_net <= 0, net_wan < 1000, net_wan < 5000, net_wan < 10000],
+            [0.0, (net_wan / 1000) * 10, 10 + ((net_wan - 1000) / 4000) * 8, 18 + ((net_wan - 5000) / 5000) * 4],
+            22 + np.minimum((net_wan - 10000) / 10000, 1) * 3
+        )
+        net_inflow = np.minimum(net_inflow, 25.0)
+        
+        # 3. 卖出压力 (0-20分)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sell_ratio = np.where(total_buy > 0, total_sell / total_buy, 1.0)
+        sell_pressure = np.select(
+            [sell_ratio < 0.1, sell_ratio < 0.3, sell_ratio < 0.5, sell_ratio < 0.8],
+            [20.0, 20.0 - (sell_ratio - 0.1) / 0.2 * 5, 15.0 - (sell_ratio - 0.3) / 0.2 * 5,
+             10.0 - (sell_ratio - 0.5) / 0.3 * 5],
+            5.0 - np.minimum(sell_ratio - 0.8, 0.2) / 0.2 * 5
+        )
+        sell_pressure = np.where(total_buy == 0, 0.0, np.clip(sell_pressure, 0, 20.0))
+        
+        # 4. 机构共振 (0-15分)
+        has_inst, has_youzi = institution_buyers > 0, youzi_buyers > 0
+        institution = np.select(
+            [has_inst & has_youzi, has_inst, has_youzi],
+            [15.0, np.minimum(8 + institution_buyers * 2, 12), np.minimum(5 + youzi_buyers, 10)],
+            0.0
+        )
+        
+        # 5. 其他加分项 (0-10分)：主力集中度 + 热门概念 + 连续上榜 + 买卖比例
+        concentration = np.select(
+            [seat_count == 1, seat_count == 2, seat_count == 3, seat_count <= 5],
+            [3.0, 2.5, 2.0, 1.5], 1.0
+        )
+        # 概念文本重复度高，只对去重后的文本拆分并统计热门概念个数
+        concept_codes, concept_uniques = pd.factorize(df['concepts'])
+        tokens = pd.Series(concept_uniques, dtype=object).map(lambda c: str(c) if c else '').str.split(',').explode()
+        tokens = tokens[tokens != ''].str.strip()
+        hot_per_text = np.bincount(tokens.index.to_numpy()[self._contains_any(tokens, self.hot_keywords)],
+                                   minlength=len(concept_uniques) + 1)
+        hot_per_record = np.where(concept_codes >= 0, hot_per_text[np.maximum(concept_codes, 0)], 0)
+        hot_counts = np.bincount(stock_idx, weights=hot_per_record, minlength=n).astype(int)
+        # 逐次累加0.3（与逐条累加的浮点结果一致）
+        hot_table = np.concatenate([[0.0], np.cumsum(np.full(int(hot_counts.max()), 0.3))])
+        concept = np.minimum(hot_table[hot_counts], 3.0)
+        consecutive = np.select([seat_count >= 3, seat_count == 2], [2.0, 1.0], 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            buy_sell_ratio = total_buy / (total_sell + 1)
+        ratio_bonus = np.where(total_buy > 0, np.select(
+            [buy_sell_ratio >= 10, buy_sell_ratio >= 5, buy_sell_ratio >= 3], [2.0, 1.5, 1.0], 0.0
+        ), 0.0)
+        bonus = np.minimum(concentration + concept + consecutive + ratio_bonus, 10.0)
+        
+        total_score = capital_quality + net_inflow + sell_pressure + institution + bonus
+        
+        names = df['name'].to_numpy()[np.unique(stock_idx, return_index=True)[1]]
+        institution_any = group_sum(is_institution.astype(float)) > 0
+        
+        result = pd.DataFrame({
+            '排名': 0,
+            '排名_display': '',
+            '股票名称': names,
+            '股票代码': codes,
+            '综合评分': [round(x, 1) for x in total_score.tolist()],
+            '资金含金量': np.round(capital_quality, 0),
+            '净买入额': np.round(net_inflow, 0),
+            '卖出压力': np.round(sell_pressure, 0),
+            '机构共振': np.round(institution, 0),
+            '加分项': np.round(bonus, 0),
+            '顶级游资': top_count.astype(int),
+            '买方数': buyer_count.astype(int),
+            '机构参与': np.where(institution_any, '✅', '❌'),
+            '净流入': [round(x, 2) for x in total_net.tolist()],
+        })
+        return self._rank(result)
+    
+    def _score_all_stocks_reference(self, data_list: List[Dict]) -> pd.DataFrame:
+        """
+        逐只股票评分排名（参考实现，用于校验向量化评分结果）
         
         Args:
             data_list: 龙虎榜数据列表
@@ -460,8 +634,11 @@ class LonghubangScoring:
                 '净流入': round(total_net, 2)
             })
         
-        # 转换为DataFrame并排序
-        df = pd.DataFrame(results)
+        return self._rank(pd.DataFrame(results))
+    
+    @staticmethod
+    def _rank(df: pd.DataFrame) -> pd.DataFrame:
+        """按综合评分排序并填充排名"""
         if df.empty:
             return df
         
@@ -581,4 +758,47 @@ if __name__ == "__main__":
     print(df_result)
     
     print("\n" + scoring.get_score_explanation())
+    
+    # 向量化评分与逐只评分性能对比（模拟龙虎榜席位记录；结果一致性由 tests/test_longhubang_scoring.py 校验）
+    def make_records(days, stocks_per_day, seats_per_stock, seed=0):
+        rng = np.random.default_rng(seed)
+        seats = (scoring.top_youzi + scoring.famous_youzi + ['机构专用'] * 5 +
+                 [f'普通游资{i}' for i in range(300)])
+        concepts = scoring.hot_keywords + ['银行', '地产', '次新股', '黄金概念', '煤炭', '']
+        records = []
+        for day in range(days):
+            date = (pd.Timestamp('2024-03-01') + pd.offsets.BDay(day)).strftime('%Y-%m-%d')
+            for code in rng.choice(3000, stocks_per_day, replace=False):
+                for _ in range(rng.integers(1, seats_per_stock * 2)):
+                    buy = float(rng.choice([0, rng.integers(1, 2e8)]))
+                    sell = float(rng.choice([0, rng.integers(1, 2e8)]))
+                    concept = ','.join(rng.choice(concepts, rng.integers(0, 4)))
+                    if rng.random() < 0.5:
+                        record = {'gpdm': f'{code:06d}', 'gpmc': f'股票{code}', 'yzmc': rng.choice(seats),
+                                  'yyb': f'{rng.choice(seats)}营业部', 'mrje': str(buy), 'mcje': sell,
+                                  'jlrje': buy - sell, 'gl': concept or None, 'rq': date}
+                    else:
+                        record = {'股票代码': f'{code:06d}', '股票名称': f'股票{code}', '游资名称': rng.choice(seats),
+                                  '营业部': None, '买入金额': buy, '卖出金额': str(sell) if sell else '',
+                                  '净流入金额': buy - sell, '概念': concept, '日期': date}
+                    records.append(record)
+        return records
+    
+    for days, stocks in [(1, 80), (22, 80), (66, 120)]:
+        records = make_records(days, stocks, 6, seed=days)
+        
+        def best_of(func, repeat=3):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func(records)
+                timings.append(time.perf_counter() - start)
+            return result, min(timings)
+        
+        expected, loop_time = best_of(scoring._score_all_stocks_reference)
+        actual, vector_time = best_of(scoring.score_all_stocks)
+        
+        print(f"{days}个交易日 {len(records)}条记录 {len(actual)}只股票: "
+              f"逐只评分 {loop_time * 1000:.1f}ms, 向量化 {vector_time * 1000:.1f}ms, "
+              f"加速 {loop_time / vector_time:.1f}x")
 
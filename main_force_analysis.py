@@ -11,7 +11,6 @@ from main_force_selector import main_force_selector
 from stock_data import StockDataFetcher
 from ai_agents import StockAnalysisAgents
 from deepseek_client import DeepSeekClient
-import time
 import json
 
 class MainForceAnalyzer:
@@ -228,7 +227,6 @@ class MainForceAnalyzer:
         analysis = self.deepseek_client.call_api(messages, max_tokens=4000)
         
         print("  ✅ 资金流向整体分析完成")
-        time.sleep(1)
         
         return analysis
     
@@ -282,7 +280,6 @@ class MainForceAnalyzer:
         analysis = self.deepseek_client.call_api(messages, max_tokens=4000)
         
         print("  ✅ 行业板块整体分析完成")
-        time.sleep(1)
         
         return analysis
     
@@ -336,7 +333,6 @@ class MainForceAnalyzer:
         analysis = self.deepseek_client.call_api(messages, max_tokens=4000)
         
         print("  ✅ 财务基本面整体分析完成")
-        time.sleep(1)
         
         return analysis
     
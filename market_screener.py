@@ -0,0 +1,515 @@
+"""
+全市场技术选股
+维护全市场对齐的收盘/最高/最低/成交量面板，对整个面板向量化计算指标并按条件筛选候选股票
+
+@File: market_screener.py
+@Contains: [MarketPanel, MarketScreener, market_panel, market_screener, PRESET_CONDITIONS, parse_condition]
+@Responsibilities:
+    - 从本地历史K线缓存构建 (股票数 × 交易日数) 的稠密面板并保存为npz文件
+    - 每日用全市场实时快照增量追加/更新当日K线，除权除息时按昨收比例调整历史价格（仅当上一列为收盘后数据）
+    - 对缺少历史的股票从数据源补齐
+    - 解析声明式条件（比较、上穿、下穿）并在整个面板上向量化求值
+    - 输出候选股票列表，供批量分析或持仓管理使用
+@Non-Responsibilities:
+    - 不负责技术指标公式（由indicator_kernels负责）
+    - 不负责AI分析
+@Input: 条件列表（如 "macd_dif cross_above macd_dea"、"volume_ratio > 2" 或预设名称）
+@Output: 候选股票DataFrame / 股票代码列表
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import indicator_kernels
+
+
+# 预设条件：名称 -> (显示名称, 条件列表)
+PRESET_CONDITIONS = {
+    'macd_golden_cross': ('MACD金叉', ['macd_dif cross_above macd_dea']),
+    'macd_dead_cross': ('MACD死叉', ['macd_dif cross_below macd_dea']),
+    'kdj_golden_cross': ('KDJ金叉', ['kdj_k cross_above kdj_d']),
+    'volume_spike': ('放量（量比>2）', ['volume_ratio > 2']),
+    'ma_bullish': ('均线多头排列', ['close > ma5', 'ma5 > ma20', 'ma20 > ma60']),
+    'ma_bearish': ('均线空头排列', ['close < ma5', 'ma5 < ma20', 'ma20 < ma60']),
+    'rsi_oversold': ('RSI超卖（RSI6<20）', ['rsi6 < 20']),
+    'rsi_overbought': ('RSI超买（RSI6>80）', ['rsi6 > 80']),
+    'boll_break_upper': ('突破布林上轨', ['close cross_above boll_upper']),
+    'boll_break_lower': ('跌破布林下轨', ['close cross_below boll_lower']),
+}
+
+OPERATORS = ('cross_above', 'cross_below', '>=', '<=', '>', '<')
+
+# 面板行情字段（其余字段为indicator_kernels.compute_all的输出及change_pct）
+PANEL_FIELDS = ('close', 'high', 'low', 'volume')
+
+# A股收盘时间，此后写入的当日K线为最终数据
+MARKET_CLOSE = '15:00'
+
+
+def _is_final_bar(bar_date):
+    """当前时间写入的bar_date当日K线是否为收盘后的最终数据"""
+    now = datetime.now()
+    return bar_date < np.datetime64(now.date(), 'D') or now.strftime('%H:%M') >= MARKET_CLOSE
+
+
+def parse_condition(text):
+    """
+    解析条件表达式
+
+    Args:
+        text: "左字段 运算符 右字段或数值"，如 "volume_ratio > 2"、"macd_dif cross_above macd_dea"
+
+    Returns:
+        tuple: (左字段, 运算符, 右字段名或数值)
+    """
+    parts = text.split()
+    if len(parts) != 3 or parts[1] not in OPERATORS:
+        raise ValueError(f"无效的筛选条件: {text}（格式：字段 运算符 字段/数值，运算符：{', '.join(OPERATORS)}）")
+    left, op, right = parts
+    try:
+        right = float(right)
+    except ValueError:
+        pass
+    return left, op, right
+
+
+def expand_conditions(conditions):
+    """把预设名称与条件表达式统一展开为 (左字段, 运算符, 右值) 列表"""
+    parsed = []
+    for condition in conditions:
+        if isinstance(condition, tuple):
+            parsed.append(condition)
+        elif condition in PRESET_CONDITIONS:
+            parsed.extend(parse_condition(text) for text in PRESET_CONDITIONS[condition][1])
+        else:
+            parsed.append(parse_condition(condition))
+    return parsed
+
+
+class MarketPanel:
+    """全市场日线面板（股票 × 交易日）"""
+
+    def __init__(self, path, max_bars=250):
+        """
+        初始化面板
+
+        Args:
+            path: 面板文件路径（.npz）
+            max_bars: 保留的最近交易日数
+        """
+        self.path = path
+        self.max_bars = max_bars
+        self._lock = threading.RLock()
+
+        self.dates = np.array([], dtype='datetime64[D]')
+        self.symbols = []
+        self.names = {}
+        self.data = {field: np.empty((0, 0)) for field in PANEL_FIELDS}
+        # 最后一列是否在收盘后写入（盘中写入的收盘价为当时的现价，不能用于判断除权）
+        self.last_final = True
+        # 每次数据变化递增，用于判断指标缓存是否失效
+        self.version = 0
+        self._loaded = False
+
+    @property
+    def shape(self):
+        return len(self.symbols), len(self.dates)
+
+    def _set(self, symbols, dates, data, names=None):
+        """整体替换面板内容（只保留最近max_bars个交易日）"""
+        keep = slice(max(0, len(dates) - self.max_bars), None)
+        self.symbols = list(symbols)
+        self.dates = np.asarray(dates, dtype='datetime64[D]')[keep]
+        self.data = {field: np.ascontiguousarray(data[field][:, keep], dtype=np.float64) for field in PANEL_FIELDS}
+        if names is not None:
+            self.names = dict(names)
+        self.version += 1
+
+    def load(self):
+        """从面板文件加载（文件不存在时为空面板）"""
+        with self._lock:
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return False
+            try:
+                with np.load(self.path, allow_pickle=False) as saved:
+                    symbols = saved['symbols'].tolist()
+                    names = dict(zip(symbols, saved['names'].tolist()))
+                    self._set(symbols, saved['dates'], {field: saved[field] for field in PANEL_FIELDS}, names)
+                    # 旧版面板文件未记录该标记，按盘中数据处理（换日时以昨收覆盖，不做除权判断）
+                    self.last_final = bool(saved['last_final']) if 'last_final' in saved.files else False
+                print(f"[选股面板] ✅ 已加载 {len(self.symbols)} 只股票 × {len(self.dates)} 个交易日")
+                return True
+            except Exception as e:
+                print(f"[选股面板] ❌ 加载失败: {e}")
+                return False
+
+    def ensure_loaded(self):
+        """首次使用时加载面板文件"""
+        if not self._loaded:
+            self.load()
+
+    def save(self):
+        """原子写入面板文件"""
+        with self._lock:
+            tmp_path = self.path + '.tmp.npz'
+            np.savez(
+                tmp_path,
+                dates=self.dates,
+                symbols=np.array(self.symbols, dtype=str),
+                names=np.array([self.names.get(s, '') for s in self.symbols], dtype=str),
+                last_final=np.array(self.last_final),
+                **self.data
+            )
+            os.replace(tmp_path, self.path)
+
+    def build_from_cache(self):
+        """
+        用本地历史K线缓存重建面板
+
+        Returns:
+            tuple: 面板形状 (股票数, 交易日数)
+        """
+        from data_source_manager import data_source_manager
+
+        start = time.time()
+        # 预留停牌与节假日，按自然日多取一些
+        start_date = (datetime.now() - timedelta(days=int(self.max_bars * 1.6) + 30)).strftime('%Y%m%d')
+        df = data_source_manager.load_hist_cache_all(start_date)
+        if df.empty:
+            print("[选股面板] ⚠️ 本地缓存没有历史数据")
+            return self.shape
+
+        df = df.drop_duplicates(subset=['symbol', 'date'], keep='last')
+        wide = {field: df.pivot(index='symbol', columns='date', values=field) for field in PANEL_FIELDS}
+        symbols = wide['close'].index.tolist()
+        dates = wide['close'].columns.to_numpy(dtype='datetime64[D]')
+
+        with self._lock:
+            self._set(symbols, dates, {field: frame.to_numpy(dtype=np.float64) for field, frame in wide.items()},
+                      names=self.names)
+            self.last_final = not len(self.dates) or _is_final_bar(self.dates[-1])
+            self._loaded = True
+            self.save()
+        print(f"[选股面板] ✅ 已从本地缓存构建 {len(self.symbols)} 只股票 × {len(self.dates)} 个交易日"
+              f"（耗时 {time.time() - start:.2f}s）")
+        return self.shape
+
+    def _add_symbols(self, codes):
+        """追加新股票行（历史为NaN）"""
+        new_codes = [code for code in codes if code not in set(self.symbols)]
+        if not new_codes:
+            return
+        padding = np.full((len(new_codes), len(self.dates)), np.nan)
+        data = {field: np.vstack([self.data[field].reshape(-1, len(self.dates)), padding])
+                for field in PANEL_FIELDS}
+        self._set(self.symbols + new_codes, self.dates, data)
+
+    def update_from_snapshot(self):
+        """
+        用全市场实时快照追加或更新最近交易日的K线
+
+        换日时：上一列在收盘后写入的，昨收与其收盘价不一致（除权除息）的股票按比例调整历史价格（前复权口径）；
+        上一列在盘中写入的，其收盘价只是当时的现价，改用快照昨收（最终收盘价）覆盖，最高/最低扩展到包含昨收，
+        该次换日不做除权判断。盘中写入的成交量无法从快照修正，仍为写入时的累计成交量
+
+        Returns:
+            int: 更新的股票数
+        """
+        from data_source_manager import data_source_manager
+        from realtime_quotes import realtime_quotes
+
+        trade_dates = data_source_manager.get_recent_trade_dates()
+        # 开盘前快照仍为上一交易日数据
+        if trade_dates and trade_dates[-1].date() == datetime.now().date() \
+                and datetime.now().strftime('%H:%M') < '09:30':
+            trade_dates = trade_dates[:-1]
+        if len(trade_dates) < 2:
+            return 0
+        trade_date = trade_dates[-1]
+        previous_date = np.datetime64(trade_dates[-2].date(), 'D')
+        bar_date = np.datetime64(trade_date.date(), 'D')
+
+        market = realtime_quotes.get_market_arrays()
+        if market is None:
+            print("[选股面板] ⚠️ 全市场快照不可用，跳过当日更新")
+            return 0
+        codes, names, fields, _ = market
+
+        with self._lock:
+            self.ensure_loaded()
+            if len(self.dates) and bar_date < self.dates[-1]:
+                return 0
+            self.names.update(zip(codes, names.tolist()))
+            self._add_symbols(codes)
+
+            rows = pd.Index(self.symbols).get_indexer(codes)
+            data = {field: self.data[field] for field in PANEL_FIELDS}
+            dates = self.dates
+
+            if not len(dates) or bar_date > dates[-1]:
+                # 新交易日：先用昨收校正上一交易日（仅当面板已包含上一交易日），再追加一列
+                if len(dates) and dates[-1] == previous_date:
+                    pre_close = fields['pre_close']
+                    if self.last_final:
+                        # 上一列为最终收盘价：昨收不一致说明除权除息，按比例调整历史价格
+                        last_close = data['close'][rows, -1]
+                        with np.errstate(divide='ignore', invalid='ignore'):
+                            ratio = pre_close / last_close
+                        adjust = np.isfinite(ratio) & (ratio > 0) & (np.abs(ratio - 1) > 1e-3)
+                        for field in ('close', 'high', 'low'):
+                            data[field][rows[adjust]] *= ratio[adjust][:, np.newaxis]
+                        if adjust.any():
+                            print(f"[选股面板] 除权除息调整 {int(adjust.sum())} 只股票")
+                    else:
+                        # 上一列为盘中数据：以昨收作为最终收盘价
+                        valid = pre_close > 0
+                        target = rows[valid]
+                        data['close'][target, -1] = pre_close[valid]
+                        data['high'][target, -1] = np.fmax(data['high'][target, -1], pre_close[valid])
+                        data['low'][target, -1] = np.fmin(data['low'][target, -1], pre_close[valid])
+                        print(f"[选股面板] ⚠️ 上一交易日为盘中数据，已用昨收校正 {int(valid.sum())} 只股票的收盘价"
+                              f"（本次不做除权判断）")
+                data = {field: np.hstack([values, np.full((len(self.symbols), 1), np.nan)])
+                        for field, values in data.items()}
+                dates = np.append(dates, bar_date)
+
+            traded = fields['current_price'] > 0
+            target = rows[traded]
+            data['close'][target, -1] = fields['current_price'][traded]
+            data['high'][target, -1] = fields['high'][traded]
+            data['low'][target, -1] = fields['low'][traded]
+            # 快照成交量单位为手，缓存为股
+            data['volume'][target, -1] = fields['volume'][traded] * 100
+
+            self._set(self.symbols, dates, data)
+            self.last_final = _is_final_bar(bar_date)
+            self.save()
+        print(f"[选股面板] ✅ 已用实时快照更新 {int(traded.sum())} 只股票（{trade_date:%Y-%m-%d}）")
+        return int(traded.sum())
+
+    def refresh(self):
+        """
+        每日增量刷新：面板为空或落后超过一个交易日时从本地缓存重建，然后用实时快照更新最近交易日
+
+        Returns:
+            tuple: 面板形状 (股票数, 交易日数)
+        """
+        from data_source_manager import data_source_manager
+
+        trade_dates = data_source_manager.get_recent_trade_dates()
+        with self._lock:
+            self.ensure_loaded()
+            stale = len(trade_dates) >= 2 and len(self.dates) \
+                and self.dates[-1] < np.datetime64(trade_dates[-2].date(), 'D')
+            if not self.symbols or stale:
+                self.build_from_cache()
+        self.update_from_snapshot()
+        return self.shape
+
+    def backfill(self, min_bars=60, limit=None):
+        """
+        为历史不足的股票从数据源下载历史K线（写入本地缓存后重建面板）
+
+        Args:
+            min_bars: 有效K线数低于该值的股票需要补齐
+            limit: 本次最多补齐的股票数
+
+        Returns:
+            int: 成功补齐的股票数
+        """
+        from data_source_manager import data_source_manager
+
+        with self._lock:
+            self.ensure_loaded()
+            counts = np.sum(~np.isnan(self.data['close']), axis=1) if self.symbols else np.array([])
+            pending = [s for s, count in zip(self.symbols, counts) if count < min_bars]
+        if limit:
+            pending = pending[:limit]
+        if not pending:
+            return 0
+
+        start_date = (datetime.now() - timedelta(days=int(self.max_bars * 1.6) + 30)).strftime('%Y%m%d')
+        end_date = datetime.now().strftime('%Y%m%d')
+        filled = 0
+        for i, symbol in enumerate(pending, 1):
+            df = data_source_manager.get_stock_hist_data(symbol, start_date, end_date, adjust='qfq')
+            if df is not None and not df.empty:
+                filled += 1
+            if i % 100 == 0 or i == len(pending):
+                print(f"[选股面板] 补齐历史 {i}/{len(pending)}，成功 {filled}")
+
+        self.build_from_cache()
+        self.update_from_snapshot()
+        return filled
+
+    def arrays(self):
+        """返回当前面板的 (股票代码列表, 日期数组, 字段 -> 数组, 版本号) 快照"""
+        with self._lock:
+            self.ensure_loaded()
+            return list(self.symbols), self.dates, dict(self.data), self.version
+
+
+class MarketScreener:
+    """基于全市场面板的向量化条件选股"""
+
+    def __init__(self, panel, min_bars=60):
+        """
+        初始化选股器
+
+        Args:
+            panel: MarketPanel实例
+            min_bars: 参与筛选所需的最少有效K线数
+        """
+        self.panel = panel
+        self.min_bars = min_bars
+        # (面板版本号, 股票代码列表, 字段 -> 数组)
+        self._cache = (None, [], {})
+        self._lock = threading.Lock()
+
+    def _fields(self):
+        """计算（或复用）整个面板的行情与指标字段"""
+        symbols, dates, data, version = self.panel.arrays()
+        with self._lock:
+            if self._cache[0] == version:
+                return self._cache[1], dates, self._cache[2]
+
+            start = time.time()
+            fields = dict(data)
+            if symbols:
+                fields.update(indicator_kernels.compute_all(data['high'], data['low'], data['close'], data['volume']))
+                previous = np.full(data['close'].shape, np.nan)
+                previous[:, 1:] = data['close'][:, :-1]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    fields['change_pct'] = (data['close'] / previous - 1) * 100
+                fields['_bars'] = np.broadcast_to(
+                    np.sum(~np.isnan(data['close']), axis=1)[:, np.newaxis], data['close'].shape
+                )
+                print(f"[选股] 全市场指标计算完成：{len(symbols)} 只股票 × {len(dates)} 个交易日，"
+                      f"耗时 {time.time() - start:.2f}s")
+            self._cache = (version, symbols, fields)
+            return symbols, dates, fields
+
+    @staticmethod
+    def _column(fields, name, offset):
+        """取最近第offset个交易日（0为最新）的字段值"""
+        if name not in fields:
+            raise ValueError(f"未知字段: {name}（可用字段：{', '.join(sorted(k for k in fields if not k.startswith('_')))}）")
+        values = fields[name]
+        if values.shape[1] <= offset:
+            return np.full(values.shape[0], np.nan)
+        return values[:, -1 - offset]
+
+    def _evaluate(self, fields, condition):
+        left, op, right = condition
+
+        def side(offset):
+            lhs = self._column(fields, left, offset)
+            rhs = right if isinstance(right, float) else self._column(fields, right, offset)
+            return lhs, rhs
+
+        lhs, rhs = side(0)
+        with np.errstate(invalid='ignore'):
+            if op == '>':
+                return lhs > rhs
+            if op == '>=':
+                return lhs >= rhs
+            if op == '<':
+                return lhs < rhs
+            if op == '<=':
+                return lhs <= rhs
+            prev_lhs, prev_rhs = side(1)
+            if op == 'cross_above':
+                return (lhs > rhs) & (prev_lhs <= prev_rhs)
+            return (lhs < rhs) & (prev_lhs >= prev_rhs)
+
+    def screen(self, conditions, limit=None, sort_by='volume_ratio'):
+        """
+        按条件筛选全市场股票（所有条件同时满足）
+
+        Args:
+            conditions: 条件列表，元素为预设名称、条件表达式或 (左字段, 运算符, 右值)
+            limit: 返回数量上限
+            sort_by: 排序字段（降序）
+
+        Returns:
+            DataFrame: code、name、close、change_pct、volume_ratio及条件涉及的字段
+        """
+        parsed = expand_conditions(conditions)
+        symbols, dates, fields = self._fields()
+        if not symbols:
+            return pd.DataFrame(columns=['code', 'name', 'close', 'change_pct', 'volume_ratio'])
+
+        mask = self._column(fields, '_bars', 0) >= self.min_bars
+        mask &= ~np.isnan(self._column(fields, 'close', 0))
+        for condition in parsed:
+            mask &= self._evaluate(fields, condition)
+
+        rows = np.flatnonzero(mask)
+        columns = ['close', 'change_pct', 'volume_ratio']
+        for left, _, right in parsed:
+            for name in (left, right):
+                if isinstance(name, str) and name not in columns:
+                    columns.append(name)
+
+        result = pd.DataFrame({
+            'code': [symbols[i] for i in rows],
+            'name': [self.panel.names.get(symbols[i], '') for i in rows],
+            **{name: self._column(fields, name, 0)[rows] for name in columns},
+        })
+        if sort_by in result.columns:
+            result = result.sort_values(sort_by, ascending=False)
+        if limit:
+            result = result.head(limit)
+        result.attrs['trade_date'] = str(dates[-1]) if len(dates) else None
+        return result.reset_index(drop=True)
+
+    def candidates(self, conditions, limit=50):
+        """
+        返回满足条件的股票代码列表（可直接用于批量分析或加入持仓）
+
+        Args:
+            conditions: 条件列表
+            limit: 数量上限
+
+        Returns:
+            list: 股票代码列表
+        """
+        return self.screen(conditions, limit=limit)['code'].tolist()
+
+
+# 全局面板与选股器实例
+market_panel = MarketPanel(
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'market_panel.npz'),
+    max_bars=int(os.getenv('SCREENER_MAX_BARS', '250')),
+)
+market_screener = MarketScreener(market_panel)
+
+
+if __name__ == '__main__':
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'build':
+        # python market_screener.py build
+        market_panel.build_from_cache()
+    elif command == 'refresh':
+        # python market_screener.py refresh
+        market_panel.refresh()
+    elif command == 'backfill':
+        # python market_screener.py backfill [最多股票数]
+        market_panel.refresh()
+        market_panel.backfill(limit=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif command == 'screen' and len(sys.argv) > 2:
+        # python market_screener.py screen macd_golden_cross "volume_ratio > 2"
+        result = market_screener.screen(sys.argv[2:])
+        print(f"交易日 {result.attrs.get('trade_date')}，共 {len(result)} 只股票满足条件")
+        print(result.to_string(index=False))
+    else:
+        print("用法: python market_screener.py [build | refresh | backfill [数量] | screen 条件...]")
+        print("预设条件: " + ", ".join(f"{key}({label})" for key, (label, _) in PRESET_CONDITIONS.items()))
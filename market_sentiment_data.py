@@ -4,13 +4,13 @@
 """
 
 import pandas as pd
-import numpy as np
 import akshare as ak
 from datetime import datetime, timedelta
 import warnings
 import sys
 import io
 from data_source_manager import data_source_manager
+import indicator_kernels
 
 warnings.filterwarnings('ignore')
 
@@ -164,23 +164,14 @@ class MarketSentimentDataFetcher:
             if 'date' in df.columns:
                 df['date'] = pd.to_datetime(df['date'])
             
-            # 计算各项差值
-            df['HO'] = df['high'] - df['open']    # 最高价-开盘价
-            df['OL'] = df['open'] - df['low']     # 开盘价-最低价
-            df['HCY'] = df['high'] - df['close'].shift(1)  # 最高价-前收
-            df['CYL'] = df['close'].shift(1) - df['low']   # 前收-最低价
-            
-            # 计算AR指标
-            df['AR'] = (df['HO'].rolling(window=self.arbr_period).sum() / 
-                       df['OL'].rolling(window=self.arbr_period).sum()) * 100
-            
-            # 计算BR指标
-            df['BR'] = (df['HCY'].rolling(window=self.arbr_period).sum() / 
-                       df['CYL'].rolling(window=self.arbr_period).sum()) * 100
-            
-            # 处理无穷大和空值
-            df['AR'] = df['AR'].replace([np.inf, -np.inf], np.nan)
-            df['BR'] = df['BR'].replace([np.inf, -np.inf], np.nan)
+            # 计算AR、BR指标（分母为0时为空值）
+            df['AR'], df['BR'] = indicator_kernels.arbr(
+                df['open'].to_numpy(dtype=float),
+                df['high'].to_numpy(dtype=float),
+                df['low'].to_numpy(dtype=float),
+                df['close'].to_numpy(dtype=float),
+                self.arbr_period
+            )
             
             # 移除空值
             df = df.dropna(subset=['AR', 'BR'])
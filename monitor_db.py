@@ -73,6 +73,24 @@ class StockMonitorDatabase:
             )
         ''')
         
+        # 创建检查延迟记录表（实际检查间隔与配置间隔对比）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS check_latency (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stock_id INTEGER,
+                checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                check_interval INTEGER,  -- 配置的检查间隔（分钟）
+                actual_interval REAL,  -- 距上次检查的实际间隔（秒），首次检查为NULL
+                fetch_latency REAL,  -- 行情获取耗时（秒）
+                success BOOLEAN,
+                FOREIGN KEY (stock_id) REFERENCES monitored_stocks (id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_check_latency_stock
+            ON check_latency(stock_id, checked_at)
+        ''')
+        
         conn.commit()
         conn.close()
     
@@ -183,6 +201,94 @@ class StockMonitorDatabase:
         conn.commit()
         conn.close()
     
+    def batch_update_check_results(self, results: List[Dict]):
+        """
+        批量写入一轮检查结果（单个事务）
+        
+        Args:
+            results: 检查结果列表，每项包含stock_id、price（失败为None）、
+                     check_interval、actual_interval、fetch_latency
+        """
+        if not results:
+            return
+        
+        succeeded = [r for r in results if r.get('price') is not None]
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            UPDATE monitored_stocks 
+            SET current_price = ?, last_checked = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [(r['price'], r['stock_id']) for r in succeeded])
+        
+        cursor.executemany('''
+            INSERT INTO price_history (stock_id, price)
+            VALUES (?, ?)
+        ''', [(r['stock_id'], r['price']) for r in succeeded])
+        
+        # 获取失败也更新last_checked，避免持续重试
+        cursor.executemany('''
+            UPDATE monitored_stocks 
+            SET last_checked = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [(r['stock_id'],) for r in results if r.get('price') is None])
+        
+        cursor.executemany('''
+            INSERT INTO check_latency (stock_id, check_interval, actual_interval, fetch_latency, success)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (r['stock_id'], r.get('check_interval'), r.get('actual_interval'),
+             r.get('fetch_latency'), r.get('price') is not None)
+            for r in results
+        ])
+        
+        conn.commit()
+        conn.close()
+    
+    def get_check_latency_stats(self, hours: int = 24) -> List[Dict]:
+        """
+        获取各股票最近的检查延迟统计
+        
+        Args:
+            hours: 统计最近多少小时内的检查记录
+            
+        Returns:
+            每只股票的配置间隔、平均/最大实际间隔、平均获取耗时、检查次数
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT ms.id, ms.symbol, ms.name, ms.check_interval,
+                   AVG(cl.actual_interval), MAX(cl.actual_interval),
+                   AVG(cl.fetch_latency), COUNT(cl.id),
+                   SUM(CASE WHEN cl.success THEN 1 ELSE 0 END)
+            FROM check_latency cl
+            JOIN monitored_stocks ms ON ms.id = cl.stock_id
+            WHERE datetime(cl.checked_at) > datetime('now', '-' || ? || ' hours')
+            GROUP BY ms.id
+            ORDER BY ms.symbol
+        ''', (hours,))
+        
+        stats = []
+        for row in cursor.fetchall():
+            stats.append({
+                'stock_id': row[0],
+                'symbol': row[1],
+                'name': row[2],
+                'check_interval': row[3],
+                'avg_actual_interval': row[4],
+                'max_actual_interval': row[5],
+                'avg_fetch_latency': row[6],
+                'check_count': row[7],
+                'success_count': row[8]
+            })
+        
+        conn.close()
+        return stats
+    
     def has_recent_notification(self, stock_id: int, notification_type: str, minutes: int = 60) -> bool:
         """检查是否在最近X分钟内已有相同类型的通知"""
         conn = sqlite3.connect(self.db_path)
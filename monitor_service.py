@@ -2,7 +2,8 @@ import time
 import threading
 import schedule
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import os
 import logging
@@ -11,6 +12,8 @@ from monitor_db import monitor_db
 from stock_data import StockDataFetcher
 from miniqmt_interface import miniqmt, get_miniqmt_status
 from notification_service import notification_service
+from rate_limiter import rate_limiter
+from realtime_quotes import realtime_quotes
 
 # 导入TDX数据源（如果可用）
 try:
@@ -42,6 +45,9 @@ class StockMonitorService:
             except Exception as e:
                 logging.warning(f"TDX数据源初始化失败，将使用默认数据源: {e}")
         
+        # 并发获取行情的最大线程数（实际请求频率由rate_limiter按数据源控制）
+        self.max_workers = int(os.getenv('MONITOR_MAX_WORKERS', '8'))
+        
         self.running = False
         self.thread = None
     
@@ -75,11 +81,11 @@ class StockMonitorService:
                 time.sleep(60)  # 错误后等待1分钟再重试
     
     def _check_all_stocks(self):
-        """检查所有监测股票"""
+        """检查所有监测股票：并发获取到期股票的行情，再批量写库与评估触发条件"""
         stocks = monitor_db.get_monitored_stocks()
         current_time = datetime.now()
         
-        updated_count = 0
+        due_stocks = []
         for stock in stocks:
             # 检查是否需要更新价格
             last_checked = stock.get('last_checked')
@@ -94,58 +100,167 @@ class StockMonitorService:
                     print(f"股票 {stock['symbol']} 距离下次检查还有 {time_left:.1f} 分钟")
                     continue
             
+            due_stocks.append(stock)
+        
+        if not due_stocks:
+            return
+        
+        print(f"正在并发更新 {len(due_stocks)} 只股票的价格...")
+        results = self._fetch_prices(due_stocks)
+        
+        # 批量写入价格、检查时间与检查延迟
+        monitor_db.batch_update_check_results(results)
+        
+        # 批量评估触发条件，本轮产生的通知统一发送一次
+        stocks_by_id = {stock['id']: stock for stock in due_stocks}
+        has_new_notification = False
+        for result in results:
+            if result['price'] is None:
+                continue
             try:
-                print(f"正在更新股票 {stock['symbol']} 的价格...")
-                self._update_stock_price(stock)
-                updated_count += 1
-                
-                # 在每个股票请求之间增加延迟，避免API限流
-                if updated_count < len(stocks):
-                    time.sleep(3)  # 每个股票之间等待3秒
+                has_new_notification |= self._check_trigger_conditions(
+                    stocks_by_id[result['stock_id']], result['price'], send_now=False
+                )
             except Exception as e:
-                print(f"❌ 更新股票 {stock['symbol']} 价格失败: {e}")
-                time.sleep(3)  # 失败后也等待3秒再继续
+                print(f"❌ 检查股票 {result['symbol']} 触发条件失败: {e}")
+        
+        if has_new_notification:
+            notification_service.send_notifications()
         
+        updated_count = sum(1 for r in results if r['price'] is not None)
         if updated_count > 0:
             print(f"✅ 本轮共更新了 {updated_count} 只股票")
     
+    def _fetch_prices(self, stocks: List[Dict]) -> List[Dict]:
+        """
+        并发获取多只股票的当前价格（各数据源的请求频率由rate_limiter控制）
+        
+        Args:
+            stocks: 股票列表
+            
+        Returns:
+            检查结果列表，每项包含stock_id、symbol、price（失败为None）、
+            check_interval、actual_interval（秒）、fetch_latency（秒）
+        """
+        # last_checked由SQLite CURRENT_TIMESTAMP写入，为UTC时间
+        now_utc = datetime.utcnow()
+        
+        # A股先批量获取，未命中的股票再逐只获取
+        batch_start = time.time()
+        batch_prices = self._fetch_batch_prices(
+            [stock['symbol'] for stock in stocks if self._is_a_stock(stock['symbol'])]
+        )
+        batch_latency = time.time() - batch_start
+        
+        def fetch(stock):
+            start = time.time()
+            if stock['symbol'] in batch_prices:
+                price = batch_prices[stock['symbol']]
+                start -= batch_latency
+            else:
+                try:
+                    price = self._fetch_current_price(stock['symbol'])
+                except Exception as e:
+                    print(f"❌ 获取股票 {stock['symbol']} 数据失败: {e}")
+                    price = None
+            
+            actual_interval = None
+            if stock.get('last_checked'):
+                last_checked_dt = datetime.fromisoformat(stock['last_checked'])
+                actual_interval = (now_utc - last_checked_dt).total_seconds()
+            
+            return {
+                'stock_id': stock['id'],
+                'symbol': stock['symbol'],
+                'price': price,
+                'check_interval': stock.get('check_interval', 30),
+                'actual_interval': actual_interval,
+                'fetch_latency': time.time() - start
+            }
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(stocks))) as executor:
+            results = list(executor.map(fetch, stocks))
+        
+        for result in results:
+            if result['price'] is not None:
+                print(f"✅ {result['symbol']} 当前价格: ¥{result['price']}（耗时 {result['fetch_latency']:.2f}s）")
+            else:
+                print(f"⚠️ 无法获取股票 {result['symbol']} 的当前价格")
+        
+        return results
+    
+    def _fetch_batch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        批量获取A股当前价格：TDX批量接口优先，其余从全市场实时快照获取
+        
+        Args:
+            symbols: A股代码列表
+            
+        Returns:
+            股票代码 -> 当前价格，未获取到的代码不返回
+        """
+        if not symbols:
+            return {}
+        
+        quotes = {}
+        if self.use_tdx:
+            rate_limiter.acquire('tdx')
+            quotes.update(self.tdx_fetcher.get_realtime_quotes(symbols))
+        
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing:
+            quotes.update(realtime_quotes.get_quotes(missing))
+        
+        return {
+            symbol: float(quote['current_price'])
+            for symbol, quote in quotes.items()
+            if quote.get('current_price') and quote['current_price'] > 0
+        }
+    
+    def _fetch_current_price(self, symbol: str) -> Optional[float]:
+        """获取单只股票的当前价格，失败返回None"""
+        # 优先使用TDX数据源（如果已启用且为A股）
+        if self.use_tdx and self._is_a_stock(symbol):
+            print(f"🔄 使用TDX数据源获取 {symbol} 行情...")
+            rate_limiter.acquire('tdx')
+            quote = self.tdx_fetcher.get_realtime_quote(symbol)
+            
+            if quote and quote.get('current_price'):
+                current_price = float(quote['current_price'])
+                print(f"✅ TDX获取成功: {symbol} 当前价格: ¥{current_price}")
+            else:
+                # TDX失败，降级到默认数据源
+                print(f"⚠️ TDX获取失败，降级到默认数据源: {symbol}")
+                current_price = self._get_price_from_default_source(symbol)
+        else:
+            # 使用默认数据源（AKShare/yfinance）
+            current_price = self._get_price_from_default_source(symbol)
+        
+        if not current_price:
+            return None
+        
+        try:
+            current_price = float(current_price)
+        except (ValueError, TypeError):
+            print(f"❌ 股票 {symbol} 价格格式错误: {current_price}")
+            return None
+        
+        return current_price if current_price > 0 else None
+    
     def _update_stock_price(self, stock: Dict):
         """更新股票价格并检查条件"""
         symbol = stock['symbol']
-        current_price = None
         
-        # 获取最新价格
         try:
-            # 优先使用TDX数据源（如果已启用且为A股）
-            if self.use_tdx and self._is_a_stock(symbol):
-                print(f"🔄 使用TDX数据源获取 {symbol} 行情...")
-                quote = self.tdx_fetcher.get_realtime_quote(symbol)
-                
-                if quote and quote.get('current_price'):
-                    current_price = float(quote['current_price'])
-                    print(f"✅ TDX获取成功: {symbol} 当前价格: ¥{current_price}")
-                else:
-                    # TDX失败，降级到默认数据源
-                    print(f"⚠️ TDX获取失败，降级到默认数据源: {symbol}")
-                    current_price = self._get_price_from_default_source(symbol)
-            else:
-                # 使用默认数据源（AKShare/yfinance）
-                current_price = self._get_price_from_default_source(symbol)
+            current_price = self._fetch_current_price(symbol)
             
-            # 处理获取到的价格
-            if current_price and current_price > 0:
-                try:
-                    current_price = float(current_price)
-                    # 更新数据库（包括更新last_checked时间）
-                    monitor_db.update_stock_price(stock['id'], current_price)
-                    print(f"✅ {symbol} 当前价格: ¥{current_price}")
-                    
-                    # 检查触发条件
-                    self._check_trigger_conditions(stock, current_price)
-                except (ValueError, TypeError) as e:
-                    print(f"❌ 股票 {symbol} 价格格式错误: {current_price}")
-                    # 即使失败也更新last_checked，避免持续重试
-                    monitor_db.update_last_checked(stock['id'])
+            if current_price:
+                # 更新数据库（包括更新last_checked时间）
+                monitor_db.update_stock_price(stock['id'], current_price)
+                print(f"✅ {symbol} 当前价格: ¥{current_price}")
+                
+                # 检查触发条件
+                self._check_trigger_conditions(stock, current_price)
             else:
                 print(f"⚠️ 无法获取股票 {symbol} 的当前价格")
                 # 更新last_checked，避免持续重试
@@ -166,6 +281,15 @@ class StockMonitorService:
     def _get_price_from_default_source(self, symbol: str) -> float:
         """从默认数据源获取价格"""
         try:
+            # A股优先使用全市场实时快照（有效期内共享一次请求）
+            if self._is_a_stock(symbol):
+                quote = realtime_quotes.get_quote(symbol)
+                if quote:
+                    return quote['current_price']
+            
+            # 按数据源配额限流，替代固定的请求间隔（美股由StockDataFetcher按yfinance配额限流）
+            if self._is_a_stock(symbol):
+                rate_limiter.acquire('akshare')
             stock_info = self.fetcher.get_stock_info(symbol)
             current_price = stock_info.get('current_price')
             
@@ -176,10 +300,22 @@ class StockMonitorService:
             print(f"默认数据源获取失败: {e}")
             return None
     
-    def _check_trigger_conditions(self, stock: Dict, current_price: float):
-        """检查触发条件"""
+    def _check_trigger_conditions(self, stock: Dict, current_price: float, send_now: bool = True) -> bool:
+        """
+        检查触发条件
+        
+        Args:
+            stock: 股票信息
+            current_price: 当前价格
+            send_now: 是否立即发送新增的通知（批量检查时由调用方统一发送）
+            
+        Returns:
+            是否新增了提醒通知
+        """
         if not stock.get('notification_enabled', True):
-            return
+            return False
+        
+        has_new_notification = False
         
         entry_range = stock.get('entry_range', {})
         take_profit = stock.get('take_profit')
@@ -192,9 +328,11 @@ class StockMonitorService:
                 if not monitor_db.has_recent_notification(stock['id'], 'entry', minutes=60):
                     message = f"股票 {stock['symbol']} ({stock['name']}) 价格 {current_price} 进入进场区间 [{entry_range['min']}-{entry_range['max']}]"
                     monitor_db.add_notification(stock['id'], 'entry', message)
+                    has_new_notification = True
                     
                     # 立即发送通知（包括邮件）
-                    notification_service.send_notifications()
+                    if send_now:
+                        notification_service.send_notifications()
                 
                 # 如果启用量化交易，执行自动交易
                 if stock.get('quant_enabled', False):
@@ -206,9 +344,11 @@ class StockMonitorService:
             if not monitor_db.has_recent_notification(stock['id'], 'take_profit', minutes=60):
                 message = f"股票 {stock['symbol']} ({stock['name']}) 价格 {current_price} 达到止盈位 {take_profit}"
                 monitor_db.add_notification(stock['id'], 'take_profit', message)
+                has_new_notification = True
                 
                 # 立即发送通知（包括邮件）
-                notification_service.send_notifications()
+                if send_now:
+                    notification_service.send_notifications()
             
             # 如果启用量化交易，执行自动交易
             if stock.get('quant_enabled', False):
@@ -220,13 +360,17 @@ class StockMonitorService:
             if not monitor_db.has_recent_notification(stock['id'], 'stop_loss', minutes=60):
                 message = f"股票 {stock['symbol']} ({stock['name']}) 价格 {current_price} 达到止损位 {stop_loss}"
                 monitor_db.add_notification(stock['id'], 'stop_loss', message)
+                has_new_notification = True
                 
                 # 立即发送通知（包括邮件）
-                notification_service.send_notifications()
+                if send_now:
+                    notification_service.send_notifications()
             
             # 如果启用量化交易，执行自动交易
             if stock.get('quant_enabled', False):
                 self._execute_quant_trade(stock, 'stop_loss', current_price)
+        
+        return has_new_notification
     
     def _execute_quant_trade(self, stock: Dict, signal_type: str, current_price: float):
         """执行量化交易"""
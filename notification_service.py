@@ -7,6 +7,7 @@ from typing import Dict, List
 import streamlit as st
 
 from monitor_db import monitor_db
+from http_client import http_client
 
 class NotificationService:
     """通知服务"""
@@ -311,8 +312,6 @@ class NotificationService:
     def _send_dingtalk_webhook(self, notification: Dict) -> bool:
         """发送钉钉Webhook通知"""
         try:
-            import requests
-            
             # 构建钉钉消息格式（包含自定义关键词）
             keyword = self.config.get('webhook_keyword', '')
             title_prefix = f"{keyword} - " if keyword else ""
@@ -343,7 +342,7 @@ _此消息由AI股票分析系统自动发送_"""
             print(f"[钉钉] 正在发送Webhook...")
             print(f"  - URL: {self.config['webhook_url'][:50]}...")
             
-            response = requests.post(
+            response = http_client.post(
                 self.config['webhook_url'],
                 json=data,
                 headers={'Content-Type': 'application/json'},
@@ -369,8 +368,6 @@ _此消息由AI股票分析系统自动发送_"""
     def _send_feishu_webhook(self, notification: Dict) -> bool:
         """发送飞书Webhook通知"""
         try:
-            import requests
-            
             # 构建飞书消息格式
             data = {
                 "msg_type": "interactive",
@@ -447,7 +444,7 @@ _此消息由AI股票分析系统自动发送_"""
             print(f"[飞书] 正在发送Webhook...")
             print(f"  - URL: {self.config['webhook_url'][:50]}...")
             
-            response = requests.post(
+            response = http_client.post(
                 self.config['webhook_url'],
                 json=data,
                 headers={'Content-Type': 'application/json'},
@@ -711,8 +708,6 @@ _此消息由AI股票分析系统自动发送_"""
     def _send_portfolio_webhook(self, analysis_results: dict, sync_result: dict = None) -> bool:
         """发送持仓分析Webhook通知"""
         try:
-            import requests
-            
             total = analysis_results.get("total", 0)
             succeeded = len([r for r in analysis_results.get("results", []) if r.get("result", {}).get("success")])
             failed = total - succeeded
@@ -748,7 +743,7 @@ _此消息由AI股票分析系统自动发送_"""
                     }
                 }
             
-            response = requests.post(self.config['webhook_url'], json=data, timeout=10)
+            response = http_client.post(self.config['webhook_url'], json=data, timeout=10)
             return response.status_code == 200
             
         except Exception as e:
@@ -6,11 +6,12 @@
 
 import time
 from typing import List, Dict, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # 导入必要的模块
 from portfolio_db import portfolio_db
+from batch_executor import batch_concurrency
+from batch_job_db import batch_job_db
 
 
 class PortfolioManager:
@@ -120,6 +121,27 @@ class PortfolioManager:
     
     # ==================== 单只股票分析 ====================
     
+    @staticmethod
+    def _analysts_config(selected_agents: List[str] = None) -> Dict:
+        """将选中的分析师列表转换为分析师配置字典"""
+        if selected_agents is None:
+            return {
+                'technical': True,
+                'fundamental': True,
+                'fund_flow': True,
+                'risk': True,
+                'sentiment': False,
+                'news': False
+            }
+        return {
+            'technical': 'technical' in selected_agents,
+            'fundamental': 'fundamental' in selected_agents,
+            'fund_flow': 'fund_flow' in selected_agents,
+            'risk': 'risk' in selected_agents,
+            'sentiment': 'sentiment' in selected_agents,
+            'news': 'news' in selected_agents
+        }
+    
     def analyze_single_stock(self, stock_code: str, period="1y", 
                             selected_agents: List[str] = None) -> Dict:
         """
@@ -142,24 +164,7 @@ class PortfolioManager:
             from app import analyze_single_stock_for_batch
             
             # 构建分析师配置
-            if selected_agents is None:
-                enabled_analysts_config = {
-                    'technical': True,
-                    'fundamental': True,
-                    'fund_flow': True,
-                    'risk': True,
-                    'sentiment': False,
-                    'news': False
-                }
-            else:
-                enabled_analysts_config = {
-                    'technical': 'technical' in selected_agents,
-                    'fundamental': 'fundamental' in selected_agents,
-                    'fund_flow': 'fund_flow' in selected_agents,
-                    'risk': 'risk' in selected_agents,
-                    'sentiment': 'sentiment' in selected_agents,
-                    'news': 'news' in selected_agents
-                }
+            enabled_analysts_config = self._analysts_config(selected_agents)
             
             # 调用首页的分析函数
             result = analyze_single_stock_for_batch(
@@ -189,80 +194,127 @@ class PortfolioManager:
     
     # ==================== 批量分析 ====================
     
-    def batch_analyze_sequential(self, stock_codes: List[str], period="1y",
-                                 selected_agents: List[str] = None,
-                                 progress_callback=None) -> Dict:
+    def _batch_analyze(self, stock_codes: List[str], period, selected_agents, mode,
+                       max_workers=None, progress_callback=None, job_id: int = None) -> Dict:
         """
-        顺序批量分析（逐只分析）
+        流水线批量分析：数据获取 → 分析师分析 → 讨论与决策，下一只股票的数据获取与当前股票的大模型调用重叠
         
         Args:
             stock_codes: 股票代码列表
             period: 数据周期
             selected_agents: 选中的分析师列表
+            mode: "sequential"（同一时间一只股票调用大模型）或 "parallel"（自适应并发）
+            max_workers: 并行模式的并发上限
             progress_callback: 进度回调函数 callback(current, total, code, status)
+            job_id: 续跑的批量任务ID；为None时创建新任务（每完成一只股票写入检查点）
             
         Returns:
             批量分析结果字典
         """
-        print(f"\n{'='*60}")
-        print(f"开始批量分析 (顺序模式): {len(stock_codes)}只股票")
-        print(f"{'='*60}\n")
+        from app import build_batch_pipeline
         
         start_time = time.time()
         results = []
         failed = []
         
-        for i, code in enumerate(stock_codes, 1):
-            print(f"\n--- 分析进度: {i}/{len(stock_codes)} ---")
-            
-            if progress_callback:
-                progress_callback(i, len(stock_codes), code, "analyzing")
+        if job_id is None:
+            job_id = batch_job_db.create_job('portfolio', stock_codes, {
+                'period': period,
+                'selected_agents': selected_agents,
+                'mode': mode,
+                'max_workers': max_workers,
+            })
+        else:
+            # 续跑：已成功的股票直接取检查点结果
+            for code, _, result, _ in batch_job_db.get_results(job_id):
+                results.append({
+                    "code": code,
+                    "result": result
+                })
+            print(f"[批量任务] ♻️ 续跑任务 #{job_id}：已完成 {len(results)} 只")
+        
+        total = len(stock_codes)
+        completed = len(results)
+        pending_codes = batch_job_db.get_pending_symbols(job_id)
+        
+        pipeline = build_batch_pipeline(
+            period, self._analysts_config(selected_agents), self.model,
+            parallel=(mode == "parallel"), max_workers=max_workers, job_id=job_id
+        )
+        for code, result, error in pipeline.map(pending_codes):
+            completed += 1
             
-            try:
-                result = self.analyze_single_stock(code, period, selected_agents)
-                
-                if result.get("success"):
-                    results.append({
-                        "code": code,
-                        "result": result
-                    })
-                    if progress_callback:
-                        progress_callback(i, len(stock_codes), code, "success")
-                else:
-                    failed.append({
-                        "code": code,
-                        "error": result.get("error", "未知错误")
-                    })
-                    if progress_callback:
-                        progress_callback(i, len(stock_codes), code, "failed")
-                    
-            except Exception as e:
-                print(f"[ERROR] 股票 {code} 分析失败: {str(e)}")
+            if error is not None:
                 failed.append({
                     "code": code,
-                    "error": str(e)
+                    "error": str(error)
                 })
+                print(f"\n[{completed}/{total}] {code} 分析异常: {str(error)}")
                 if progress_callback:
-                    progress_callback(i, len(stock_codes), code, "error")
+                    progress_callback(completed, total, code, "error")
+            elif result.get("success"):
+                results.append({
+                    "code": code,
+                    "result": result
+                })
+                print(f"\n[{completed}/{total}] {code} 分析完成")
+                if progress_callback:
+                    progress_callback(completed, total, code, "success")
+            else:
+                failed.append({
+                    "code": code,
+                    "error": result.get("error", "未知错误")
+                })
+                print(f"\n[{completed}/{total}] {code} 分析失败: {result.get('error')}")
+                if progress_callback:
+                    progress_callback(completed, total, code, "failed")
         
+        # 任务已由流水线在最后一只股票记录后标记结束
         elapsed_time = time.time() - start_time
+        stage_stats = pipeline.stats()
         
         print(f"\n{'='*60}")
         print(f"批量分析完成！")
         print(f"成功: {len(results)}只, 失败: {len(failed)}只, 耗时: {elapsed_time:.1f}秒")
+        for stage in stage_stats:
+            print(f"  {stage['stage']}: 处理{stage['processed']}只, 平均{stage['avg_time']}秒, 吞吐{stage['throughput']}只/分钟")
         print(f"{'='*60}\n")
         
         return {
             "success": True,
-            "mode": "sequential",
-            "total": len(stock_codes),
+            "mode": mode,
+            "total": total,
             "succeeded": len(results),
             "failed": len(failed),
             "results": results,
             "failed_stocks": failed,
-            "elapsed_time": elapsed_time
+            "elapsed_time": elapsed_time,
+            "stage_stats": stage_stats,
+            "job_id": job_id
         }
     
+    def batch_analyze_sequential(self, stock_codes: List[str], period="1y",
+                                 selected_agents: List[str] = None,
+                                 progress_callback=None) -> Dict:
+        """
+        顺序批量分析（同一时间只有一只股票调用大模型，预取下一只股票数据）
+        
+        Args:
+            stock_codes: 股票代码列表
+            period: 数据周期
+            selected_agents: 选中的分析师列表
+            progress_callback: 进度回调函数 callback(current, total, code, status)
+            
+        Returns:
+            批量分析结果字典
+        """
+        print(f"\n{'='*60}")
+        print(f"开始批量分析 (顺序模式): {len(stock_codes)}只股票")
+        print(f"{'='*60}\n")
+        
+        return self._batch_analyze(stock_codes, period, selected_agents, "sequential",
+                                   progress_callback=progress_callback)
+    
     def batch_analyze_parallel(self, stock_codes: List[str], period="1y",
                                selected_agents: List[str] = None,
                                max_workers: int = 3,
@@ -274,79 +326,18 @@ class PortfolioManager:
             stock_codes: 股票代码列表
             period: 数据周期
             selected_agents: 选中的分析师列表
-            max_workers: 最大并发数（默认3）
+            max_workers: 最大并发数上限（默认3，实际并发由自适应控制器调整）
             progress_callback: 进度回调函数
             
         Returns:
             批量分析结果字典
         """
         print(f"\n{'='*60}")
-        print(f"开始批量分析 (并行模式): {len(stock_codes)}只股票, 并发数: {max_workers}")
-        print(f"{'='*60}\n")
-        
-        start_time = time.time()
-        results = []
-        failed = []
-        completed = 0
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有任务
-            future_to_code = {
-                executor.submit(self.analyze_single_stock, code, period, selected_agents): code
-                for code in stock_codes
-            }
-            
-            # 处理完成的任务
-            for future in as_completed(future_to_code):
-                code = future_to_code[future]
-                completed += 1
-                
-                try:
-                    result = future.result()
-                    
-                    if result.get("success"):
-                        results.append({
-                            "code": code,
-                            "result": result
-                        })
-                        print(f"\n[{completed}/{len(stock_codes)}] {code} 分析完成")
-                        if progress_callback:
-                            progress_callback(completed, len(stock_codes), code, "success")
-                    else:
-                        failed.append({
-                            "code": code,
-                            "error": result.get("error", "未知错误")
-                        })
-                        print(f"\n[{completed}/{len(stock_codes)}] {code} 分析失败: {result.get('error')}")
-                        if progress_callback:
-                            progress_callback(completed, len(stock_codes), code, "failed")
-                        
-                except Exception as e:
-                    failed.append({
-                        "code": code,
-                        "error": str(e)
-                    })
-                    print(f"\n[{completed}/{len(stock_codes)}] {code} 分析异常: {str(e)}")
-                    if progress_callback:
-                        progress_callback(completed, len(stock_codes), code, "error")
-        
-        elapsed_time = time.time() - start_time
-        
-        print(f"\n{'='*60}")
-        print(f"批量分析完成！")
-        print(f"成功: {len(results)}只, 失败: {len(failed)}只, 耗时: {elapsed_time:.1f}秒")
+        print(f"开始批量分析 (并行模式): {len(stock_codes)}只股票, 并发上限: {max_workers}, 当前并发: {batch_concurrency.stats()['limit']}")
         print(f"{'='*60}\n")
         
-        return {
-            "success": True,
-            "mode": "parallel",
-            "total": len(stock_codes),
-            "succeeded": len(results),
-            "failed": len(failed),
-            "results": results,
-            "failed_stocks": failed,
-            "elapsed_time": elapsed_time
-        }
+        return self._batch_analyze(stock_codes, period, selected_agents, "parallel",
+                                   max_workers=max_workers, progress_callback=progress_callback)
     
     def batch_analyze_portfolio(self, mode="sequential", period="1y",
                                 selected_agents: List[str] = None,
@@ -382,6 +373,36 @@ class PortfolioManager:
         else:
             return self.batch_analyze_sequential(stock_codes, period, selected_agents, progress_callback)
     
+    def resume_batch_job(self, job_id: int, progress_callback=None) -> Dict:
+        """
+        续跑中断的持仓批量分析任务（跳过已成功的股票，沿用原任务参数；任务仍在执行时不续跑）
+        
+        Args:
+            job_id: 批量任务ID
+            progress_callback: 进度回调函数
+            
+        Returns:
+            批量分析结果字典（包含此前已完成股票的结果）
+        """
+        job = batch_job_db.get_job(job_id)
+        if job is None:
+            return {
+                "success": False,
+                "error": f"批量任务不存在: {job_id}"
+            }
+        if not batch_job_db.claim_job(job_id):
+            return {
+                "success": False,
+                "error": f"批量任务 #{job_id} 仍在执行或已结束"
+            }
+        
+        params = job['params']
+        return self._batch_analyze(
+            job['symbols'], params.get('period', '1y'), params.get('selected_agents'),
+            params.get('mode', 'sequential'), max_workers=params.get('max_workers'),
+            progress_callback=progress_callback, job_id=job_id
+        )
+    
     # ==================== 分析结果保存 ====================
     
     def save_analysis_results(self, analysis_results: Dict) -> List[int]:
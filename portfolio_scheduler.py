@@ -12,6 +12,7 @@ from typing import Optional, Callable
 import traceback
 
 from portfolio_manager import portfolio_manager
+from batch_job_db import batch_job_db
 from notification_service import NotificationService
 
 
@@ -195,13 +196,25 @@ class PortfolioScheduler:
         print("="*60 + "\n")
         
         try:
-            # 1. 执行批量分析
-            print("[1/4] 执行持仓批量分析...")
-            analysis_results = portfolio_manager.batch_analyze_portfolio(
-                mode=self.analysis_mode,
-                max_workers=self.max_workers,
-                selected_agents=self.selected_agents
-            )
+            # 1. 执行批量分析（当天有中断的任务时续跑，只分析剩余股票；有任务正在执行时跳过本次分析）
+            unfinished = batch_job_db.get_unfinished_jobs('portfolio', since=datetime.now().strftime('%Y-%m-%d'),
+                                                          limit=1, include_active=True)
+            if unfinished and unfinished[0]['active']:
+                job = unfinished[0]
+                print(f"[WARN] 持仓批量分析任务 #{job['id']} 正在执行（已完成 {job['done']}/{job['total']}），跳过本次定时分析")
+                self.last_run_time = datetime.now()
+                return
+            if unfinished:
+                job = unfinished[0]
+                print(f"[1/4] 续跑中断的持仓批量分析 #{job['id']}（已完成 {job['done']}/{job['total']}）...")
+                analysis_results = portfolio_manager.resume_batch_job(job['id'])
+            else:
+                print("[1/4] 执行持仓批量分析...")
+                analysis_results = portfolio_manager.batch_analyze_portfolio(
+                    mode=self.analysis_mode,
+                    max_workers=self.max_workers,
+                    selected_agents=self.selected_agents
+                )
             
             if not analysis_results.get("success"):
                 error_msg = analysis_results.get("error", "未知错误")
@@ -567,6 +580,11 @@ class PortfolioScheduler:
         if self.next_run_time:
             print(f"    下次运行: {self.next_run_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
+        # 当天的分析在进程中断前未完成时（所有者进程已退出），启动后立即续跑剩余股票
+        if batch_job_db.get_unfinished_jobs('portfolio', since=datetime.now().strftime('%Y-%m-%d'), limit=1):
+            print("[OK] 发现当天未完成的持仓分析，后台续跑")
+            threading.Thread(target=self._scheduled_job, daemon=True).start()
+        
         return True
     
     def stop(self) -> bool:
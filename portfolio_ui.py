@@ -261,7 +261,7 @@ def display_batch_analysis():
                 min_value=2,
                 max_value=10,
                 value=3,
-                help="同时分析的股票数量"
+                help="同时分析的股票数量上限，实际并发会根据接口限流与响应速度自动调整"
             )
         else:
             max_workers = 1
@@ -328,6 +328,10 @@ def display_batch_analysis():
                 with col_r4:
                     st.metric("耗时", f"{result.get('elapsed_time', 0):.1f}秒")
                 
+                # 流水线各阶段吞吐
+                from app import display_pipeline_stats
+                display_pipeline_stats(result.get("stage_stats"))
+                
                 # 保存分析结果到数据库
                 saved_ids = portfolio_manager.save_analysis_results(result)
                 st.info(f"💾 已保存 {len(saved_ids)} 条分析记录到数据库")
@@ -0,0 +1,203 @@
+"""
+按数据源的令牌桶限流器
+替代各模块中固定的time.sleep，调用方在请求前获取令牌，配额充足时不等待
+
+@File: rate_limiter.py
+@Contains: [TokenBucket, RateLimiter, rate_limiter, PROVIDER_LIMITS]
+@Responsibilities:
+    - 为每个数据源维护独立的令牌桶（速率 + 突发容量）
+    - 按预约方式分配令牌，并发调用方按到达顺序排队
+    - 统计各数据源的获取次数与累计等待时间
+    - 记录上游限流事件（供批量任务自适应降低并发）
+@Non-Responsibilities:
+    - 不负责发送请求与失败重试（由http_client或调用方负责）
+@Input: 数据源名称、令牌数
+@Output: 实际等待秒数
+"""
+
+import os
+import threading
+import time
+
+
+# 各数据源默认配额：(每秒令牌数, 突发容量)，速率为0表示不限流
+# 可通过环境变量 RATE_LIMIT_<数据源大写> 覆盖，格式为 "速率" 或 "速率/突发容量"
+PROVIDER_LIMITS = {
+    'stockapi': (40, 40),         # StockAPI龙虎榜接口：40次/秒
+    'akshare': (2, 5),            # AKShare（东方财富等网页接口）
+    'pywencai': (1, 2),           # 问财
+    'yfinance': (1, 2),           # Yahoo Finance
+    'tdx': (20, 20),              # 本地TDX行情接口
+    'llm': (1, 10),               # 大模型请求数（RPM≈60）
+    'llm_tokens': (0, 0),         # 大模型token数（TPM/60，默认不限）
+}
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate, capacity):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数（0表示不限流）
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.waited = 0.0
+
+    def acquire(self, tokens=1):
+        """
+        获取令牌，不足时阻塞到令牌补足
+
+        令牌先预约后等待（余额可为负），并发调用方按到达顺序依次放行；
+        超过容量的请求按全额扣减，等待时间相应延长（如大模型的大请求仍受TPM限制）
+
+        Args:
+            tokens: 需要的令牌数
+
+        Returns:
+            float: 等待的秒数
+        """
+        if self.rate <= 0:
+            with self._lock:
+                self.acquired += 1
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.acquired += 1
+            self.waited += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """按数据源划分的限流器"""
+
+    def __init__(self, limits=None):
+        """
+        初始化限流器
+
+        Args:
+            limits: 数据源名称 -> (每秒令牌数, 突发容量)
+        """
+        self._limits = dict(limits or PROVIDER_LIMITS)
+        self._buckets = {}
+        self._throttles = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, provider):
+        with self._lock:
+            bucket = self._buckets.get(provider)
+            if bucket is None:
+                rate, capacity = self._limits.get(provider, (0, 0))
+                bucket = TokenBucket(rate, capacity)
+                self._buckets[provider] = bucket
+            return bucket
+
+    def configure(self, provider, rate, capacity=None):
+        """
+        设置数据源配额（重新创建令牌桶）
+
+        Args:
+            provider: 数据源名称
+            rate: 每秒令牌数（0表示不限流）
+            capacity: 突发容量（默认等于速率，至少为1）
+        """
+        capacity = capacity if capacity is not None else max(int(rate), 1)
+        with self._lock:
+            self._limits[provider] = (rate, capacity)
+            self._buckets.pop(provider, None)
+
+    def acquire(self, provider, tokens=1):
+        """
+        从指定数据源获取令牌
+
+        Args:
+            provider: 数据源名称（未配置的数据源不限流）
+            tokens: 需要的令牌数
+
+        Returns:
+            float: 等待的秒数
+        """
+        return self._bucket(provider).acquire(tokens)
+
+    def acquire_llm(self, messages, max_tokens=0):
+        """
+        大模型请求前获取请求数与token配额
+
+        Args:
+            messages: 消息列表（按字符数粗略估算输入token）
+            max_tokens: 最大输出token数
+
+        Returns:
+            float: 等待的秒数
+        """
+        waited = self.acquire('llm')
+        estimated = sum(len(str(msg.get('content', ''))) for msg in messages) + max_tokens
+        waited += self.acquire('llm_tokens', estimated)
+        return waited
+
+    def report_throttle(self, provider):
+        """
+        记录一次上游限流（如HTTP 429），供自适应并发控制器降低并发
+
+        Args:
+            provider: 数据源名称
+        """
+        with self._lock:
+            self._throttles[provider] = self._throttles.get(provider, 0) + 1
+        print(f"[限流] ⚠️ {provider} 触发上游限流")
+
+    def throttle_count(self, provider):
+        """返回数据源累计的上游限流次数"""
+        with self._lock:
+            return self._throttles.get(provider, 0)
+
+    def stats(self):
+        """返回各数据源的配额、获取次数与累计等待时间"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            provider: {
+                'rate': bucket.rate,
+                'capacity': bucket.capacity,
+                'acquired': bucket.acquired,
+                'waited': round(bucket.waited, 3),
+            }
+            for provider, bucket in buckets.items()
+        }
+
+
+def _limits_from_env():
+    """读取环境变量中的配额覆盖"""
+    limits = dict(PROVIDER_LIMITS)
+    for provider in PROVIDER_LIMITS:
+        value = os.getenv(f'RATE_LIMIT_{provider.upper()}')
+        if not value:
+            continue
+        try:
+            rate, _, capacity = value.partition('/')
+            rate = float(rate)
+            limits[provider] = (rate, float(capacity) if capacity else max(rate, 1))
+        except ValueError:
+            print(f"[限流] ⚠️ 无效的配额配置 RATE_LIMIT_{provider.upper()}={value}，使用默认值")
+    return limits
+
+
+# 全局限流器实例
+rate_limiter = RateLimiter(_limits_from_env())
@@ -0,0 +1,186 @@
+"""
+A股全市场实时行情快照
+一次拉取全市场现货行情，按代码建立索引，在有效期内为所有调用方提供多股票行情查询
+
+@File: realtime_quotes.py
+@Contains: [RealtimeQuoteSnapshot, realtime_quotes, QUOTE_FIELDS]
+@Responsibilities:
+    - 拉取东方财富全市场现货快照（ak.stock_zh_a_spot_em），转换为按代码索引的NumPy数值表
+    - 快照过期前的所有查询共享同一次上游请求，并发刷新合并为一次
+    - 输出与智能盯盘实时行情一致的字典格式
+@Non-Responsibilities:
+    - 不负责单股票分钟行情与历史行情（由SmartMonitorDataFetcher、DataSourceManager负责）
+    - 不负责非A股行情
+@Input: 股票代码列表
+@Output: 股票代码 -> 实时行情字典
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rate_limiter import rate_limiter
+
+
+# 行情字段 -> 全市场快照列名
+QUOTE_FIELDS = {
+    'current_price': '最新价',
+    'change_pct': '涨跌幅',
+    'change_amount': '涨跌额',
+    'volume': '成交量',  # 手
+    'amount': '成交额',  # 元
+    'high': '最高',
+    'low': '最低',
+    'open': '今开',
+    'pre_close': '昨收',
+    'turnover_rate': '换手率',
+    'volume_ratio': '量比',
+}
+
+
+class RealtimeQuoteSnapshot:
+    """全市场实时行情快照"""
+
+    def __init__(self, ttl=5, max_stale=30):
+        """
+        初始化快照
+
+        Args:
+            ttl: 快照有效期（秒），过期后下一次查询触发刷新
+            max_stale: 刷新失败时旧快照的最长可用时间（秒）
+        """
+        self.ttl = ttl
+        self.max_stale = max_stale
+
+        # (代码 -> 行号, 名称数组, 数值表[行, 字段], 拉取时间戳, 更新时间字符串)，整体替换保证读取一致
+        self._table = ({}, np.array([], dtype=object), np.empty((0, len(QUOTE_FIELDS))), 0.0, '')
+        self._last_attempt = 0.0
+        self._refresh_lock = threading.Lock()
+
+        self.upstream_calls = 0
+        self.lookups = 0
+
+    def _is_fresh(self, fetched_at):
+        return time.time() - fetched_at < self.ttl
+
+    def _refresh(self):
+        """拉取全市场快照（并发调用只有一个线程实际请求）"""
+        if self._is_fresh(self._table[3]):
+            return
+
+        with self._refresh_lock:
+            now = time.time()
+            # 等锁期间其他线程已刷新，或上次刷新失败后仍在冷却期
+            if self._is_fresh(self._table[3]) or now - self._last_attempt < self.ttl:
+                return
+            self._last_attempt = now
+
+            try:
+                import akshare as ak
+                rate_limiter.acquire('akshare')
+                df = ak.stock_zh_a_spot_em()
+                self.upstream_calls += 1
+            except Exception as e:
+                print(f"[实时行情] ❌ 全市场快照获取失败: {e}")
+                return
+
+            if df is None or df.empty:
+                print("[实时行情] ⚠️ 全市场快照为空")
+                return
+
+            codes = df['代码'].astype(str).str.zfill(6).tolist()
+            values = np.column_stack([
+                pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+                if column in df.columns else np.full(len(df), np.nan)
+                for column in QUOTE_FIELDS.values()
+            ])
+            self._table = (
+                {code: i for i, code in enumerate(codes)},
+                df['名称'].to_numpy(dtype=object),
+                values,
+                time.time(),
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            )
+            print(f"[实时行情] ✅ 全市场快照已更新（{len(codes)}只，耗时 {time.time() - now:.2f}s）")
+
+    def get_quotes(self, symbols):
+        """
+        批量查询实时行情
+
+        Args:
+            symbols: 股票代码列表（6位A股代码）
+
+        Returns:
+            dict: 股票代码 -> 行情字典；停牌、无成交或不在快照中的代码不返回
+        """
+        self._refresh()
+        index, names, values, fetched_at, update_time = self._table
+        if time.time() - fetched_at > max(self.max_stale, self.ttl):
+            return {}
+
+        quotes = {}
+        for symbol in symbols:
+            self.lookups += 1
+            row = index.get(symbol)
+            if row is None:
+                continue
+            fields = values[row]
+            # 最新价为空表示停牌或未成交
+            if not fields[0] > 0:
+                continue
+            quote = {'code': symbol, 'name': names[row]}
+            for key, value in zip(QUOTE_FIELDS, fields):
+                quote[key] = float(value) if not np.isnan(value) else 0.0
+            if not quote['volume_ratio']:
+                quote['volume_ratio'] = 1.0
+            quote['update_time'] = update_time
+            quote['data_source'] = 'akshare_spot'
+            quotes[symbol] = quote
+        return quotes
+
+    def get_quote(self, symbol):
+        """
+        查询单只股票实时行情
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            dict: 行情字典，未找到返回None
+        """
+        return self.get_quotes([symbol]).get(symbol)
+
+    def get_market_arrays(self):
+        """
+        获取全市场快照的数值表（供向量化计算使用）
+
+        Returns:
+            tuple: (代码列表, 名称数组, 字段名 -> 数值数组, 更新时间)，快照不可用时返回None
+        """
+        self._refresh()
+        index, names, values, fetched_at, update_time = self._table
+        if not index or time.time() - fetched_at > max(self.max_stale, self.ttl):
+            return None
+        return list(index), names, {key: values[:, i] for i, key in enumerate(QUOTE_FIELDS)}, update_time
+
+    def stats(self):
+        """返回快照统计信息"""
+        index, _, _, fetched_at, update_time = self._table
+        return {
+            'symbols': len(index),
+            'age': time.time() - fetched_at if fetched_at else None,
+            'update_time': update_time,
+            'upstream_calls': self.upstream_calls,
+            'lookups': self.lookups,
+        }
+
+
+# 全局实时行情快照实例
+realtime_quotes = RealtimeQuoteSnapshot(
+    ttl=float(os.getenv('REALTIME_SNAPSHOT_TTL', '5')),
+    max_stale=float(os.getenv('REALTIME_SNAPSHOT_MAX_STALE', '30')),
+)
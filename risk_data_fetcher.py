@@ -9,10 +9,11 @@
 import pywencai
 import pandas as pd
 from typing import Dict, Any
-import time
 import warnings
 import os
 
+from rate_limiter import rate_limiter
+
 # 屏蔽pywencai的Node.js警告信息（不影响功能）
 warnings.filterwarnings('ignore', category=DeprecationWarning)
 os.environ['PYTHONWARNINGS'] = 'ignore::DeprecationWarning'
@@ -57,8 +58,6 @@ class RiskDataFetcher:
             else:
                 print(f"   暂无限售解禁数据")
             
-            time.sleep(1)  # 避免请求过快
-            
             # 2. 获取大股东减持公告
             print("   查询大股东减持公告...")
             reduction = self._get_shareholder_reduction_data(symbol)
@@ -68,8 +67,6 @@ class RiskDataFetcher:
             else:
                 print(f"   暂无大股东减持数据")
             
-            time.sleep(1)  # 避免请求过快
-            
             # 3. 获取近期重要事件
             print("   查询近期重要事件...")
             events = self._get_important_events_data(symbol)
@@ -107,7 +104,8 @@ class RiskDataFetcher:
             # 构建问句
             query = f"{symbol}限售解禁"
             
-            # 使用pywencai查询
+            # 使用pywencai查询（按问财配额限流）
+            rate_limiter.acquire('pywencai')
             response = pywencai.get(query=query, loop=True)
             
             if response is None:
@@ -170,7 +168,8 @@ class RiskDataFetcher:
             # 构建问句
             query = f"{symbol}大股东减持公告"
             
-            # 使用pywencai查询
+            # 使用pywencai查询（按问财配额限流）
+            rate_limiter.acquire('pywencai')
             response = pywencai.get(query=query, loop=True)
             
             if response is None:
@@ -233,7 +232,8 @@ class RiskDataFetcher:
             # 构建问句
             query = f"{symbol}近期重要事件"
             
-            # 使用pywencai查询
+            # 使用pywencai查询（按问财配额限流）
+            rate_limiter.acquire('pywencai')
             response = pywencai.get(query=query, loop=True)
             
             if response is None:
@@ -12,6 +12,7 @@ import logging
 import os
 from dotenv import load_dotenv
 from sector_strategy_db import SectorStrategyDatabase
+from rate_limiter import rate_limiter
 
 # 加载环境变量
 load_dotenv()
@@ -26,7 +27,6 @@ class SectorStrategyDataFetcher:
         print("[智策] 板块数据获取器初始化...")
         self.max_retries = 3  # 最大重试次数
         self.retry_delay = 2  # 重试延迟（秒）
-        self.request_delay = 1  # 请求间隔（秒）
         
         # 初始化数据库和日志
         self.database = SectorStrategyDatabase()
@@ -44,10 +44,9 @@ class SectorStrategyDataFetcher:
         """安全的请求函数，包含重试机制"""
         for attempt in range(self.max_retries):
             try:
-                result = func(*args, **kwargs)
-                # 添加请求延迟，避免请求过快
-                time.sleep(self.request_delay)
-                return result
+                # 按AKShare配额限流，替代固定的请求间隔
+                rate_limiter.acquire('akshare')
+                return func(*args, **kwargs)
             except Exception as e:
                 if attempt < self.max_retries - 1:
                     print(f"    请求失败，{self.retry_delay}秒后重试... (尝试 {attempt + 1}/{self.max_retries})")
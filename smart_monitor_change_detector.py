@@ -0,0 +1,140 @@
+"""
+智能盯盘 - 行情变化检测
+比较最新行情与上一次AI决策时的行情，只有出现实质性变化时才重新调用AI决策
+
+@File: smart_monitor_change_detector.py
+@Contains: [ChangeDetector]
+@Responsibilities:
+    - 判断价格变动、RSI/KDJ区间切换、MACD金叉死叉、量比放大、持仓变化
+    - 上一次决策超过最长复用时间时强制重新决策
+@Non-Responsibilities:
+    - 不负责获取行情与保存决策（由SmartMonitorEngine负责）
+@Input: 上一次决策记录（含当时的market_data）、最新market_data、持仓快照
+@Output: (是否需要重新决策, 变化原因列表)
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+class ChangeDetector:
+    """行情实质性变化检测器"""
+
+    def __init__(self, enabled: bool = True, price_change_pct: float = 1.0,
+                 volume_ratio_spike: float = 2.0, max_reuse_minutes: float = 30):
+        """
+        初始化检测器
+
+        Args:
+            enabled: 是否启用（关闭时每次都重新决策）
+            price_change_pct: 相对上次决策价格的涨跌幅阈值（%）
+            volume_ratio_spike: 量比放大阈值（量比从低于阈值变为不低于阈值时触发）
+            max_reuse_minutes: 上一次决策的最长复用时间（分钟）
+        """
+        self.enabled = enabled
+        self.price_change_pct = price_change_pct
+        self.volume_ratio_spike = volume_ratio_spike
+        self.max_reuse_minutes = max_reuse_minutes
+
+    @classmethod
+    def from_env(cls) -> 'ChangeDetector':
+        """从环境变量创建检测器"""
+        return cls(
+            enabled=os.getenv('SMART_MONITOR_CHANGE_DETECTION', 'true').lower() == 'true',
+            price_change_pct=float(os.getenv('SMART_MONITOR_PRICE_CHANGE_PCT', '1.0')),
+            volume_ratio_spike=float(os.getenv('SMART_MONITOR_VOLUME_RATIO_SPIKE', '2.0')),
+            max_reuse_minutes=float(os.getenv('SMART_MONITOR_MAX_REUSE_MINUTES', '30')),
+        )
+
+    @staticmethod
+    def _rsi_zone(value: Optional[float]) -> Optional[str]:
+        if value is None:
+            return None
+        if value >= 70:
+            return '超买'
+        if value <= 30:
+            return '超卖'
+        return '中性'
+
+    @staticmethod
+    def _kdj_zone(value: Optional[float]) -> Optional[str]:
+        if value is None:
+            return None
+        if value >= 80:
+            return '超买'
+        if value <= 20:
+            return '超卖'
+        return '中性'
+
+    @staticmethod
+    def _macd_side(data: Dict) -> Optional[str]:
+        dif, dea = data.get('macd_dif'), data.get('macd_dea')
+        if dif is None or dea is None:
+            return None
+        return '多头' if dif >= dea else '空头'
+
+    def detect(self, last_decision: Optional[Dict], market_data: Dict,
+               position: Dict) -> Tuple[bool, List[str]]:
+        """
+        判断是否需要重新调用AI决策
+
+        Args:
+            last_decision: 上一次决策记录（SmartMonitorDB.get_ai_decisions返回格式），None表示没有历史决策
+            market_data: 最新的综合行情数据
+            position: 当前持仓快照（has_position、position_cost、position_quantity）
+
+        Returns:
+            (是否需要重新决策, 变化原因列表)
+        """
+        if not self.enabled:
+            return True, ['变化检测已关闭']
+        if not last_decision:
+            return True, ['无历史决策']
+
+        previous = last_decision.get('market_data') or {}
+        reasons = []
+
+        # 决策时效
+        try:
+            decided_at = datetime.strptime(last_decision['decision_time'], '%Y-%m-%d %H:%M:%S')
+            age_minutes = (datetime.now() - decided_at).total_seconds() / 60
+            if age_minutes >= self.max_reuse_minutes:
+                reasons.append(f"上次决策已过{age_minutes:.0f}分钟")
+        except (KeyError, TypeError, ValueError):
+            reasons.append('上次决策时间未知')
+
+        # 持仓变化
+        previous_position = (last_decision.get('account_info') or {}).get('position_snapshot')
+        if previous_position != position:
+            reasons.append('持仓变化')
+
+        # 价格变动
+        old_price, new_price = previous.get('current_price'), market_data.get('current_price')
+        if not old_price or not new_price:
+            reasons.append('缺少价格数据')
+        else:
+            move_pct = (new_price - old_price) / old_price * 100
+            if abs(move_pct) >= self.price_change_pct:
+                reasons.append(f"价格变动{move_pct:+.2f}%")
+
+        # RSI / KDJ 区间切换
+        old_zone, new_zone = self._rsi_zone(previous.get('rsi6')), self._rsi_zone(market_data.get('rsi6'))
+        if old_zone != new_zone:
+            reasons.append(f"RSI区间 {old_zone}→{new_zone}")
+        old_zone, new_zone = self._kdj_zone(previous.get('kdj_k')), self._kdj_zone(market_data.get('kdj_k'))
+        if old_zone != new_zone:
+            reasons.append(f"KDJ区间 {old_zone}→{new_zone}")
+
+        # MACD 金叉 / 死叉
+        old_side, new_side = self._macd_side(previous), self._macd_side(market_data)
+        if old_side != new_side:
+            reasons.append('MACD金叉' if new_side == '多头' else 'MACD死叉')
+
+        # 量比放大
+        old_ratio = previous.get('volume_ratio') or 0
+        new_ratio = market_data.get('volume_ratio') or 0
+        if new_ratio >= self.volume_ratio_spike > old_ratio:
+            reasons.append(f"量比放大至{new_ratio:.2f}")
+
+        return bool(reasons), reasons
@@ -6,11 +6,15 @@
 
 import logging
 import os
+import time
 import akshare as ak
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 
+from indicator_engine import indicator_engine
+from realtime_quotes import realtime_quotes
+
 
 class SmartMonitorDataFetcher:
     """A股数据获取器（支持多数据源降级：TDX -> AKShare -> Tushare）"""
@@ -37,6 +41,11 @@ class SmartMonitorDataFetcher:
         self.use_tdx = use_tdx
         self.tdx_fetcher = None
         
+        # 批量预取的实时行情：股票代码 -> (行情, 获取时间戳)
+        # 每条只供同一批任务使用一次，超过最长保留时间仍未使用的丢弃
+        self._prefetched_quotes = {}
+        self.prefetch_max_age = float(os.getenv('SMART_MONITOR_PREFETCH_MAX_AGE', '120'))
+        
         if self.use_tdx:
             try:
                 from smart_monitor_tdx_data import SmartMonitorTDXDataFetcher
@@ -75,6 +84,11 @@ class SmartMonitorDataFetcher:
         """
         import time
         
+        # 优先使用本批预取的行情（取出即失效，下一轮重新获取）
+        prefetched = self._prefetched_quotes.pop(stock_code, None)
+        if prefetched and time.time() - prefetched[1] < self.prefetch_max_age:
+            return prefetched[0]
+        
         # 方法1: 尝试使用TDX（如果启用）
         if self.use_tdx and self.tdx_fetcher:
             try:
@@ -86,7 +100,12 @@ class SmartMonitorDataFetcher:
             except Exception as e:
                 self.logger.warning(f"TDX获取异常 {stock_code}: {e}，尝试降级到AKShare")
         
-        # 方法2: 组合使用AKShare分钟行情 + 基本信息
+        # 方法2: 全市场实时快照（有效期内所有股票共享一次请求）
+        quote = realtime_quotes.get_quote(stock_code)
+        if quote:
+            return quote
+        
+        # 方法3: 组合使用AKShare分钟行情 + 基本信息
         for attempt in range(retry):
             try:
                 # 1.1 获取股票基本信息（名称）
@@ -175,6 +194,39 @@ class SmartMonitorDataFetcher:
             self.logger.error(f"AKShare失败且未配置Tushare，无法获取 {stock_code} 行情")
             return None
     
+    def get_realtime_quotes(self, stock_codes: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取实时行情
+        优先使用TDX批量接口，其余股票从全市场快照获取，仍缺失的逐只降级
+        
+        Args:
+            stock_codes: 股票代码列表
+            
+        Returns:
+            股票代码 -> 实时行情数据，获取失败的代码不返回
+        """
+        quotes = {}
+        
+        if self.use_tdx and self.tdx_fetcher:
+            quotes.update(self.tdx_fetcher.get_realtime_quotes(stock_codes))
+        
+        missing = [code for code in stock_codes if code not in quotes]
+        if missing:
+            quotes.update(realtime_quotes.get_quotes(missing))
+        
+        for code in stock_codes:
+            if code not in quotes:
+                quote = self.get_realtime_quote(code)
+                if quote:
+                    quotes[code] = quote
+        
+        # 记录预取结果，同一批任务中get_realtime_quote各取用一次
+        fetched_at = time.time()
+        for code, quote in quotes.items():
+            self._prefetched_quotes[code] = (quote, fetched_at)
+        
+        return quotes
+    
     def get_technical_indicators(self, stock_code: str, period: str = 'daily', retry: int = 1) -> Optional[Dict]:
         """
         计算技术指标（带降级机制）
@@ -208,16 +260,19 @@ class SmartMonitorDataFetcher:
                 end_date = datetime.now().strftime('%Y%m%d')
                 start_date = (datetime.now() - timedelta(days=300)).strftime('%Y%m%d')
                 
-                # 获取历史数据
-                df = ak.stock_zh_a_hist(
-                    symbol=stock_code,
-                    period=period,
-                    start_date=start_date,
-                    end_date=end_date,
-                    adjust="qfq"  # 前复权
-                )
+                # 获取历史数据（日线经数据源管理器共享进程内缓存，避免同一分析重复下载）
+                if period == 'daily':
+                    df = self._get_daily_hist_from_manager(stock_code, start_date, end_date)
+                else:
+                    df = ak.stock_zh_a_hist(
+                        symbol=stock_code,
+                        period=period,
+                        start_date=start_date,
+                        end_date=end_date,
+                        adjust="qfq"  # 前复权
+                    )
                 
-                if df.empty or len(df) < 60:
+                if df is None or df.empty or len(df) < 60:
                     if attempt < retry - 1:
                         self.logger.warning(f"AKShare历史数据不足 {stock_code}，第{attempt+1}次重试...")
                         time.sleep(1)
@@ -227,7 +282,7 @@ class SmartMonitorDataFetcher:
                         break
                 
                 # 数据充足，计算技术指标
-                return self._calculate_all_indicators(df, stock_code)
+                return self._calculate_all_indicators(df, stock_code, period)
                 
             except Exception as e:
                 if attempt < retry - 1:
@@ -245,13 +300,50 @@ class SmartMonitorDataFetcher:
             self.logger.error(f"AKShare失败且未配置Tushare，无法获取 {stock_code} 技术指标")
             return None
     
-    def _calculate_all_indicators(self, df: pd.DataFrame, stock_code: str) -> Optional[Dict]:
+    def _get_daily_hist_from_manager(self, stock_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        通过数据源管理器获取前复权日线，并转换为AKShare列名格式
+        
+        Args:
+            stock_code: 股票代码
+            start_date: 开始日期（格式：'20240101'）
+            end_date: 结束日期
+            
+        Returns:
+            日线数据DataFrame（日期/开盘/收盘/最高/最低/成交量/成交额）
+        """
+        from data_source_manager import data_source_manager
+        
+        df = data_source_manager.get_stock_hist_data(
+            symbol=stock_code,
+            start_date=start_date,
+            end_date=end_date,
+            adjust='qfq'
+        )
+        if df is None or df.empty:
+            return None
+        
+        df = df.rename(columns={
+            'date': '日期',
+            'open': '开盘',
+            'close': '收盘',
+            'high': '最高',
+            'low': '最低',
+            'amount': '成交额'
+        })
+        # 成交量单位：股 -> 手（与AKShare一致）
+        df['成交量'] = df['volume'] / 100
+        return df.drop(columns=['volume']).reset_index(drop=True)
+    
+    def _calculate_all_indicators(self, df: pd.DataFrame, stock_code: str, period: str = 'daily') -> Optional[Dict]:
         """
         根据历史数据计算所有技术指标
+        由增量指标引擎计算：与上次的历史数据衔接时只更新最后一根K线，否则重新初始化
         
         Args:
             df: 历史数据DataFrame
             stock_code: 股票代码
+            period: 周期（daily/weekly/monthly）
             
         Returns:
             技术指标数据
@@ -261,78 +353,7 @@ class SmartMonitorDataFetcher:
                 self.logger.warning(f"股票 {stock_code} 历史数据不足")
                 return None
             
-            # 计算均线
-            df['ma5'] = df['收盘'].rolling(window=5).mean()
-            df['ma20'] = df['收盘'].rolling(window=20).mean()
-            df['ma60'] = df['收盘'].rolling(window=60).mean()
-            
-            # 计算MACD
-            df = self._calculate_macd(df)
-            
-            # 计算RSI
-            df = self._calculate_rsi(df, periods=[6, 12, 24])
-            
-            # 计算KDJ
-            df = self._calculate_kdj(df)
-            
-            # 计算布林带
-            df = self._calculate_bollinger(df)
-            
-            # 计算量能均线
-            df['vol_ma5'] = df['成交量'].rolling(window=5).mean()
-            df['vol_ma10'] = df['成交量'].rolling(window=10).mean()
-            
-            # 取最后一行数据
-            latest = df.iloc[-1]
-            
-            # 判断趋势
-            current_price = float(latest['收盘'])
-            ma5 = float(latest['ma5'])
-            ma20 = float(latest['ma20'])
-            ma60 = float(latest['ma60'])
-            
-            if current_price > ma5 > ma20 > ma60:
-                trend = 'up'
-            elif current_price < ma5 < ma20 < ma60:
-                trend = 'down'
-            else:
-                trend = 'sideways'
-            
-            # 布林带位置
-            boll_upper = float(latest['boll_upper'])
-            boll_mid = float(latest['boll_mid'])
-            boll_lower = float(latest['boll_lower'])
-            
-            if current_price >= boll_upper:
-                boll_position = '上轨附近（超买）'
-            elif current_price <= boll_lower:
-                boll_position = '下轨附近（超卖）'
-            elif current_price > boll_mid:
-                boll_position = '中轨上方'
-            else:
-                boll_position = '中轨下方'
-            
-            return {
-                'ma5': ma5,
-                'ma20': ma20,
-                'ma60': ma60,
-                'trend': trend,
-                'macd_dif': float(latest['dif']),
-                'macd_dea': float(latest['dea']),
-                'macd': float(latest['macd']),
-                'rsi6': float(latest['rsi6']),
-                'rsi12': float(latest['rsi12']),
-                'rsi24': float(latest['rsi24']),
-                'kdj_k': float(latest['kdj_k']),
-                'kdj_d': float(latest['kdj_d']),
-                'kdj_j': float(latest['kdj_j']),
-                'boll_upper': boll_upper,
-                'boll_mid': boll_mid,
-                'boll_lower': boll_lower,
-                'boll_position': boll_position,
-                'vol_ma5': float(latest['vol_ma5']),
-                'volume_ratio': float(latest['成交量']) / float(latest['vol_ma5']) if latest['vol_ma5'] > 0 else 1.0
-            }
+            return indicator_engine.update_from_history(stock_code, df, period)
             
         except Exception as e:
             self.logger.error(f"计算技术指标失败 {stock_code}: {e}")
@@ -418,7 +439,7 @@ class SmartMonitorDataFetcher:
             self.logger.info(f"✅ Tushare成功获取 {stock_code} 历史数据，共{len(df)}条")
             
             # 使用统一的计算方法
-            return self._calculate_all_indicators(df, stock_code)
+            return self._calculate_all_indicators(df, stock_code, period)
             
         except Exception as e:
             self.logger.error(f"Tushare获取历史数据失败 {stock_code}: {type(e).__name__}: {str(e)}")
@@ -520,8 +541,10 @@ class SmartMonitorDataFetcher:
         if quote:
             result.update(quote)
         
-        # 技术指标
-        indicators = self.get_technical_indicators(stock_code)
+        # 技术指标（指标状态有效时直接用实时行情增量更新，无需重新获取历史K线）
+        indicators = indicator_engine.apply_quote(stock_code, quote) if quote else None
+        if indicators is None:
+            indicators = self.get_technical_indicators(stock_code)
         if indicators:
             result.update(indicators)
         
@@ -532,58 +555,6 @@ class SmartMonitorDataFetcher:
         
         return result
     
-    # ========== 技术指标计算方法 ==========
-    
-    def _calculate_macd(self, df: pd.DataFrame, 
-                       fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
-        """计算MACD指标"""
-        ema_fast = df['收盘'].ewm(span=fast, adjust=False).mean()
-        ema_slow = df['收盘'].ewm(span=slow, adjust=False).mean()
-        
-        df['dif'] = ema_fast - ema_slow
-        df['dea'] = df['dif'].ewm(span=signal, adjust=False).mean()
-        df['macd'] = (df['dif'] - df['dea']) * 2
-        
-        return df
-    
-    def _calculate_rsi(self, df: pd.DataFrame, periods: list = [6, 12, 24]) -> pd.DataFrame:
-        """计算RSI指标"""
-        for period in periods:
-            delta = df['收盘'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            
-            rs = gain / loss
-            df[f'rsi{period}'] = 100 - (100 / (1 + rs))
-        
-        return df
-    
-    def _calculate_kdj(self, df: pd.DataFrame, n: int = 9, 
-                      m1: int = 3, m2: int = 3) -> pd.DataFrame:
-        """计算KDJ指标"""
-        low_list = df['最低'].rolling(window=n).min()
-        high_list = df['最高'].rolling(window=n).max()
-        
-        rsv = (df['收盘'] - low_list) / (high_list - low_list) * 100
-        
-        df['kdj_k'] = rsv.ewm(com=m1-1, adjust=False).mean()
-        df['kdj_d'] = df['kdj_k'].ewm(com=m2-1, adjust=False).mean()
-        df['kdj_j'] = 3 * df['kdj_k'] - 2 * df['kdj_d']
-        
-        return df
-    
-    def _calculate_bollinger(self, df: pd.DataFrame, 
-                           period: int = 20, std_num: int = 2) -> pd.DataFrame:
-        """计算布林带"""
-        df['boll_mid'] = df['收盘'].rolling(window=period).mean()
-        std = df['收盘'].rolling(window=period).std()
-        
-        df['boll_upper'] = df['boll_mid'] + std_num * std
-        df['boll_lower'] = df['boll_mid'] - std_num * std
-        
-        return df
-
-
     # ========== Tushare备用数据源方法 ==========
     
     def _get_realtime_quote_from_tushare(self, stock_code: str) -> Optional[Dict]:
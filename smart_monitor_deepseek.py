@@ -3,11 +3,16 @@
 适配A股T+1交易规则的AI决策系统
 """
 
+import json
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime, time
 import pytz
 
+from http_client import http_client
+from llm_response_cache import llm_response_cache
+from rate_limiter import rate_limiter
+
 
 class SmartMonitorDeepSeek:
     """A股智能盯盘 - DeepSeek AI决策引擎"""
@@ -152,8 +157,6 @@ class SmartMonitorDeepSeek:
         Returns:
             API响应
         """
-        import requests
-        
         payload = {
             "model": model,
             "messages": messages,
@@ -161,15 +164,28 @@ class SmartMonitorDeepSeek:
             "max_tokens": max_tokens
         }
         
+        cache_key = None
+        if llm_response_cache.enabled:
+            cache_key = llm_response_cache.make_key(model, messages, temperature, max_tokens)
+            cached = llm_response_cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+        
+        # 按大模型RPM/TPM配额限流
+        rate_limiter.acquire_llm(messages, max_tokens)
+        
         try:
-            response = requests.post(
+            response = http_client.post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json=payload,
                 timeout=60
             )
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            if cache_key and result.get('choices'):
+                llm_response_cache.put(cache_key, json.dumps(result, ensure_ascii=False), model)
+            return result
         except Exception as e:
             self.logger.error(f"DeepSeek API调用失败: {e}")
             raise
@@ -4,15 +4,17 @@
 """
 
 import logging
+import os
 import time
 from typing import Dict, List, Optional
 from datetime import datetime
-import threading
 
 from smart_monitor_deepseek import SmartMonitorDeepSeek
 from smart_monitor_data import SmartMonitorDataFetcher
 from smart_monitor_qmt import SmartMonitorQMT, SmartMonitorQMTSimulator
 from smart_monitor_db import SmartMonitorDB
+from smart_monitor_scheduler import MonitorScheduler
+from smart_monitor_change_detector import ChangeDetector
 from notification_service import notification_service  # 复用主程序的通知服务
 from config_manager import config_manager  # 复用主程序的配置管理器
 
@@ -74,16 +76,22 @@ class SmartMonitorEngine:
                 self.qmt = SmartMonitorQMTSimulator()
                 self.qmt.connect("simulator")
         
-        # 监控线程控制
-        self.monitoring_threads = {}
-        self.stop_flags = {}
+        # 中央调度器：所有监控任务共享一个调度线程和固定大小的工作线程池
+        self.scheduler = MonitorScheduler(
+            max_workers=int(os.getenv('SMART_MONITOR_WORKERS', '4')),
+            jitter=float(os.getenv('SMART_MONITOR_JITTER', '0.1')),
+            batch_hook=self._prefetch_quotes
+        )
+        
+        # 行情变化检测：无实质变化时复用上一次AI决策
+        self.change_detector = ChangeDetector.from_env()
         
         self.logger.info("智能盯盘引擎初始化完成")
     
     def analyze_stock(self, stock_code: str, auto_trade: bool = False,
                      notify: bool = True, has_position: bool = False,
                      position_cost: float = 0, position_quantity: int = 0,
-                     trading_hours_only: bool = True) -> Dict:
+                     trading_hours_only: bool = True, force_ai: bool = False) -> Dict:
         """
         分析单只股票并做出决策
         
@@ -95,9 +103,10 @@ class SmartMonitorEngine:
             position_cost: 持仓成本（可选）
             position_quantity: 持仓数量（可选）
             trading_hours_only: 是否仅在交易时段分析（可选，默认True）
+            force_ai: 是否跳过变化检测、强制调用AI决策（手动分析时使用）
             
         Returns:
-            分析结果
+            分析结果（reused_decision为True表示行情无实质变化，复用了上一次决策）
         """
         try:
             self.logger.info(f"[{stock_code}] 开始分析...")
@@ -145,7 +154,46 @@ class SmartMonitorEngine:
                                    f"成本价: {position_cost:.2f}, "
                                    f"浮动盈亏: {position.get('profit_loss_pct', 0):+.2f}%")
             
-            # 5. 调用DeepSeek AI决策
+            # 5. 变化检测：行情与持仓无实质变化时复用上一次决策，不调用AI
+            position_snapshot = {
+                'has_position': bool(has_position),
+                'position_cost': position_cost,
+                'position_quantity': position_quantity
+            }
+            if force_ai:
+                changed, change_reasons = True, ['手动分析']
+            else:
+                last_decisions = self.db.get_ai_decisions(stock_code, limit=1)
+                last_decision = last_decisions[0] if last_decisions else None
+                changed, change_reasons = self.change_detector.detect(last_decision, market_data, position_snapshot)
+            
+            if not changed:
+                self.logger.info(f"[{stock_code}] 行情无实质变化，复用上次决策: {last_decision['action']} "
+                               f"({last_decision['decision_time']})")
+                return {
+                    'success': True,
+                    'stock_code': stock_code,
+                    'stock_name': market_data.get('name'),
+                    'session_info': session_info,
+                    'market_data': market_data,
+                    'decision': {
+                        'action': last_decision['action'],
+                        'confidence': last_decision['confidence'],
+                        'reasoning': last_decision['reasoning'],
+                        'position_size_pct': last_decision.get('position_size_pct'),
+                        'stop_loss_pct': last_decision.get('stop_loss_pct'),
+                        'take_profit_pct': last_decision.get('take_profit_pct'),
+                        'risk_level': last_decision.get('risk_level'),
+                        'key_price_levels': last_decision.get('key_price_levels', {})
+                    },
+                    'decision_id': last_decision['id'],
+                    'execution_result': None,
+                    'reused_decision': True
+                }
+            
+            self.logger.info(f"[{stock_code}] 触发AI决策: {'，'.join(change_reasons)}")
+            
+            # 6. 调用DeepSeek AI决策
             ai_result = self.deepseek.analyze_stock_and_decide(
                 stock_code=stock_code,
                 market_data=market_data,
@@ -168,7 +216,8 @@ class SmartMonitorEngine:
                            f"(信心度: {decision['confidence']}%)")
             self.logger.info(f"[{stock_code}] 决策理由: {decision['reasoning'][:100]}...")
             
-            # 6. 保存AI决策到数据库
+            # 7. 保存AI决策到数据库（附带持仓快照，供下次变化检测）
+            account_info['position_snapshot'] = position_snapshot
             decision_id = self.db.save_ai_decision({
                 'stock_code': stock_code,
                 'stock_name': market_data.get('name'),
@@ -185,7 +234,7 @@ class SmartMonitorEngine:
                 'account_info': account_info
             })
             
-            # 7. 执行交易（如果开启自动交易）
+            # 8. 执行交易（如果开启自动交易）
             execution_result = None
             if auto_trade and session_info['can_trade']:
                 execution_result = self._execute_decision(
@@ -202,7 +251,7 @@ class SmartMonitorEngine:
                     result=str(execution_result)
                 )
             
-            # 8. 发送通知
+            # 9. 发送通知
             if notify:
                 self._send_notification(
                     stock_code=stock_code,
@@ -220,7 +269,8 @@ class SmartMonitorEngine:
                 'market_data': market_data,
                 'decision': decision,
                 'decision_id': decision_id,
-                'execution_result': execution_result
+                'execution_result': execution_result,
+                'reused_decision': False
             }
             
         except Exception as e:
@@ -512,7 +562,7 @@ class SmartMonitorEngine:
                      has_position: bool = False, position_cost: float = 0,
                      position_quantity: int = 0, trading_hours_only: bool = True):
         """
-        启动股票监控（在独立线程中运行）
+        启动股票监控（加入中央调度器，由工作线程池执行）
         
         Args:
             stock_code: 股票代码
@@ -524,87 +574,78 @@ class SmartMonitorEngine:
             position_quantity: 持仓数量
             trading_hours_only: 是否仅在交易时段监控（默认True）
         """
-        if stock_code in self.monitoring_threads:
+        if self.scheduler.has_task(stock_code):
             self.logger.warning(f"[{stock_code}] 监控已在运行中")
             return
         
-        # 创建停止标志
-        stop_flag = threading.Event()
-        self.stop_flags[stock_code] = stop_flag
-        
-        # 创建监控线程
-        thread = threading.Thread(
-            target=self._monitor_loop,
-            args=(stock_code, check_interval, auto_trade, notify, stop_flag,
-                 has_position, position_cost, position_quantity, trading_hours_only),
-            daemon=True
+        self.scheduler.add_task(
+            stock_code,
+            lambda: self._run_monitor_task(
+                stock_code, auto_trade, notify, has_position,
+                position_cost, position_quantity, trading_hours_only
+            ),
+            check_interval
         )
         
-        self.monitoring_threads[stock_code] = thread
-        thread.start()
-        
         position_info = f"（持仓: {position_quantity}股 @ {position_cost:.2f}元）" if has_position else ""
         trading_info = "（仅交易时段）" if trading_hours_only else "（全时段）"
         self.logger.info(f"[{stock_code}] 监控已启动{trading_info}，间隔: {check_interval}秒 {position_info}")
     
     def stop_monitor(self, stock_code: str):
-        """停止股票监控"""
-        if stock_code not in self.monitoring_threads:
+        """停止股票监控（正在执行的本轮分析会运行到结束）"""
+        if not self.scheduler.remove_task(stock_code):
             self.logger.warning(f"[{stock_code}] 监控未运行")
             return
         
-        # 设置停止标志
-        self.stop_flags[stock_code].set()
-        
-        # 等待线程结束
-        self.monitoring_threads[stock_code].join(timeout=5)
-        
-        # 清理
-        del self.monitoring_threads[stock_code]
-        del self.stop_flags[stock_code]
-        
         self.logger.info(f"[{stock_code}] 监控已停止")
     
-    def _monitor_loop(self, stock_code: str, check_interval: int,
-                     auto_trade: bool, notify: bool, stop_flag: threading.Event,
-                     has_position: bool = False, position_cost: float = 0,
-                     position_quantity: int = 0, trading_hours_only: bool = True):
-        """监控循环（在独立线程中运行）"""
-        self.logger.info(f"[{stock_code}] 监控线程已启动")
+    def is_monitoring(self, stock_code: str) -> bool:
+        """股票是否在监控中"""
+        return self.scheduler.has_task(stock_code)
+    
+    def get_monitor_status(self) -> Dict:
+        """
+        获取调度状态
         
-        while not stop_flag.is_set():
-            try:
-                # 执行分析
-                result = self.analyze_stock(
-                    stock_code=stock_code,
-                    auto_trade=auto_trade,
-                    notify=notify,
-                    has_position=has_position,
-                    position_cost=position_cost,
-                    position_quantity=position_quantity,
-                    trading_hours_only=trading_hours_only
-                )
-                
-                if result.get('skipped'):
-                    # 非交易时段跳过，不算错误
-                    self.logger.debug(f"[{stock_code}] {result.get('error')}")
-                elif result['success']:
-                    self.logger.info(f"[{stock_code}] 分析完成: {result['decision']['action']}")
-                else:
-                    self.logger.error(f"[{stock_code}] 分析失败: {result.get('error')}")
-                
-            except Exception as e:
-                self.logger.error(f"[{stock_code}] 监控循环异常: {e}")
-            
-            # 等待下一次检查
-            stop_flag.wait(check_interval)
+        Returns:
+            dict: tasks（股票代码 -> 任务状态，含下次运行时间）、queue（队列深度统计）
+        """
+        return {
+            'tasks': {task['key']: task for task in self.scheduler.get_status()},
+            'queue': self.scheduler.get_queue_stats()
+        }
+    
+    def _prefetch_quotes(self, stock_codes: List[str]):
+        """同一批到期的任务先批量获取实时行情（在工作线程中执行），本批各任务分析时各取用一次"""
+        quotes = self.data_fetcher.get_realtime_quotes(stock_codes)
+        self.logger.info(f"批量预取实时行情: {len(quotes)}/{len(stock_codes)} 只")
+    
+    def _run_monitor_task(self, stock_code: str, auto_trade: bool, notify: bool,
+                          has_position: bool = False, position_cost: float = 0,
+                          position_quantity: int = 0, trading_hours_only: bool = True):
+        """执行一轮监控分析（由调度器在工作线程中调用）"""
+        result = self.analyze_stock(
+            stock_code=stock_code,
+            auto_trade=auto_trade,
+            notify=notify,
+            has_position=has_position,
+            position_cost=position_cost,
+            position_quantity=position_quantity,
+            trading_hours_only=trading_hours_only
+        )
         
-        self.logger.info(f"[{stock_code}] 监控线程已退出")
+        if result.get('skipped'):
+            # 非交易时段跳过，不算错误
+            self.logger.debug(f"[{stock_code}] {result.get('error')}")
+        elif result['success']:
+            reused = "（复用上次决策）" if result.get('reused_decision') else ""
+            self.logger.info(f"[{stock_code}] 分析完成: {result['decision']['action']}{reused}")
+        else:
+            self.logger.error(f"[{stock_code}] 分析失败: {result.get('error')}")
 
 
 if __name__ == '__main__':
     # 测试代码
-    import os
     from dotenv import load_dotenv
     
     load_dotenv()
@@ -341,7 +341,35 @@ class SmartMonitorKline:
             end_date = datetime.now().strftime('%Y%m%d')
             start_date = (datetime.now() - timedelta(days=days + 30)).strftime('%Y%m%d')  # 多取30天以确保足够数据
             
-            # 方法2: 尝试使用AKShare获取（只尝试1次，避免IP封禁）
+            # 方法2: 读取本地历史缓存（SQLite或列式存储），只向上游补齐缺失交易日
+            try:
+                from data_source_manager import data_source_manager
+                df = data_source_manager.get_stock_hist_data(
+                    symbol=stock_code,
+                    start_date=start_date,
+                    end_date=end_date,
+                    adjust='qfq',
+                    cache_first=True
+                )
+                
+                if df is not None and not df.empty:
+                    # 统一列名为AKShare格式（成交量单位：股 -> 手）
+                    df = df.rename(columns={
+                        'date': '日期',
+                        'open': '开盘',
+                        'close': '收盘',
+                        'high': '最高',
+                        'low': '最低',
+                        'amount': '成交额'
+                    })
+                    df['成交量'] = df['volume'] / 100
+                    df = df.drop(columns=['volume']).tail(days).reset_index(drop=True)
+                    self.logger.info(f"✅ 本地缓存获取K线数据成功 {stock_code}，共{len(df)}条")
+                    return df
+            except Exception as e:
+                self.logger.warning(f"本地缓存获取K线数据失败 {stock_code}: {type(e).__name__}, 尝试降级到AKShare")
+            
+            # 方法3: 尝试使用AKShare获取（只尝试1次，避免IP封禁）
             try:
                 import akshare as ak
                 df = ak.stock_zh_a_hist(
@@ -362,7 +390,7 @@ class SmartMonitorKline:
             except Exception as e:
                 self.logger.warning(f"AKShare获取K线数据失败 {stock_code}: {type(e).__name__}, 尝试降级到Tushare")
             
-            # 方法3: 降级到Tushare
+            # 方法4: 降级到Tushare
             if data_fetcher and data_fetcher.ts_pro:
                 self.logger.info(f"降级使用Tushare获取K线数据 {stock_code}")
                 df = self._get_kline_from_tushare(stock_code, days, data_fetcher.ts_pro)
@@ -0,0 +1,297 @@
+"""
+智能盯盘 - 中央任务调度器
+用一个调度线程和固定大小的工作线程池执行所有盯盘任务，线程数不随监控股票数增长
+
+@File: smart_monitor_scheduler.py
+@Contains: [MonitorScheduler]
+@Responsibilities:
+    - 按下次运行时间维护最小堆，到期任务派发到有界线程池
+    - 为运行时间加入随机抖动，分散同一时刻到期的任务
+    - 同一批到期的任务先在线程池中调用批量钩子（如批量预取行情），再分别执行
+    - 同一任务上一轮未结束时不重复派发
+    - 暴露每个任务的下次运行时间和队列深度
+@Non-Responsibilities:
+    - 不负责具体的分析与交易逻辑（由SmartMonitorEngine提供任务函数）
+@Input: 任务键、任务函数、运行间隔
+@Output: 任务状态快照
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class MonitorScheduler:
+    """基于最小堆的盯盘任务调度器"""
+
+    def __init__(self, max_workers: int = 4, jitter: float = 0.1,
+                 coalesce_window: float = 2.0,
+                 batch_hook: Optional[Callable[[List[str]], None]] = None):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 工作线程数
+            jitter: 运行时间抖动比例（相对运行间隔，0表示不抖动）
+            coalesce_window: 合并窗口（秒），在此时间内到期的任务合并为一批派发
+            batch_hook: 每批任务执行前在工作线程中调用的钩子，参数为该批任务键列表
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.coalesce_window = coalesce_window
+        self.batch_hook = batch_hook
+
+        # 最小堆元素：(下次运行时间, 序号, 任务键, 版本号)，版本号不一致的元素视为已失效
+        self._heap = []
+        self._counter = itertools.count()
+        self._tasks = {}
+        # 正在执行或已提交到线程池的任务键
+        self._in_flight = set()
+        self._condition = threading.Condition()
+
+        self._executor = None
+        self._dispatcher = None
+        self._running = False
+
+    def start(self):
+        """启动调度线程与工作线程池（重复调用无副作用）"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='smart_monitor'
+            )
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, name='smart_monitor_scheduler', daemon=True
+            )
+            self._dispatcher.start()
+
+    def shutdown(self, wait: bool = False):
+        """停止调度（已在执行的任务会运行到结束）"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _jittered(self, interval: float) -> float:
+        if not self.jitter:
+            return interval
+        return max(1.0, interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def add_task(self, key: str, func: Callable[[], None], interval: float,
+                 run_immediately: bool = True):
+        """
+        添加或替换周期任务
+
+        Args:
+            key: 任务键（如股票代码）
+            func: 任务函数（无参数）
+            interval: 运行间隔（秒）
+            run_immediately: 是否立即运行第一次（仍会在抖动范围内错开）
+        """
+        self.start()
+        now = time.time()
+        if run_immediately:
+            first_run = now + random.uniform(0, min(interval * self.jitter, 5.0))
+        else:
+            first_run = now + self._jittered(interval)
+
+        with self._condition:
+            previous = self._tasks.get(key)
+            version = previous['version'] + 1 if previous else 0
+            self._tasks[key] = {
+                'key': key,
+                'func': func,
+                'interval': interval,
+                'version': version,
+                'next_run': first_run,
+                'last_run': previous['last_run'] if previous else None,
+                'last_duration': previous['last_duration'] if previous else None,
+                'last_error': None,
+                'runs': previous['runs'] if previous else 0,
+            }
+            heapq.heappush(self._heap, (first_run, next(self._counter), key, version))
+            self._condition.notify_all()
+
+    def remove_task(self, key: str) -> bool:
+        """
+        移除任务（正在执行的本轮会运行到结束）
+
+        Returns:
+            是否存在该任务
+        """
+        with self._condition:
+            existed = self._tasks.pop(key, None) is not None
+            self._condition.notify_all()
+        return existed
+
+    def has_task(self, key: str) -> bool:
+        """任务是否已调度"""
+        with self._condition:
+            return key in self._tasks
+
+    def _dispatch_loop(self):
+        """调度线程：等待最早到期的任务，合并同批任务后派发到线程池"""
+        while True:
+            with self._condition:
+                while self._running:
+                    self._discard_stale()
+                    if self._heap:
+                        wait = self._heap[0][0] - time.time()
+                        if wait <= 0:
+                            break
+                        self._condition.wait(timeout=wait)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+
+                # 取出合并窗口内到期的全部任务
+                deadline = time.time() + self.coalesce_window
+                batch = []
+                while self._heap and self._heap[0][0] <= deadline:
+                    _, _, key, version = heapq.heappop(self._heap)
+                    task = self._tasks.get(key)
+                    if task is None or task['version'] != version:
+                        continue
+                    if key in self._in_flight:
+                        # 上一轮未结束，顺延一个周期
+                        self._reschedule(task)
+                        continue
+                    self._in_flight.add(key)
+                    batch.append(task)
+
+            if not batch:
+                continue
+
+            # 批量钩子可能较慢（如逐只降级获取行情），放到线程池执行，不阻塞调度线程
+            if self.batch_hook and len(batch) > 1:
+                if not self._submit(self._run_batch, batch):
+                    return
+            elif not self._submit_tasks(batch):
+                return
+
+    def _submit(self, fn: Callable, *args) -> bool:
+        """提交到线程池，线程池已关闭时返回False"""
+        try:
+            self._executor.submit(fn, *args)
+            return True
+        except RuntimeError:
+            return False
+
+    def _submit_tasks(self, batch: List[Dict]) -> bool:
+        """
+        将一批任务逐个提交到线程池
+
+        Returns:
+            是否全部提交成功（线程池已关闭时未提交的任务移出执行集合）
+        """
+        for i, task in enumerate(batch):
+            if not self._submit(self._run_task, task):
+                with self._condition:
+                    for rest in batch[i:]:
+                        self._in_flight.discard(rest['key'])
+                return False
+        return True
+
+    def _run_batch(self, batch: List[Dict]):
+        """工作线程：调用批量钩子，完成后再提交该批任务"""
+        try:
+            self.batch_hook([task['key'] for task in batch])
+        except Exception as e:
+            self.logger.warning(f"批量预处理失败: {e}")
+        self._submit_tasks(batch)
+
+    def _discard_stale(self):
+        """弹出堆顶已失效的元素（调用方持有锁）"""
+        while self._heap:
+            _, _, key, version = self._heap[0]
+            task = self._tasks.get(key)
+            if task is not None and task['version'] == version:
+                return
+            heapq.heappop(self._heap)
+
+    def _reschedule(self, task: Dict):
+        """按间隔与抖动安排下一次运行（调用方持有锁）"""
+        task['next_run'] = time.time() + self._jittered(task['interval'])
+        heapq.heappush(self._heap, (task['next_run'], next(self._counter), task['key'], task['version']))
+
+    def _run_task(self, task: Dict):
+        """工作线程：执行任务并安排下一次运行"""
+        start = time.time()
+        error = None
+        try:
+            task['func']()
+        except Exception as e:
+            error = str(e)
+            self.logger.error(f"[{task['key']}] 任务执行异常: {e}")
+
+        with self._condition:
+            self._in_flight.discard(task['key'])
+            task['last_run'] = start
+            task['last_duration'] = time.time() - start
+            task['last_error'] = error
+            task['runs'] += 1
+            # 任务在执行期间被移除或替换时不再续期
+            if self._tasks.get(task['key']) is task:
+                self._reschedule(task)
+            self._condition.notify_all()
+
+    def get_status(self) -> List[Dict]:
+        """
+        获取所有任务的调度状态
+
+        Returns:
+            任务状态列表（按下次运行时间排序），包含key、interval、next_run、
+            seconds_until_next、last_run、last_duration、last_error、runs、running
+        """
+        now = time.time()
+        with self._condition:
+            tasks = [dict(task, running=task['key'] in self._in_flight) for task in self._tasks.values()]
+
+        status = []
+        for task in sorted(tasks, key=lambda t: t['next_run']):
+            status.append({
+                'key': task['key'],
+                'interval': task['interval'],
+                'next_run': datetime.fromtimestamp(task['next_run']).strftime('%H:%M:%S'),
+                'seconds_until_next': max(0.0, task['next_run'] - now),
+                'last_run': datetime.fromtimestamp(task['last_run']).strftime('%H:%M:%S') if task['last_run'] else None,
+                'last_duration': task['last_duration'],
+                'last_error': task['last_error'],
+                'runs': task['runs'],
+                'running': task['running'],
+            })
+        return status
+
+    def get_task_status(self, key: str) -> Optional[Dict]:
+        """获取单个任务的调度状态，未调度返回None"""
+        return next((task for task in self.get_status() if task['key'] == key), None)
+
+    def get_queue_stats(self) -> Dict:
+        """
+        获取队列统计
+
+        Returns:
+            dict: tasks（任务数）、due（已到期待派发数）、running（执行中或排队等待线程数）、
+                  workers（工作线程数）
+        """
+        now = time.time()
+        with self._condition:
+            tasks = list(self._tasks.values())
+            in_flight = set(self._in_flight)
+        return {
+            'tasks': len(tasks),
+            'due': sum(1 for task in tasks if task['key'] not in in_flight and task['next_run'] <= now),
+            'running': len(in_flight),
+            'workers': self.max_workers,
+        }
@@ -6,9 +6,12 @@
 import logging
 import requests
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 
+from http_client import http_client
+from indicator_engine import indicator_engine
+
 
 class SmartMonitorTDXDataFetcher:
     """TDX数据获取器"""
@@ -23,6 +26,7 @@ class SmartMonitorTDXDataFetcher:
         self.logger = logging.getLogger(__name__)
         self.base_url = base_url.rstrip('/')
         self.timeout = 10  # 请求超时时间（秒）
+        self._name_cache = {}  # 股票代码 -> 名称
         
         self.logger.info(f"TDX数据源初始化成功，接口地址: {self.base_url}")
     
@@ -40,7 +44,7 @@ class SmartMonitorTDXDataFetcher:
             url = f"{self.base_url}/api/quote"
             params = {'code': stock_code}
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = http_client.get(url, params=params, timeout=self.timeout)
             result = response.json()
             
             if result['code'] != 0:
@@ -53,55 +57,9 @@ class SmartMonitorTDXDataFetcher:
                 return None
             
             # 获取第一条数据
-            quote_data = data_list[0]
-            k_data = quote_data.get('K', {})
-            
-            # 价格单位转换：厘 -> 元（1元 = 1000厘）
-            current_price = k_data.get('Close', 0) / 1000
-            pre_close = k_data.get('Last', 0) / 1000
-            open_price = k_data.get('Open', 0) / 1000
-            high_price = k_data.get('High', 0) / 1000
-            low_price = k_data.get('Low', 0) / 1000
-            
-            # 成交量单位：手（已是手，无需转换）
-            volume = quote_data.get('TotalHand', 0)
-            
-            # 成交额单位转换：厘 -> 元
-            amount = quote_data.get('Amount', 0) / 1000
-            
-            # 计算涨跌幅
-            change_amount = current_price - pre_close
-            change_pct = (change_amount / pre_close * 100) if pre_close > 0 else 0
-            
-            # 计算换手率（需要流通股本，TDX不提供，暂时设为0）
-            turnover_rate = 0.0
-            
-            # 计算量比（现量/均量，这里用总手数/平均手数估算）
-            vol_ma5 = volume / 1.2  # 简化估算
-            volume_ratio = volume / vol_ma5 if vol_ma5 > 0 else 1.0
-            
-            # 获取股票名称（需要调用搜索接口）
-            stock_name = self._get_stock_name(stock_code)
-            
-            self.logger.info(f"✅ TDX成功获取 {stock_code} ({stock_name}) 实时行情")
-            
-            return {
-                'code': stock_code,
-                'name': stock_name,
-                'current_price': current_price,
-                'change_pct': change_pct,
-                'change_amount': change_amount,
-                'volume': volume,  # 手
-                'amount': amount,  # 元
-                'high': high_price,
-                'low': low_price,
-                'open': open_price,
-                'pre_close': pre_close,
-                'turnover_rate': turnover_rate,
-                'volume_ratio': volume_ratio,
-                'update_time': datetime.fromtimestamp(int(quote_data.get('ServerTime', 0))).strftime('%Y-%m-%d %H:%M:%S'),
-                'data_source': 'tdx'
-            }
+            quote = self._parse_quote(stock_code, data_list[0])
+            self.logger.info(f"✅ TDX成功获取 {stock_code} ({quote['name']}) 实时行情")
+            return quote
             
         except requests.exceptions.Timeout:
             self.logger.error(f"TDX请求超时 {stock_code}")
@@ -113,6 +71,103 @@ class SmartMonitorTDXDataFetcher:
             self.logger.error(f"TDX获取行情失败 {stock_code}: {type(e).__name__}: {str(e)}")
             return None
     
+    def get_realtime_quotes(self, stock_codes: List[str], chunk_size: int = 50) -> Dict[str, Dict]:
+        """
+        批量获取实时行情（一次请求查询多只股票）
+        
+        Args:
+            stock_codes: 股票代码列表
+            chunk_size: 单次请求的股票数量
+            
+        Returns:
+            股票代码 -> 实时行情数据，获取失败的代码不返回
+        """
+        quotes = {}
+        url = f"{self.base_url}/api/quote"
+        
+        for i in range(0, len(stock_codes), chunk_size):
+            chunk = stock_codes[i:i + chunk_size]
+            try:
+                response = http_client.get(url, params={'code': ','.join(chunk)}, timeout=self.timeout)
+                result = response.json()
+                
+                if result['code'] != 0:
+                    self.logger.error(f"TDX批量获取行情失败: {result.get('message')}")
+                    continue
+                
+                data_list = result.get('data', []) or []
+                for position, quote_data in enumerate(data_list):
+                    # 优先按返回的代码匹配，缺少代码字段时按请求顺序对应
+                    code = str(quote_data.get('Code') or quote_data.get('code') or '')
+                    if not code and len(data_list) == len(chunk):
+                        code = chunk[position]
+                    if code in chunk and quote_data.get('K'):
+                        quotes[code] = self._parse_quote(code, quote_data)
+                        
+            except Exception as e:
+                self.logger.error(f"TDX批量获取行情失败: {type(e).__name__}: {str(e)}")
+        
+        self.logger.info(f"✅ TDX批量获取行情 {len(quotes)}/{len(stock_codes)} 只")
+        return quotes
+    
+    def _parse_quote(self, stock_code: str, quote_data: Dict) -> Dict:
+        """
+        将TDX行情数据转换为标准格式
+        
+        Args:
+            stock_code: 股票代码
+            quote_data: TDX返回的单只股票行情
+            
+        Returns:
+            实时行情数据
+        """
+        k_data = quote_data.get('K', {})
+        
+        # 价格单位转换：厘 -> 元（1元 = 1000厘）
+        current_price = k_data.get('Close', 0) / 1000
+        pre_close = k_data.get('Last', 0) / 1000
+        open_price = k_data.get('Open', 0) / 1000
+        high_price = k_data.get('High', 0) / 1000
+        low_price = k_data.get('Low', 0) / 1000
+        
+        # 成交量单位：手（已是手，无需转换）
+        volume = quote_data.get('TotalHand', 0)
+        
+        # 成交额单位转换：厘 -> 元
+        amount = quote_data.get('Amount', 0) / 1000
+        
+        # 计算涨跌幅
+        change_amount = current_price - pre_close
+        change_pct = (change_amount / pre_close * 100) if pre_close > 0 else 0
+        
+        # 计算换手率（需要流通股本，TDX不提供，暂时设为0）
+        turnover_rate = 0.0
+        
+        # 计算量比（现量/均量，这里用总手数/平均手数估算）
+        vol_ma5 = volume / 1.2  # 简化估算
+        volume_ratio = volume / vol_ma5 if vol_ma5 > 0 else 1.0
+        
+        # 获取股票名称（需要调用搜索接口，结果按代码缓存）
+        stock_name = self._get_stock_name(stock_code)
+        
+        return {
+            'code': stock_code,
+            'name': stock_name,
+            'current_price': current_price,
+            'change_pct': change_pct,
+            'change_amount': change_amount,
+            'volume': volume,  # 手
+            'amount': amount,  # 元
+            'high': high_price,
+            'low': low_price,
+            'open': open_price,
+            'pre_close': pre_close,
+            'turnover_rate': turnover_rate,
+            'volume_ratio': volume_ratio,
+            'update_time': datetime.fromtimestamp(int(quote_data.get('ServerTime', 0))).strftime('%Y-%m-%d %H:%M:%S'),
+            'data_source': 'tdx'
+        }
+    
     def _get_stock_name(self, stock_code: str) -> str:
         """
         获取股票名称
@@ -123,18 +178,22 @@ class SmartMonitorTDXDataFetcher:
         Returns:
             股票名称
         """
+        if stock_code in self._name_cache:
+            return self._name_cache[stock_code]
+        
         try:
             url = f"{self.base_url}/api/search"
             params = {'keyword': stock_code}
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = http_client.get(url, params=params, timeout=self.timeout)
             result = response.json()
             
             if result['code'] == 0:
                 data_list = result.get('data', [])
                 for item in data_list:
                     if item.get('code') == stock_code:
-                        return item.get('name', 'N/A')
+                        self._name_cache[stock_code] = item.get('name', 'N/A')
+                        return self._name_cache[stock_code]
             
             return 'N/A'
             
@@ -161,7 +220,7 @@ class SmartMonitorTDXDataFetcher:
                 'type': kline_type
             }
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = http_client.get(url, params=params, timeout=self.timeout)
             result = response.json()
             
             if result['code'] != 0:
@@ -234,19 +293,21 @@ class SmartMonitorTDXDataFetcher:
                 return None
             
             # 计算技术指标
-            return self._calculate_all_indicators(df, stock_code)
+            return self._calculate_all_indicators(df, stock_code, period)
             
         except Exception as e:
             self.logger.error(f"TDX计算技术指标失败 {stock_code}: {e}")
             return None
     
-    def _calculate_all_indicators(self, df: pd.DataFrame, stock_code: str) -> Optional[Dict]:
+    def _calculate_all_indicators(self, df: pd.DataFrame, stock_code: str, period: str = 'daily') -> Optional[Dict]:
         """
         根据历史数据计算所有技术指标
+        由增量指标引擎计算：与上次的历史数据衔接时只更新最后一根K线，否则重新初始化
         
         Args:
             df: 历史数据DataFrame
             stock_code: 股票代码
+            period: 周期（daily/weekly/monthly）
             
         Returns:
             技术指标数据
@@ -256,78 +317,7 @@ class SmartMonitorTDXDataFetcher:
                 self.logger.warning(f"股票 {stock_code} 历史数据不足")
                 return None
             
-            # 计算均线
-            df['ma5'] = df['收盘'].rolling(window=5).mean()
-            df['ma20'] = df['收盘'].rolling(window=20).mean()
-            df['ma60'] = df['收盘'].rolling(window=60).mean()
-            
-            # 计算MACD
-            df = self._calculate_macd(df)
-            
-            # 计算RSI
-            df = self._calculate_rsi(df, periods=[6, 12, 24])
-            
-            # 计算KDJ
-            df = self._calculate_kdj(df)
-            
-            # 计算布林带
-            df = self._calculate_bollinger(df)
-            
-            # 计算量能均线
-            df['vol_ma5'] = df['成交量'].rolling(window=5).mean()
-            df['vol_ma10'] = df['成交量'].rolling(window=10).mean()
-            
-            # 取最后一行数据
-            latest = df.iloc[-1]
-            
-            # 判断趋势
-            current_price = float(latest['收盘'])
-            ma5 = float(latest['ma5'])
-            ma20 = float(latest['ma20'])
-            ma60 = float(latest['ma60'])
-            
-            if current_price > ma5 > ma20 > ma60:
-                trend = 'up'
-            elif current_price < ma5 < ma20 < ma60:
-                trend = 'down'
-            else:
-                trend = 'sideways'
-            
-            # 布林带位置
-            boll_upper = float(latest['boll_upper'])
-            boll_mid = float(latest['boll_mid'])
-            boll_lower = float(latest['boll_lower'])
-            
-            if current_price >= boll_upper:
-                boll_position = '上轨附近（超买）'
-            elif current_price <= boll_lower:
-                boll_position = '下轨附近（超卖）'
-            elif current_price > boll_mid:
-                boll_position = '中轨上方'
-            else:
-                boll_position = '中轨下方'
-            
-            return {
-                'ma5': ma5,
-                'ma20': ma20,
-                'ma60': ma60,
-                'trend': trend,
-                'macd_dif': float(latest['dif']),
-                'macd_dea': float(latest['dea']),
-                'macd': float(latest['macd']),
-                'rsi6': float(latest['rsi6']),
-                'rsi12': float(latest['rsi12']),
-                'rsi24': float(latest['rsi24']),
-                'kdj_k': float(latest['kdj_k']),
-                'kdj_d': float(latest['kdj_d']),
-                'kdj_j': float(latest['kdj_j']),
-                'boll_upper': boll_upper,
-                'boll_mid': boll_mid,
-                'boll_lower': boll_lower,
-                'boll_position': boll_position,
-                'vol_ma5': float(latest['vol_ma5']),
-                'volume_ratio': float(latest['成交量']) / float(latest['vol_ma5']) if latest['vol_ma5'] > 0 else 1.0
-            }
+            return indicator_engine.update_from_history(stock_code, df, period)
             
         except Exception as e:
             self.logger.error(f"计算技术指标失败 {stock_code}: {e}")
@@ -352,65 +342,15 @@ class SmartMonitorTDXDataFetcher:
         if quote:
             result.update(quote)
         
-        # 技术指标
-        indicators = self.get_technical_indicators(stock_code)
+        # 技术指标（指标状态有效时直接用实时行情增量更新，无需重新获取历史K线）
+        indicators = indicator_engine.apply_quote(stock_code, quote) if quote else None
+        if indicators is None:
+            indicators = self.get_technical_indicators(stock_code)
         if indicators:
             result.update(indicators)
         
         return result
     
-    # ========== 技术指标计算方法 ==========
-    
-    def _calculate_macd(self, df: pd.DataFrame, 
-                       fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
-        """计算MACD指标"""
-        ema_fast = df['收盘'].ewm(span=fast, adjust=False).mean()
-        ema_slow = df['收盘'].ewm(span=slow, adjust=False).mean()
-        
-        df['dif'] = ema_fast - ema_slow
-        df['dea'] = df['dif'].ewm(span=signal, adjust=False).mean()
-        df['macd'] = (df['dif'] - df['dea']) * 2
-        
-        return df
-    
-    def _calculate_rsi(self, df: pd.DataFrame, periods: list = [6, 12, 24]) -> pd.DataFrame:
-        """计算RSI指标"""
-        for period in periods:
-            delta = df['收盘'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            
-            rs = gain / loss
-            df[f'rsi{period}'] = 100 - (100 / (1 + rs))
-        
-        return df
-    
-    def _calculate_kdj(self, df: pd.DataFrame, n: int = 9, 
-                      m1: int = 3, m2: int = 3) -> pd.DataFrame:
-        """计算KDJ指标"""
-        low_list = df['最低'].rolling(window=n).min()
-        high_list = df['最高'].rolling(window=n).max()
-        
-        rsv = (df['收盘'] - low_list) / (high_list - low_list) * 100
-        
-        df['kdj_k'] = rsv.ewm(com=m1-1, adjust=False).mean()
-        df['kdj_d'] = df['kdj_k'].ewm(com=m2-1, adjust=False).mean()
-        df['kdj_j'] = 3 * df['kdj_k'] - 2 * df['kdj_d']
-        
-        return df
-    
-    def _calculate_bollinger(self, df: pd.DataFrame, 
-                           period: int = 20, std_num: int = 2) -> pd.DataFrame:
-        """计算布林带"""
-        df['boll_mid'] = df['收盘'].rolling(window=period).mean()
-        std = df['收盘'].rolling(window=period).std()
-        
-        df['boll_upper'] = df['boll_mid'] + std_num * std
-        df['boll_lower'] = df['boll_mid'] - std_num * std
-        
-        return df
-
-
 if __name__ == '__main__':
     # 测试代码
     logging.basicConfig(level=logging.INFO)
@@ -214,7 +214,8 @@ def render_realtime_analysis():
             result = engine.analyze_stock(
                 stock_code=stock_code,
                 auto_trade=auto_trade,
-                notify=True
+                notify=True,
+                force_ai=True
             )
         
         if result['success']:
@@ -418,6 +419,15 @@ def render_monitor_tasks():
         st.info("暂无监控任务，点击上方'添加新监控任务'创建")
         return
     
+    # 调度器状态：队列深度与各任务下次运行时间
+    monitor_status = engine.get_monitor_status()
+    queue_stats = monitor_status['queue']
+    col_q1, col_q2, col_q3, col_q4 = st.columns(4)
+    col_q1.metric("调度中任务", queue_stats['tasks'])
+    col_q2.metric("待执行", queue_stats['due'])
+    col_q3.metric("执行/排队中", queue_stats['running'])
+    col_q4.metric("工作线程", queue_stats['workers'])
+    
     for task in tasks:
         with st.container():
             # 获取实时价格计算盈亏
@@ -465,9 +475,14 @@ def render_monitor_tasks():
                     st.caption(f"📊 持仓: {position_quantity}股 @ {position_cost:.2f}元")
             
             with col3:
-                is_running = task['stock_code'] in engine.monitoring_threads
+                schedule_info = monitor_status['tasks'].get(task['stock_code'])
+                is_running = schedule_info is not None
                 if is_running:
                     st.success("▶️ 运行中")
+                    if schedule_info['running']:
+                        st.caption("🔄 正在分析...")
+                    else:
+                        st.caption(f"⏱️ 下次运行 {schedule_info['next_run']}（{schedule_info['seconds_until_next']:.0f}秒后）")
                 else:
                     st.info("⏸️ 未运行")
                 
@@ -510,7 +525,7 @@ def render_monitor_tasks():
             with col5:
                 if st.button("🗑️ 删除", key=f"del_{task['id']}"):
                     # 如果正在运行，先停止
-                    if task['stock_code'] in engine.monitoring_threads:
+                    if engine.is_monitoring(task['stock_code']):
                         engine.stop_monitor(task['stock_code'])
                     
                     db.delete_monitor_task(task['id'])
@@ -589,7 +604,7 @@ def render_position_management():
         if st.button("🔍 AI分析", type="secondary"):
             stock_code = selected_stock.split()[0]
             with st.spinner("分析中..."):
-                result = engine.analyze_stock(stock_code, auto_trade=False)
+                result = engine.analyze_stock(stock_code, auto_trade=False, force_ai=True)
                 if result['success']:
                     st.success("分析完成，查看'实时分析'标签页")
     
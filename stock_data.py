@@ -2,12 +2,13 @@ import yfinance as yf
 import akshare as ak
 import pandas as pd
 import numpy as np
-import ta
 from datetime import datetime, timedelta
 import requests
 import json
 import pywencai
 from data_source_manager import data_source_manager
+import indicator_kernels
+from rate_limiter import rate_limiter
 
 class StockDataFetcher:
     """股票数据获取类"""
@@ -331,11 +332,9 @@ class StockDataFetcher:
     
     def _get_us_stock_info(self, symbol):
         """获取美股基本信息"""
-        import time
-        
         try:
-            # 添加延迟避免频率限制
-            time.sleep(1)
+            # 按yfinance配额限流
+            rate_limiter.acquire('yfinance')
             
             ticker = yf.Ticker(symbol)
             
@@ -528,33 +527,34 @@ class StockDataFetcher:
             if isinstance(df, dict) and "error" in df:
                 return df
                 
+            close = df['Close'].to_numpy(dtype=float)
+            high = df['High'].to_numpy(dtype=float)
+            low = df['Low'].to_numpy(dtype=float)
+            
             # 移动平均线
-            df['MA5'] = ta.trend.sma_indicator(df['Close'], window=5)
-            df['MA10'] = ta.trend.sma_indicator(df['Close'], window=10)
-            df['MA20'] = ta.trend.sma_indicator(df['Close'], window=20)
-            df['MA60'] = ta.trend.sma_indicator(df['Close'], window=60)
+            for window in (5, 10, 20, 60):
+                df[f'MA{window}'] = indicator_kernels.sma(close, window)
             
             # RSI
-            df['RSI'] = ta.momentum.rsi(df['Close'], window=14)
+            df['RSI'] = indicator_kernels.rsi_wilder(close, 14)
             
             # MACD
-            macd = ta.trend.MACD(df['Close'])
-            df['MACD'] = macd.macd()
-            df['MACD_signal'] = macd.macd_signal()
-            df['MACD_histogram'] = macd.macd_diff()
+            dif, dea, _ = indicator_kernels.macd(close, warmup=True)
+            df['MACD'] = dif
+            df['MACD_signal'] = dea
+            df['MACD_histogram'] = dif - dea
             
             # 布林带
-            bollinger = ta.volatility.BollingerBands(df['Close'])
-            df['BB_upper'] = bollinger.bollinger_hband()
-            df['BB_middle'] = bollinger.bollinger_mavg()
-            df['BB_lower'] = bollinger.bollinger_lband()
+            upper, middle, lower = indicator_kernels.bollinger(close, 20, 2, ddof=0)
+            df['BB_upper'] = upper
+            df['BB_middle'] = middle
+            df['BB_lower'] = lower
             
             # KDJ指标
-            df['K'] = ta.momentum.stoch(df['High'], df['Low'], df['Close'])
-            df['D'] = ta.momentum.stoch_signal(df['High'], df['Low'], df['Close'])
+            df['K'], df['D'] = indicator_kernels.stoch(high, low, close)
             
             # 成交量指标
-            df['Volume_MA5'] = ta.trend.sma_indicator(df['Volume'], window=5)
+            df['Volume_MA5'] = indicator_kernels.sma(df['Volume'].to_numpy(dtype=float), 5)
             df['Volume_ratio'] = df['Volume'] / df['Volume_MA5']
             
             return df
@@ -0,0 +1,142 @@
+"""
+indicator_kernels 一致性测试
+用固定的OHLCV样本，把向量化指标与替换前的实现（ta库、智能盯盘pandas实现、市场情绪ARBR）的输出逐点比对
+
+@File: tests/test_indicator_kernels.py
+@Contains: [test_ta_indicators, test_smart_monitor_indicators, test_arbr, test_matrix_input]
+@Input: tests/fixtures/indicator_kernels_golden.csv（OHLCV样本与替换前实现的输出）
+
+基准数据在仓库根目录下由 PYTHONPATH=. python tests/test_indicator_kernels.py 生成（需安装ta库），运行测试不依赖ta
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicator_kernels
+
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures',
+                           'indicator_kernels_golden.csv')
+
+RTOL = 1e-9
+
+
+@pytest.fixture(scope='module')
+def golden():
+    return pd.read_csv(GOLDEN_PATH)
+
+
+def assert_matches(actual, expected):
+    """NaN位置一致，其余相对误差不超过RTOL"""
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), expected.to_numpy(dtype=float),
+                               rtol=RTOL, atol=RTOL, equal_nan=True)
+
+
+def test_ta_indicators(golden):
+    """与stock_data原先使用的ta库指标一致（均线、Wilder RSI、MACD、布林带、随机指标）"""
+    close = golden['close'].to_numpy()
+    high = golden['high'].to_numpy()
+    low = golden['low'].to_numpy()
+
+    for window in (5, 10, 20, 60):
+        assert_matches(indicator_kernels.sma(close, window), golden[f'ta_sma{window}'])
+    assert_matches(indicator_kernels.sma(golden['volume'].to_numpy(), 5), golden['ta_volume_sma5'])
+    assert_matches(indicator_kernels.rsi_wilder(close, 14), golden['ta_rsi14'])
+
+    dif, dea, _ = indicator_kernels.macd(close, warmup=True)
+    assert_matches(dif, golden['ta_macd'])
+    assert_matches(dea, golden['ta_macd_signal'])
+    assert_matches(dif - dea, golden['ta_macd_diff'])
+
+    upper, middle, lower = indicator_kernels.bollinger(close, 20, 2, ddof=0)
+    assert_matches(upper, golden['ta_bb_upper'])
+    assert_matches(middle, golden['ta_bb_middle'])
+    assert_matches(lower, golden['ta_bb_lower'])
+
+    k, d = indicator_kernels.stoch(high, low, close)
+    assert_matches(k, golden['ta_stoch'])
+    assert_matches(d, golden['ta_stoch_signal'])
+
+
+def test_smart_monitor_indicators(golden):
+    """与智能盯盘原pandas实现一致（MACD、RSI、KDJ、布林带样本标准差）"""
+    indicators = indicator_kernels.compute_all(golden['high'].to_numpy(), golden['low'].to_numpy(),
+                                               golden['close'].to_numpy(), golden['volume'].to_numpy())
+    for name in ('ma5', 'ma20', 'ma60', 'macd_dif', 'macd_dea', 'macd', 'rsi6', 'rsi12', 'rsi24',
+                 'kdj_k', 'kdj_d', 'kdj_j', 'boll_upper', 'boll_mid', 'boll_lower', 'vol_ma5'):
+        assert_matches(indicators[name], golden[f'pd_{name}'])
+
+
+def test_arbr(golden):
+    """与市场情绪模块原ARBR实现一致（分母为0时为NaN）"""
+    ar, br = indicator_kernels.arbr(golden['open'].to_numpy(), golden['high'].to_numpy(),
+                                    golden['low'].to_numpy(), golden['close'].to_numpy(), 26)
+    assert_matches(ar, golden['pd_ar'])
+    assert_matches(br, golden['pd_br'])
+
+
+def test_matrix_input(golden):
+    """二维输入（股票数 × K线数）逐行结果与一维输入相同"""
+    close = golden['close'].to_numpy()
+    matrix = np.vstack([close, close[::-1], np.full_like(close, np.nan)])
+    for func in (lambda x: indicator_kernels.sma(x, 20), lambda x: indicator_kernels.rsi(x, 6),
+                 lambda x: indicator_kernels.macd(x)[0], lambda x: indicator_kernels.rsi_wilder(x, 14)):
+        result = func(matrix)
+        for row in range(matrix.shape[0]):
+            np.testing.assert_allclose(result[row], func(matrix[row]), rtol=RTOL, equal_nan=True)
+
+
+def _generate_golden():
+    """用替换前的实现生成基准数据（需安装ta库）"""
+    import ta
+
+    rng = np.random.default_rng(20240101)
+    bars = 160
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    high = close * (1 + rng.uniform(0, 0.03, bars))
+    low = close * (1 - rng.uniform(0, 0.03, bars))
+    open_ = low + (high - low) * rng.uniform(0, 1, bars)
+    volume = rng.uniform(1e4, 1e6, bars).round()
+    # 一字板：最高价等于最低价（KDJ、ARBR分母为0）
+    close[80:92] = high[80:92] = low[80:92] = open_[80:92] = close[79]
+    df = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume})
+
+    # stock_data 原ta库实现
+    for window in (5, 10, 20, 60):
+        df[f'ta_sma{window}'] = ta.trend.sma_indicator(df['close'], window=window)
+    df['ta_volume_sma5'] = ta.trend.sma_indicator(df['volume'], window=5)
+    df['ta_rsi14'] = ta.momentum.rsi(df['close'], window=14)
+    macd = ta.trend.MACD(df['close'])
+    df['ta_macd'] = macd.macd()
+    df['ta_macd_signal'] = macd.macd_signal()
+    df['ta_macd_diff'] = macd.macd_diff()
+    bollinger = ta.volatility.BollingerBands(df['close'])
+    df['ta_bb_upper'] = bollinger.bollinger_hband()
+    df['ta_bb_middle'] = bollinger.bollinger_mavg()
+    df['ta_bb_lower'] = bollinger.bollinger_lband()
+    df['ta_stoch'] = ta.momentum.stoch(df['high'], df['low'], df['close'])
+    df['ta_stoch_signal'] = ta.momentum.stoch_signal(df['high'], df['low'], df['close'])
+
+    # 智能盯盘原pandas实现
+    reference = indicator_kernels._pandas_reference(
+        df.rename(columns={'close': '收盘', 'high': '最高', 'low': '最低', 'volume': '成交量'}))
+    for name in reference.columns:
+        df[f'pd_{name}'] = reference[name]
+
+    # 市场情绪原ARBR实现
+    prev_close = df['close'].shift(1)
+    ar = (df['high'] - df['open']).rolling(window=26).sum() / (df['open'] - df['low']).rolling(window=26).sum() * 100
+    br = (df['high'] - prev_close).rolling(window=26).sum() / (prev_close - df['low']).rolling(window=26).sum() * 100
+    df['pd_ar'] = ar.replace([np.inf, -np.inf], np.nan)
+    df['pd_br'] = br.replace([np.inf, -np.inf], np.nan)
+
+    os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+    df.to_csv(GOLDEN_PATH, index=False, float_format='%.17g')
+    print(f"基准数据已生成: {GOLDEN_PATH}（{len(df)}根K线，{len(df.columns)}列）")
+
+
+if __name__ == '__main__':
+    _generate_golden()
@@ -0,0 +1,74 @@
+"""
+智瞰龙虎评分一致性测试
+向量化评分 score_all_stocks 与逐只评分参考实现 _score_all_stocks_reference 的结果必须完全一致
+
+@File: tests/test_longhubang_scoring.py
+@Contains: [test_matches_reference, test_edge_cases]
+@Input: 按固定随机种子生成的龙虎榜席位记录（中英文字段混用、金额为字符串/空值、缺失概念与营业部）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from longhubang_scoring import LonghubangScoring
+
+
+@pytest.fixture(scope='module')
+def scoring():
+    return LonghubangScoring()
+
+
+def make_records(scoring, days, stocks_per_day, seats_per_stock, seed=0):
+    """生成模拟龙虎榜席位记录（含顶级游资、知名游资、机构与普通席位）"""
+    rng = np.random.default_rng(seed)
+    seats = (scoring.top_youzi + scoring.famous_youzi + ['机构专用'] * 5 +
+             [f'普通游资{i}' for i in range(300)])
+    concepts = scoring.hot_keywords + ['银行', '地产', '次新股', '黄金概念', '煤炭', '']
+    records = []
+    for day in range(days):
+        date = (pd.Timestamp('2024-03-01') + pd.offsets.BDay(day)).strftime('%Y-%m-%d')
+        for code in rng.choice(3000, stocks_per_day, replace=False):
+            for _ in range(rng.integers(1, seats_per_stock * 2)):
+                buy = float(rng.choice([0, rng.integers(1, 2e8)]))
+                sell = float(rng.choice([0, rng.integers(1, 2e8)]))
+                concept = ','.join(rng.choice(concepts, rng.integers(0, 4)))
+                if rng.random() < 0.5:
+                    record = {'gpdm': f'{code:06d}', 'gpmc': f'股票{code}', 'yzmc': rng.choice(seats),
+                              'yyb': f'{rng.choice(seats)}营业部', 'mrje': str(buy), 'mcje': sell,
+                              'jlrje': buy - sell, 'gl': concept or None, 'rq': date}
+                else:
+                    record = {'股票代码': f'{code:06d}', '股票名称': f'股票{code}', '游资名称': rng.choice(seats),
+                              '营业部': None, '买入金额': buy, '卖出金额': str(sell) if sell else '',
+                              '净流入金额': buy - sell, '概念': concept, '日期': date}
+                records.append(record)
+    return records
+
+
+@pytest.mark.parametrize('days, stocks_per_day, seed', [(1, 80, 1), (5, 60, 5), (22, 80, 22)])
+def test_matches_reference(scoring, days, stocks_per_day, seed):
+    records = make_records(scoring, days, stocks_per_day, 6, seed=seed)
+    actual = scoring.score_all_stocks(records)
+    expected = scoring._score_all_stocks_reference(records)
+    assert len(actual) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_edge_cases(scoring):
+    cases = [
+        [],
+        # 缺少股票代码的记录不参与评分
+        [{'股票名称': '无代码', '游资名称': '赵老哥', '买入金额': 1e7}],
+        # 只有一只股票、无概念、无卖出
+        [{'股票代码': '001337', '股票名称': '四川黄金', '游资名称': '92科比',
+          '营业部': '兴业证券股份有限公司南京天元东路证券营业部', '买入金额': 14470401,
+          '卖出金额': 15080, '净流入金额': 14455321, '概念': '贵金属,黄金概念,次新股'},
+         {'股票代码': '001337', '股票名称': '四川黄金', '游资名称': '赵老哥', '营业部': '某证券公司',
+          '买入金额': 10000000, '卖出金额': 0, '净流入金额': 10000000, '概念': ''}],
+        # 金额缺失或无法解析
+        [{'gpdm': '600000', 'gpmc': '浦发银行', 'yzmc': '机构专用', 'mrje': '', 'mcje': None, 'jlrje': 'abc'}],
+    ]
+    for records in cases:
+        actual = scoring.score_all_stocks(records)
+        expected = scoring._score_all_stocks_reference(records)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)